@@ -0,0 +1,78 @@
+"""
+Per-request agent setup overhead benchmark.
+
+Compares building a `ChatOpenAI` client, a `StateGraph` and a `MemorySaver` and compiling the
+workflow on every request (the previous behaviour of `ask_agent`) against reusing the shared
+compiled graph from `src.ai.agent`. No OpenAI request is made.
+
+Usage:
+    python -m benchmarks.agent_setup_bench
+"""
+
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+
+from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import START, MessagesState, StateGraph
+
+from src.ai.agent import get_agent
+
+ITERATIONS = 200
+
+
+def build_per_request():
+    """
+    Reproduces the per-request setup that `ask_agent` used to perform.
+
+    Returns:
+        CompiledStateGraph: A freshly compiled graph.
+    """
+
+    workflow = StateGraph(state_schema=MessagesState)
+    model = ChatOpenAI(
+        model="chatgpt-4o-latest",
+        temperature=1,
+        api_key=os.getenv("OPENAI_API_KEY"),
+    )
+
+    async def call_model(state: MessagesState):
+        response = await model.ainvoke(state["messages"])
+        return {"messages": response}
+
+    workflow.add_edge(START, "model")
+    workflow.add_node("model", call_model)
+
+    return workflow.compile(checkpointer=MemorySaver())
+
+
+def measure(setup, label: str) -> None:
+    """
+    Times a setup function and prints the mean and median cost per call.
+
+    Args:
+        setup (Callable[[], object]): The setup step executed once per simulated request.
+        label (str): Name printed next to the results.
+    """
+
+    timings = []
+
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        setup()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(
+        f"{label:<12} mean={statistics.mean(timings):.3f}ms "
+        f"median={statistics.median(timings):.3f}ms"
+    )
+
+
+if __name__ == "__main__":
+    get_agent()
+
+    measure(build_per_request, "per-request")
+    measure(get_agent, "shared")
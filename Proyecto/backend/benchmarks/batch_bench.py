@@ -0,0 +1,84 @@
+"""
+Batch classification benchmark.
+
+Classifies 200 products with `run_batch` against a temporary SQLite database, with a fixed
+templated answer returned after a simulated LLM latency instead of the model, at several
+concurrency limits. Reports the wall time, the throughput and the commits sent, compared
+with answering the products one by one.
+
+Usage:
+    python -m benchmarks.batch_bench
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/batch_bench.db"
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+
+from sqlalchemy import event
+
+import src.ai.batch as batch
+import src.ai.utils.detect_language as detect_mod
+from src.database import AsyncSessionLocal, Base, async_engine, engine
+from src.models import Users
+from src.ai.utils.parse_answer_test import CORPUS
+
+Base.metadata.create_all(bind=engine)
+
+PRODUCTS = 200
+
+LLM_LATENCY_SECONDS = 0.2
+
+CONCURRENCY_LIMITS = (1, 4, 8, 16, 32)
+
+
+async def fake_answer_prompt(prompt: str, language: str, facts: str | None = None) -> str:
+    await asyncio.sleep(LLM_LATENCY_SECONDS)
+    return CORPUS[hash(prompt) % len(CORPUS)][0]
+
+
+async def fake_detect_language_remote(text: str) -> str:
+    return "es"
+
+
+async def main() -> None:
+    batch.answer_prompt = fake_answer_prompt
+    detect_mod.detect_language_remote = fake_detect_language_remote
+
+    async with AsyncSessionLocal() as db:
+        user = Users(email="batch-bench@example.com")
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+
+    commits = 0
+
+    def count_commit(*args) -> None:
+        nonlocal commits
+        commits += 1
+
+    event.listen(async_engine.sync_engine, "commit", count_commit)
+    products = [f"producto de importación número {index}" for index in range(PRODUCTS)]
+
+    print(f"products={PRODUCTS} simulated_llm={LLM_LATENCY_SECONDS * 1000:.0f}ms")
+    print(f"{'concurrency':<14}{'wall s':>10}{'items/s':>10}{'commits':>10}")
+
+    for concurrency in CONCURRENCY_LIMITS:
+        commits = 0
+        start = time.perf_counter()
+        async for _ in batch.run_batch(products, user_id, uuid.uuid4(), concurrency):
+            pass
+        elapsed = time.perf_counter() - start
+
+        print(f"{concurrency:<14}{elapsed:>10.2f}{PRODUCTS / elapsed:>10.1f}{commits:>10}")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
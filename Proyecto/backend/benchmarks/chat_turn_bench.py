@@ -0,0 +1,123 @@
+"""
+Chat turn database round-trip benchmark.
+
+Runs the database side of `/importation-bot/` (user resolution, history loading and the turn
+persistence) against a temporary SQLite database, with a fixed templated answer instead of
+the LLM, and counts the SQL statements and commits sent on the request path and by the
+background jobs it queues.
+
+Usage:
+    python -m benchmarks.chat_turn_bench
+"""
+
+import asyncio
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/chat_turn_bench.db"
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+
+from sqlalchemy import event
+
+import src.ai.utils.detect_language as detect_mod
+from src.database import AsyncSessionLocal, Base, async_engine, engine
+from src.ai.jobs import job_queue
+from src.ai.router import prepare_agent_input, save_agent_response
+from src.ai.schemas import AskAgent
+from src.models import Users
+from src.ai.utils.parse_answer_test import CORPUS
+
+Base.metadata.create_all(bind=engine)
+
+TURNS = 5
+
+
+class RoundTripCounter:
+    """
+    Counts the statements and commits sent through the async engine.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.commits = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._on_statement)
+        event.listen(async_engine.sync_engine, "commit", self._on_commit)
+
+    def _on_statement(self, *args) -> None:
+        self.statements += 1
+
+    def _on_commit(self, *args) -> None:
+        self.commits += 1
+
+    def take(self) -> tuple[int, int]:
+        """
+        Returns the counts since the previous call and resets them.
+
+        Returns:
+            tuple[int, int]: The number of statements and commits.
+        """
+
+        counts = (self.statements, self.commits)
+        self.statements = self.commits = 0
+        return counts
+
+
+async def fake_detect_language_remote(text: str) -> str:
+    return "es"
+
+
+async def run_turn(counter: RoundTripCounter, user_prompt: AskAgent, response: str) -> tuple:
+    """
+    Runs one chat turn and returns the round trips of the request path and of its jobs.
+
+    Args:
+        counter (RoundTripCounter): The statement counter.
+        user_prompt (AskAgent): The prompt of the turn.
+        response (str): The agent answer to persist.
+
+    Returns:
+        tuple: The request (statements, commits) and the background (statements, commits).
+    """
+
+    await job_queue.start()
+    counter.take()
+
+    async with AsyncSessionLocal() as db:
+        user_id, new_user, language, _, _ = await prepare_agent_input(user_prompt, db)
+        await save_agent_response(user_prompt, user_id, language, response, db, new_user=new_user)
+
+    request = counter.take()
+    await job_queue.stop()
+    return request, counter.take()
+
+
+async def main() -> None:
+    detect_mod.detect_language_remote = fake_detect_language_remote
+    counter = RoundTripCounter()
+
+    # Email users are created by /google-login/ before they chat.
+    async with AsyncSessionLocal() as db:
+        db.add(Users(email="bench@example.com"))
+        await db.commit()
+
+    response = CORPUS[0][0]
+
+    print(f"{'turn':<28}{'request stmts':>14}{'commits':>9}{'job stmts':>11}{'commits':>9}")
+
+    for user_kind, fields in (
+        ("private_id", {"user_id": "bench-private-user"}),
+        ("email", {"user_email": "bench@example.com"}),
+    ):
+        for turn in range(TURNS):
+            user_prompt = AskAgent(prompt="Importar laptops desde China", **fields)
+            request, background = await run_turn(counter, user_prompt, response)
+
+            if turn in (0, TURNS - 1):
+                label = f"{user_kind}, turn {turn + 1}"
+                print(f"{label:<28}{request[0]:>14}{request[1]:>9}{background[0]:>11}{background[1]:>9}")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
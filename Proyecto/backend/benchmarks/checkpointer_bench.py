@@ -0,0 +1,169 @@
+"""
+Conversation checkpointer benchmark.
+
+For conversations of 10, 100 and 1000 turns, measures the per-turn cost of resuming the
+user's thread from the SQLite checkpointer (state read, model node, checkpoint write) against
+rebuilding the context from the `Messages` table and invoking a graph without checkpointer,
+as done before. The model is replaced by an instant fake so only the conversation
+bookkeeping is measured.
+
+Usage:
+    python -m benchmarks.checkpointer_bench
+"""
+
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/checkpointer_bench.db"
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+import src.ai.agent as agent
+from src.database import AsyncSessionLocal, Base, async_engine, engine
+from src.models import Messages, Users
+from src.ai.checkpointer import thread_config
+from src.ai.prompts import history_to_messages
+from src.ai.utils.history import load_history
+
+Base.metadata.create_all(bind=engine)
+
+TURN_COUNTS = [10, 100, 1000]
+
+MEASURED_TURNS = 20
+
+STATELESS_AGENT = agent.build_workflow().compile()
+
+ANSWER = "Información de importación para laptops desde China en México. " * 20
+
+
+class InstantModel:
+    """
+    Chat model stand-in that answers immediately.
+    """
+
+    async def ainvoke(self, messages):
+        return AIMessage(content=ANSWER)
+
+
+def turn_input(index: int) -> dict:
+    """
+    Returns the agent input of one turn.
+
+    Args:
+        index (int): The turn number.
+
+    Returns:
+        dict: The agent input.
+    """
+
+    return {
+        "messages": [HumanMessage(content=f"Pregunta {index} sobre importar laptops desde China")],
+        "language": "es",
+        "summary": "",
+    }
+
+
+async def seed(turns: int):
+    """
+    Creates a user with a conversation of the given length, both as `Messages` rows and as a
+    checkpointed thread.
+
+    Args:
+        turns (int): Number of human/AI turns.
+
+    Returns:
+        UUID: The ID of the created user.
+    """
+
+    user_id = uuid.uuid4()
+
+    async with AsyncSessionLocal() as db:
+        db.add(Users(id=user_id, private_id=f"bench-{turns}"))
+        for index in range(turns):
+            db.add(Messages(user_id=user_id, message={"owner": "human", "message": f"Pregunta {index}"}))
+            db.add(Messages(user_id=user_id, message={"owner": "ai", "message": ANSWER}))
+        await db.commit()
+
+    for index in range(turns):
+        await agent.get_agent().ainvoke(turn_input(index), config=thread_config(user_id))
+
+    return user_id
+
+
+async def rebuild_turn(user_id) -> None:
+    """
+    Runs a turn from the `Messages` table on a graph without checkpointer, as before.
+
+    Args:
+        user_id (UUID): The user ID.
+    """
+
+    async with AsyncSessionLocal() as db:
+        summary, history = await load_history(user_id, db)
+
+    await STATELESS_AGENT.ainvoke(
+        {
+            "messages": history_to_messages(history) + turn_input(0)["messages"],
+            "language": "es",
+            "summary": summary,
+        }
+    )
+
+
+async def resume_turn(user_id) -> None:
+    """
+    Runs a turn on the checkpointed thread.
+
+    Args:
+        user_id (UUID): The user ID.
+    """
+
+    await agent.get_agent().ainvoke(turn_input(0), config=thread_config(user_id))
+
+
+async def measure(turn, user_id) -> float:
+    """
+    Returns the median milliseconds of `MEASURED_TURNS` runs of a turn function.
+
+    Args:
+        turn (Callable): `rebuild_turn` or `resume_turn`.
+        user_id (UUID): The user ID.
+
+    Returns:
+        float: The median latency in milliseconds.
+    """
+
+    timings = []
+    for _ in range(MEASURED_TURNS):
+        start = time.perf_counter()
+        await turn(user_id)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+async def main() -> None:
+    agent.get_model = lambda: InstantModel()
+    await agent.init_checkpointer()
+
+    print(f"{'turns':<8}{'rebuild ms':>12}{'resume ms':>12}{'thread messages':>18}")
+
+    for turns in TURN_COUNTS:
+        user_id = await seed(turns)
+        rebuild = await measure(rebuild_turn, user_id)
+        resume = await measure(resume_turn, user_id)
+        thread = await agent.get_agent().aget_state(thread_config(user_id))
+
+        print(f"{turns:<8}{rebuild:>12.2f}{resume:>12.2f}{len(thread.values['messages']):>18}")
+
+    await agent.close_checkpointer()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""
+Conversation history bytes-on-wire benchmark.
+
+Seeds a 500-turn conversation (1000 messages, with answers shaped like the agent's) in a
+temporary SQLite database and polls `/ai/bot_conversation/{user_email}` through the
+application, reporting the bytes received and the mean latency without compression, with
+gzip, with zstd, and for an unchanged poll revalidated with `If-None-Match` (304).
+
+Usage:
+    python -m benchmarks.conversation_wire_bench
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/conversation_wire_bench.db"
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+
+from fastapi.testclient import TestClient
+
+from src.database import AsyncSessionLocal, Base, engine
+from src.models import Messages, Users
+from src.main import app
+
+Base.metadata.create_all(bind=engine)
+
+TURNS = 500
+
+POLLS = 20
+
+EMAIL = "conversation-wire@example.com"
+
+PRODUCTS = (
+    "audífonos inalámbricos", "laptops", "juguetes de plástico", "cremas faciales", "bicicletas eléctricas",
+    "zapatos deportivos", "cafeteras", "teléfonos móviles", "lámparas LED", "suplementos alimenticios",
+)
+
+COUNTRIES = ("China", "Estados Unidos", "Alemania", "Japón", "Corea del Sur", "Vietnam", "Canadá", "Italia")
+
+NOMS = ("NOM-001-SCFI-2018", "NOM-024-SCFI-2013", "NOM-208-SCFI-2016", "NOM-050-SCFI-2004", "NOM-141-SSA1-2012")
+
+ANSWER = (
+    "**Producto:** {product} modelo {model}\n"
+    "**Fracción arancelaria (HS Code):** {hs_code}\n"
+    "**País de origen:** {country}\n"
+    "**Impuestos:**\n"
+    "- IGI (Tasa Máxima): {igi}%\n"
+    "- IGI (Reducciones aplicables): {reduction}\n"
+    "- IVA: 16%\n"
+    "- DTA: 0.8%\n"
+    "**Regulaciones no arancelarias:** {noms}; COFEPRIS: {cofepris}.\n"
+    "Valor declarado de referencia: USD {value:,.2f} por {units} unidades (lote {lot})."
+)
+
+
+def answer(generator: random.Random) -> str:
+    return ANSWER.format(
+        product=generator.choice(PRODUCTS),
+        model=f"{generator.choice('ABCDEFGHXYZ')}{generator.randint(100, 99999)}",
+        hs_code=f"{generator.randint(1, 97):02d}{generator.randint(1, 99):02d}.{generator.randint(1, 99):02d}.{generator.randint(1, 99):02d}",
+        country=generator.choice(COUNTRIES),
+        igi=generator.choice((0, 5, 10, 15, 20, 35)),
+        reduction=generator.choice(("No aplica", "0% con certificado de origen bajo T-MEC", "5% bajo TIPAT")),
+        noms=", ".join(generator.sample(NOMS, generator.randint(1, 3))),
+        cofepris=generator.choice(("No aplica", "Requiere permiso sanitario")),
+        value=generator.uniform(50, 250000),
+        units=generator.randint(1, 5000),
+        lot=generator.getrandbits(48),
+    )
+
+
+async def seed() -> None:
+    start = datetime.utcnow() - timedelta(days=1)
+    generator = random.Random(0)
+
+    async with AsyncSessionLocal() as db:
+        user = Users(email=EMAIL)
+        db.add(user)
+        await db.flush()
+
+        for turn in range(TURNS):
+            created_at = start + timedelta(seconds=turn * 10)
+            db.add_all([
+                Messages(
+                    user_id=user.id,
+                    message={
+                        "owner": "human",
+                        "message": f"¿Qué necesito para importar {generator.choice(PRODUCTS)} desde {generator.choice(COUNTRIES)}?",
+                        "lang": "es",
+                    },
+                    created_at=created_at,
+                ),
+                Messages(
+                    user_id=user.id,
+                    message={"owner": "ai", "message": answer(generator), "lang": "es"},
+                    created_at=created_at + timedelta(seconds=5),
+                ),
+            ])
+        await db.commit()
+
+
+def poll(client: TestClient, headers: dict) -> tuple:
+    wire_bytes = 0
+    start = time.perf_counter()
+    for _ in range(POLLS):
+        with client.stream("GET", f"/ai/bot_conversation/{EMAIL}", headers=headers) as response:
+            wire_bytes = sum(len(chunk) for chunk in response.iter_raw())
+    return wire_bytes, (time.perf_counter() - start) / POLLS * 1000, response
+
+
+def main() -> None:
+    asyncio.run(seed())
+    print(f"turns={TURNS} messages={TURNS * 2} polls={POLLS}")
+
+    with TestClient(app) as client:
+        identity_bytes, identity_ms, response = poll(client, {"Accept-Encoding": "identity"})
+        etag = response.headers["ETag"]
+        gzip_bytes, gzip_ms, response = poll(client, {"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        zstd_bytes, zstd_ms, response = poll(client, {"Accept-Encoding": "zstd"})
+        assert response.headers["Content-Encoding"] == "zstd"
+        not_modified_bytes, not_modified_ms, response = poll(
+            client, {"Accept-Encoding": "zstd, gzip", "If-None-Match": etag}
+        )
+        assert response.status_code == 304
+
+    for name, wire_bytes, ms in (
+        ("identity", identity_bytes, identity_ms),
+        ("gzip", gzip_bytes, gzip_ms),
+        ("zstd", zstd_bytes, zstd_ms),
+        ("304 If-None-Match", not_modified_bytes, not_modified_ms),
+    ):
+        print(f"{name:18s} {wire_bytes:8d} bytes ({wire_bytes / identity_bytes:6.1%})  {ms:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Accuracy and latency benchmark for language detection.
+
+Compares the bundled local stopword model against the remote GPT-4o-mini call over a small
+labelled corpus of importation prompts. The remote side only runs when `OPENAI_API_KEY` is set.
+
+Usage:
+    python -m benchmarks.detect_language_bench
+"""
+
+import asyncio
+import inspect
+import os
+import statistics
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/detect_language_bench.db"
+
+from src.ai.utils.detect_language import (
+    detect_language,
+    detect_language_local,
+    detect_language_remote,
+)
+from src.ai.utils.http_client import close_http_client
+
+
+CORPUS = [
+    ("¿Qué impuestos pago por importar laptops desde China?", "es"),
+    ("Quiero importar audífonos bluetooth de Estados Unidos", "es"),
+    ("¿Cuál es el código arancelario para zapatos deportivos?", "es"),
+    ("Necesito saber qué NOM aplica a cremas faciales", "es"),
+    ("importar juguetes de plástico desde Japón", "es"),
+    ("¿Cuánto cuesta traer un contenedor de 40 pies?", "es"),
+    ("Hola, me ayudas con la importación de baterías de litio?", "es"),
+    ("Qué requisitos de COFEPRIS tienen los suplementos alimenticios", "es"),
+    ("importar vino tinto de España", "es"),
+    ("precio del agente aduanal para ropa de algodón", "es"),
+    ("What taxes do I pay to import laptops from China?", "en"),
+    ("I want to import bluetooth headphones from the United States", "en"),
+    ("What is the tariff code for running shoes?", "en"),
+    ("Which NOM applies to facial creams?", "en"),
+    ("import plastic toys from Japan", "en"),
+    ("How much does a 40 foot container cost?", "en"),
+    ("Hello, can you help me with importing lithium batteries?", "en"),
+    ("What COFEPRIS requirements do dietary supplements have", "en"),
+    ("import red wine from Spain", "en"),
+    ("customs broker price for cotton clothing", "en"),
+    ("laptops", "en"),
+    ("zapatos", "es"),
+]
+
+
+async def run(detector, label: str) -> None:
+    """
+    Runs a detector over the corpus and prints its accuracy and latency percentiles.
+
+    Args:
+        detector (Callable[[str], str | Awaitable[str]]): Function or coroutine function
+            returning 'en' or 'es' for a text; coroutines are awaited inside the timing.
+        label (str): Name printed next to the results.
+    """
+
+    timings = []
+    hits = 0
+
+    for text, expected in CORPUS:
+        start = time.perf_counter()
+        language = detector(text)
+        if inspect.isawaitable(language):
+            language = await language
+        timings.append((time.perf_counter() - start) * 1000)
+        hits += language == expected
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+
+    print(
+        f"{label:<10} accuracy={hits / len(CORPUS):.2%} "
+        f"mean={statistics.mean(timings):.3f}ms p95={p95:.3f}ms"
+    )
+
+
+async def main() -> None:
+    await run(lambda text: detect_language_local(text)[0], "local")
+
+    if os.getenv("OPENAI_API_KEY"):
+        try:
+            await run(detect_language, "hybrid")
+            await run(detect_language_remote, "remote")
+        finally:
+            await close_http_client()
+    else:
+        print("OPENAI_API_KEY not set, skipping the remote and hybrid detectors")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""
+Excel write-time deduplication benchmark.
+
+Saves product rows for one user the way the chat turns do, with every HS code repeated
+(users ask about the same products again), into a temporary SQLite database, and reports the
+rows stored and the export time with the normalized HS-code insert. For comparison, the same
+saves are appended as plain rows and scanned with the former read-time deduplication (clean
+each HS code, skip the ones already seen), which every export used to pay before rendering.
+
+Usage:
+    python -m benchmarks.excel_dedup_bench
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/excel_dedup_bench.db"
+
+from sqlalchemy import func, select
+
+from src.database import AsyncSessionLocal, Base, async_engine, engine
+from src.models import ExcelInformation, Users
+from src.ai.crud import (
+    excel_information_from_data,
+    excel_information_insert,
+    generate_excel,
+)
+
+Base.metadata.create_all(bind=engine)
+
+DISTINCT_HS_CODES = 1000
+
+SAVES = 20000
+
+
+def product(index: int) -> dict:
+    code = index % DISTINCT_HS_CODES
+    return {
+        "Nombre del Producto": f"Producto de prueba {code}",
+        # Half of the repeats come back in the extraction's former `{"..."}` spelling.
+        "HS Code": f'{{"8471.{code:06d}"}}' if index % 2 else f"8471.{code:06d}",
+        "Origen del País": "China",
+        "Impuestos IGI (Tasa Máxima)": "0%",
+        "Impuestos IGI (Reducciones aplicables)": "T-MEC",
+        "IVA (%)": "16%",
+        "DTA (%)": "0.8%",
+        "NOMs": "",
+        "COFEPRIS": "No Aplica",
+    }
+
+
+async def create_user(email: str):
+    async with AsyncSessionLocal() as db:
+        user = Users(email=email)
+        db.add(user)
+        await db.commit()
+        return user.id
+
+
+async def main() -> None:
+    print(f"saves={SAVES} distinct_hs_codes={DISTINCT_HS_CODES}")
+
+    insert_user = await create_user("dedup-insert@example.com")
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for index in range(SAVES):
+            await db.execute(excel_information_insert(insert_user, product(index), "sqlite"))
+        await db.commit()
+    write_seconds = time.perf_counter() - start
+
+    # Appended rows need a batch ID to stay outside the unique index.
+    append_user = await create_user("dedup-append@example.com")
+    async with AsyncSessionLocal() as db:
+        db.add_all([excel_information_from_data(append_user, product(index), uuid.uuid4()) for index in range(SAVES)])
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        stored = await db.scalar(
+            select(func.count()).select_from(ExcelInformation).where(ExcelInformation.user_id == insert_user)
+        )
+
+        start = time.perf_counter()
+        await generate_excel(insert_user, db)
+        export_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        seen_hs_codes = set()
+        result = await db.stream(select(ExcelInformation.hs_code).where(ExcelInformation.user_id == append_user))
+        async for (hs_code,) in result:
+            seen_hs_codes.add(hs_code.replace("{", "").replace("}", "").replace('"', ""))
+        scan_seconds = time.perf_counter() - start
+
+    print(f"insert: rows_stored={stored} export={export_seconds:.2f}s")
+    print(f"append: rows_stored={SAVES} read-time dedup scan alone={scan_seconds:.2f}s -> {len(seen_hs_codes)} codes")
+
+    print(f"insert write time: {write_seconds:.2f}s ({write_seconds / SAVES * 1e6:.0f}us per save)")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
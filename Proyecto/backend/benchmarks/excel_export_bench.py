@@ -0,0 +1,128 @@
+"""
+Excel export benchmark.
+
+Seeds a temporary SQLite database with product rows for one user and measures the time and
+peak Python memory of `generate_excel` for increasing row counts, and the longest stall of
+the event loop while an export runs (other requests wait at most that long).
+
+Usage:
+    python -m benchmarks.excel_export_bench
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/excel_bench.db"
+
+from src.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from src.models import ExcelInformation, Users
+from src.ai.crud import generate_excel
+
+Base.metadata.create_all(bind=engine)
+
+ROW_COUNTS = [1000, 5000, 20000]
+
+
+def seed(db, user_email: str, rows: int):
+    """
+    Creates a user with the given number of distinct product rows.
+
+    Args:
+        db (Session): The database session.
+        user_email (str): The email of the user to create.
+        rows (int): Number of product rows to insert.
+
+    Returns:
+        UUID: The ID of the created user.
+    """
+
+    user = Users(email=user_email)
+    db.add(user)
+    db.commit()
+
+    db.bulk_insert_mappings(
+        ExcelInformation,
+        [
+            {
+                "user_id": user.id,
+                "product_name": f"Producto de prueba {index}",
+                "hs_code": f"8471.30.{index:06d}",
+                "from_country": "China",
+                "cofepris": "No Aplica",
+                "igi_max": "0%",
+                "igi_reductions": "T-MEC",
+                "iva": "16%",
+                "dta": "0.8%",
+                "noms": "['NOM-019-SCFI-1998 (Equipos de procesamiento de datos)']",
+            }
+            for index in range(rows)
+        ],
+    )
+    db.commit()
+
+    return user.id
+
+
+async def export_with_loop_stall(user_id) -> tuple[float, float]:
+    """
+    Runs one export while a ticker measures how long the event loop is blocked.
+
+    Args:
+        user_id (UUID): The ID of the user to export.
+
+    Returns:
+        tuple[float, float]: The export time and the longest loop stall, in seconds.
+    """
+
+    longest_stall = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal longest_stall
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            longest_stall = max(longest_stall, time.perf_counter() - start - 0.001)
+
+    ticker_task = asyncio.create_task(ticker())
+
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await generate_excel(user_id, db)
+    elapsed = time.perf_counter() - start
+
+    done.set()
+    await ticker_task
+
+    return elapsed, longest_stall
+
+
+async def main() -> None:
+    db = SessionLocal()
+
+    for rows in ROW_COUNTS:
+        user_email = f"bench-{rows}@example.com"
+        user_id = seed(db, user_email, rows)
+
+        elapsed, longest_stall = await export_with_loop_stall(user_id)
+
+        tracemalloc.start()
+        async with AsyncSessionLocal() as async_db:
+            output = await generate_excel(user_id, async_db)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(
+            f"rows={rows:<6} time={elapsed:.2f}s loop_stall={longest_stall * 1000:.1f}ms "
+            f"peak_python_memory={peak / 1e6:.1f}MB xlsx_size={len(output.getvalue()) / 1e6:.2f}MB"
+        )
+
+    db.close()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
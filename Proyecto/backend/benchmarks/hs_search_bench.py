@@ -0,0 +1,66 @@
+"""
+HS-code search benchmark.
+
+Builds a BM25 index over synthetic documents the size of the TIGIE (about 13,000 fractions)
+and measures the build time and the latency of product-name queries.
+
+Usage:
+    python -m benchmarks.hs_search_bench
+"""
+
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/hs_search_bench.db"
+
+from src.ai.utils.hs_search import BM25Index
+
+FRACTIONS = 13000
+
+QUERIES = 2000
+
+VOCABULARY = (
+    "audífonos auriculares bluetooth inalámbricos batería litio laptop computadora portátil "
+    "calzado deportivo suela caucho tenis camiseta algodón poliéster juguete plástico muñeca "
+    "reloj pulsera inteligente teléfono celular cargador cable usb lámpara led bombilla silla "
+    "mesa madera metal acero aluminio bolsa cuero mochila tela vidrio botella cerámica taza "
+    "headphones wireless battery lithium shoes cotton plastic toy watch phone charger lamp chair"
+).split()
+
+
+def description(words: int) -> str:
+    """
+    Returns a random product description.
+
+    Args:
+        words (int): Number of words.
+
+    Returns:
+        str: The description.
+    """
+
+    return " ".join(random.choice(VOCABULARY) for _ in range(words))
+
+
+if __name__ == "__main__":
+    random.seed(7)
+
+    documents = [(f"{random.randint(10000000, 97999999)}", description(8)) for _ in range(FRACTIONS)]
+    queries = [description(random.randint(1, 4)) for _ in range(QUERIES)]
+
+    start = time.perf_counter()
+    index = BM25Index(documents)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k=5)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    print(f"documents={len(index)} build={build_ms:.1f}ms")
+    print(f"search p50={statistics.median(timings):.2f}ms p95={timings[int(len(timings) * 0.95)]:.2f}ms")
@@ -0,0 +1,72 @@
+"""
+Import-time (cold start) benchmark.
+
+Imports `src.main` in fresh interpreters under `python -X importtime` and reports the median
+total import time, the heaviest top-level packages, whether the lazily imported modules
+(openpyxl, langchain_openai) were loaded, and whether the import touched the database.
+
+Usage:
+    python -m benchmarks.import_time_bench
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+RUNS = 5
+
+TOP_PACKAGES = 12
+
+LAZY_MODULES = ("openpyxl", "langchain_openai")
+
+
+def import_times(database_path: str) -> dict[str, int]:
+    """
+    Imports `src.main` in a new interpreter and returns the cumulative import time per module.
+
+    Args:
+        database_path (str): SQLite file used as `DATABASE_URL`; it should stay untouched.
+
+    Returns:
+        dict[str, int]: Cumulative microseconds per imported module.
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.main"],
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{database_path}", "OPENAI_API_KEY": "benchmark-key"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        times[module.strip()] = int(cumulative)
+
+    return times
+
+
+if __name__ == "__main__":
+    database_path = os.path.join(tempfile.mkdtemp(), "import_bench.db")
+    runs = [import_times(database_path) for _ in range(RUNS)]
+
+    package_times = defaultdict(list)
+    for times in runs:
+        for module, cumulative in times.items():
+            if "." not in module:
+                package_times[module].append(cumulative)
+
+    print(f"src.main import: median {statistics.median(run['src.main'] for run in runs) / 1000:.0f}ms over {RUNS} runs")
+    print(f"database touched at import: {os.path.exists(database_path)}")
+    print(f"lazy modules loaded at import: {[module for module in LAZY_MODULES if module in runs[0]] or 'none'}")
+    print("heaviest top-level packages (median cumulative ms):")
+
+    heaviest = sorted(package_times.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for package, timings in heaviest[:TOP_PACKAGES]:
+        print(f"  {package:<28}{statistics.median(timings) / 1000:>8.0f}")
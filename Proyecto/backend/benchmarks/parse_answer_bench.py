@@ -0,0 +1,66 @@
+"""
+Structured answer extraction benchmark.
+
+Measures the local template parser over the answer corpus used by its tests and, when
+`OPENAI_API_KEY` is set, the GPT-4o-mini extraction it replaces.
+
+Usage:
+    python -m benchmarks.parse_answer_bench
+"""
+
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/parse_bench.db")
+
+from src.ai.crud import get_data
+from src.ai.utils.parse_answer import parse_import_answer
+from src.ai.utils.parse_answer_test import CORPUS
+
+ITERATIONS = 2000
+
+
+def bench_local() -> None:
+    """
+    Prints the accuracy and mean latency of the local parser over the corpus.
+    """
+
+    hits = sum(parse_import_answer(response) == expected for response, expected in CORPUS)
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for response, _ in CORPUS:
+            parse_import_answer(response)
+    mean_us = (time.perf_counter() - start) / (ITERATIONS * len(CORPUS)) * 1e6
+
+    print(f"local   accuracy={hits}/{len(CORPUS)} mean={mean_us:.1f}us")
+
+
+async def bench_remote() -> None:
+    """
+    Prints the mean latency of the GPT-4o-mini extraction over the corpus.
+    """
+
+    import src.ai.crud as crud
+
+    crud.parse_import_answer = lambda response: None
+    timings = []
+
+    for response, _ in CORPUS:
+        start = time.perf_counter()
+        await get_data(response, [], "No Aplica")
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(f"remote  mean={statistics.mean(timings):.0f}ms")
+
+
+if __name__ == "__main__":
+    bench_local()
+
+    if os.getenv("OPENAI_API_KEY"):
+        asyncio.run(bench_remote())
+    else:
+        print("OPENAI_API_KEY not set, skipping the remote extraction")
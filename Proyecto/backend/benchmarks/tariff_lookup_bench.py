@@ -0,0 +1,78 @@
+"""
+Tariff index benchmark.
+
+Writes a synthetic tariff table the size of the TIGIE (about 13,000 fractions) and measures
+the load time and the latency of exact lookups, prefix scans and HS-code detection in prompts.
+
+Usage:
+    python -m benchmarks.tariff_lookup_bench
+"""
+
+import csv
+import os
+import random
+import tempfile
+import time
+
+from src.ai.utils.tariff import format_hs_code, load_tariff_index
+
+FRACTIONS = 13000
+
+ITERATIONS = 100000
+
+
+def write_table(path: str) -> list[str]:
+    """
+    Writes a synthetic tariff CSV.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        list[str]: The dotted codes written.
+    """
+
+    random.seed(7)
+    codes = sorted({f"{random.randint(100000, 979999):06d}{random.randint(0, 99):02d}" for _ in range(FRACTIONS)})
+
+    with open(path, "w", newline="", encoding="utf-8") as tariff_file:
+        writer = csv.writer(tariff_file)
+        writer.writerow(["fraccion", "descripcion", "igi", "iva", "dta"])
+        for code in codes:
+            writer.writerow([format_hs_code(code), f"Mercancía {code}", random.choice([0, 5, 10, 15, 20]), 16, 0.8])
+
+    return [format_hs_code(code) for code in codes]
+
+
+def per_call_us(function, arguments: list) -> float:
+    """
+    Returns the mean microseconds per call of a function over cycling arguments.
+
+    Args:
+        function (Callable): The function to time.
+        arguments (list): The arguments, cycled.
+
+    Returns:
+        float: Mean microseconds per call.
+    """
+
+    start = time.perf_counter()
+    for index in range(ITERATIONS):
+        function(arguments[index % len(arguments)])
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+if __name__ == "__main__":
+    path = os.path.join(tempfile.mkdtemp(), "tariff.csv")
+    codes = write_table(path)
+
+    start = time.perf_counter()
+    tariff_index = load_tariff_index(path)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    prompts = [f"Quiero importar mercancía con fracción {code} desde China" for code in codes[:1000]]
+
+    print(f"fractions={len(tariff_index)} load={load_ms:.1f}ms")
+    print(f"get          {per_call_us(tariff_index.get, codes):.2f}us")
+    print(f"prefix(4)    {per_call_us(lambda code: tariff_index.prefix(code[:4]), codes):.2f}us")
+    print(f"find_in_text {per_call_us(tariff_index.find_in_text, prompts):.2f}us")
@@ -0,0 +1,172 @@
+"""
+Multi-worker throughput benchmark.
+
+Starts the server with `python -m src.main` at 1, 2, 4 and 8 worker processes (on a SQLite
+database migrated with Alembic and a synthetic tariff table the size of the TIGIE) and
+drives `/ai/hs-search` from several client processes for a fixed time, reporting the
+throughput and the latency percentiles of each configuration.
+
+The server and the clients share the machine, so the scaling levels off at its CPU count.
+
+Usage:
+    python -m benchmarks.workers_bench
+"""
+
+import asyncio
+import csv
+import multiprocessing
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+CLIENT_PROCESSES = 4
+
+CONCURRENCY = 16
+
+DURATION_SECONDS = 5
+
+FRACTIONS = 13000
+
+PORT = 8791
+
+VOCABULARY = (
+    "audífonos auriculares bluetooth inalámbricos batería litio laptop computadora portátil "
+    "calzado deportivo suela caucho tenis camiseta algodón poliéster juguete plástico muñeca "
+    "reloj pulsera inteligente teléfono celular cargador cable usb lámpara led bombilla silla"
+).split()
+
+
+def write_tariff_table(path: str) -> None:
+    """
+    Writes a synthetic tariff table.
+
+    Args:
+        path (str): The CSV file path.
+    """
+
+    with open(path, "w", newline="", encoding="utf-8") as tariff_file:
+        writer = csv.writer(tariff_file)
+        writer.writerow(["hs_code", "description", "igi"])
+        for _ in range(FRACTIONS):
+            writer.writerow([
+                f"{random.randint(10000000, 97999999)}",
+                " ".join(random.choice(VOCABULARY) for _ in range(8)),
+                random.choice(["0", "5", "10", "15", "20"]),
+            ])
+
+
+def wait_until_ready(base_url: str, workers: int, timeout: float = 120) -> None:
+    """
+    Waits until every worker has built its search index.
+
+    Args:
+        base_url (str): The server URL.
+        workers (int): The number of worker processes.
+        timeout (float): Seconds before giving up.
+
+    Raises:
+        TimeoutError: If the server does not answer in time.
+    """
+
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        try:
+            for _ in range(workers * 20):
+                httpx.get(f"{base_url}/ai/hs-search", params={"q": "laptop"}, timeout=30).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.5)
+
+    raise TimeoutError("The server did not start")
+
+
+async def drive(base_url: str, seed: int) -> list[float]:
+    """
+    Sends search requests with `CONCURRENCY` concurrent tasks for `DURATION_SECONDS`.
+
+    Args:
+        base_url (str): The server URL.
+        seed (int): Seed of the random queries.
+
+    Returns:
+        list[float]: The latency of each request, in milliseconds.
+    """
+
+    rng = random.Random(seed)
+    latencies = []
+    deadline = time.monotonic() + DURATION_SECONDS
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+
+        async def task():
+            while time.monotonic() < deadline:
+                query = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(1, 3)))
+                start = time.perf_counter()
+                response = await client.get("/ai/hs-search", params={"q": query})
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*(task() for _ in range(CONCURRENCY)))
+
+    return latencies
+
+
+def client_process(args: tuple) -> list[float]:
+    return asyncio.run(drive(*args))
+
+
+if __name__ == "__main__":
+    random.seed(7)
+    directory = tempfile.mkdtemp()
+    base_url = f"http://127.0.0.1:{PORT}"
+
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{directory}/workers_bench.db",
+        TARIFF_TABLE_PATH=os.path.join(directory, "tariff.csv"),
+        SHARED_CACHE_PATH=os.path.join(directory, "cache.sqlite3"),
+        PORT=str(PORT),
+    )
+
+    write_tariff_table(env["TARIFF_TABLE_PATH"])
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], env=env, check=True, capture_output=True)
+
+    print(f"cpus={os.cpu_count()} clients={CLIENT_PROCESSES}x{CONCURRENCY} duration={DURATION_SECONDS}s")
+    print(f"{'workers':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+
+    for workers in WORKER_COUNTS:
+        worker_env = dict(env, WEB_CONCURRENCY=str(workers))
+        if workers > 1:
+            worker_env["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(directory, f"metrics-{workers}")
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "src.main"],
+            env=worker_env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        try:
+            wait_until_ready(base_url, workers)
+
+            with multiprocessing.Pool(CLIENT_PROCESSES) as pool:
+                results = pool.map(client_process, [(base_url, seed) for seed in range(CLIENT_PROCESSES)])
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+        latencies = sorted(latency for result in results for latency in result)
+        print(
+            f"{workers:<10}{len(latencies) / DURATION_SECONDS:>10.0f}"
+            f"{statistics.median(latencies):>10.1f}{latencies[int(len(latencies) * 0.99)]:>10.1f}"
+        )
@@ -0,0 +1,98 @@
+"""
+Cached XLSX export benchmark.
+
+Seeds one user with product rows in a temporary SQLite database and downloads
+`/ai/get_excel/` repeatedly through the application: the first download renders the
+workbook, the following ones are served from the XLSX cache, and the ones sending the ETag
+back in `If-None-Match` get an empty 304. A saved row then invalidates the cached workbook.
+Reports the mean latency and bytes sent of each kind of download.
+
+Usage:
+    python -m benchmarks.xlsx_cache_bench
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/xlsx_cache_bench.db"
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+
+from fastapi.testclient import TestClient
+
+from src.database import AsyncSessionLocal, Base, engine
+from src.models import Users
+from src.main import app
+from src.ai.crud import excel_information_from_data, save_data_into_db
+
+Base.metadata.create_all(bind=engine)
+
+ROWS = 2000
+
+DOWNLOADS = 50
+
+EMAIL = "xlsx-cache@example.com"
+
+
+def product(index: int) -> dict:
+    return {
+        "Nombre del Producto": f"Producto de prueba {index}",
+        "HS Code": f"8471.{index:06d}",
+        "Origen del País": "China",
+        "Impuestos IGI (Tasa Máxima)": "0%",
+        "Impuestos IGI (Reducciones aplicables)": "T-MEC",
+        "IVA (%)": "16%",
+        "DTA (%)": "0.8%",
+        "NOMs": "",
+        "COFEPRIS": "No Aplica",
+    }
+
+
+async def seed():
+    async with AsyncSessionLocal() as db:
+        user = Users(email=EMAIL)
+        db.add(user)
+        await db.flush()
+        db.add_all([excel_information_from_data(user.id, product(index)) for index in range(ROWS)])
+        await db.commit()
+        return user.id
+
+
+async def save_row(user_id):
+    async with AsyncSessionLocal() as db:
+        await save_data_into_db(user_id, product(ROWS), db)
+
+
+def measure(client: TestClient, runs: int, headers: dict | None = None) -> tuple:
+    sent = 0
+    start = time.perf_counter()
+    for _ in range(runs):
+        response = client.get("/ai/get_excel/", params={"user_email": EMAIL}, headers=headers or {})
+        sent += len(response.content)
+    return (time.perf_counter() - start) / runs * 1000, sent // runs, response
+
+
+def main() -> None:
+    user_id = asyncio.run(seed())
+    print(f"rows={ROWS} downloads={DOWNLOADS}")
+
+    with TestClient(app) as client:
+        cold_ms, cold_bytes, response = measure(client, 1)
+        etag = response.headers["ETag"]
+        cached_ms, cached_bytes, _ = measure(client, DOWNLOADS)
+        not_modified_ms, not_modified_bytes, response = measure(client, DOWNLOADS, {"If-None-Match": etag})
+        assert response.status_code == 304
+
+        asyncio.run(save_row(user_id))
+        invalidated_ms, _, response = measure(client, 1, {"If-None-Match": etag})
+        assert response.status_code == 200 and response.headers["ETag"] != etag
+
+    print(f"render (cold)        {cold_ms:8.2f} ms  {cold_bytes:7d} bytes")
+    print(f"cached               {cached_ms:8.2f} ms  {cached_bytes:7d} bytes")
+    print(f"304 If-None-Match    {not_modified_ms:8.2f} ms  {not_modified_bytes:7d} bytes")
+    print(f"render (after save)  {invalidated_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
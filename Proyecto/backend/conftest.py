@@ -0,0 +1,14 @@
+import os
+
+import pytest
+from alembic import command
+from alembic.config import Config
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    """
+    Brings the test database (`DATABASE_URL`) to the latest migration before any test runs.
+    """
+
+    command.upgrade(Config(os.path.join(os.path.dirname(__file__), "alembic.ini")), "head")
@@ -0,0 +1,14 @@
+#!/bin/sh
+# Entrypoint of the Naurat Importation Bot API image.
+#
+# Upgrades the database schema (`alembic upgrade head`) before running the given command,
+# the API server by default, so a new release never starts against an old schema. Set
+# `RUN_MIGRATIONS=0` when the platform runs the upgrade as a separate release step (e.g.
+# several replicas starting at once).
+set -e
+
+if [ "${RUN_MIGRATIONS:-1}" = "1" ]; then
+    alembic upgrade head
+fi
+
+exec "$@"
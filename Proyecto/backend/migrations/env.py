@@ -0,0 +1,69 @@
+"""
+Alembic environment of the Naurat Importation Bot API.
+
+Migrations run against the synchronous engine of `src.database`, so they use the same
+`DATABASE_URL` as the application, and compare against the metadata of `src.models`. A
+connection passed in `config.attributes["connection"]` (e.g. by a test) is used instead.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+
+from src.database import Base, engine
+import src.models  # noqa: F401  (registers the tables on Base.metadata)
+
+
+if context.config.config_file_name is not None:
+    fileConfig(context.config.config_file_name, disable_existing_loggers=False)
+
+
+def run_migrations_offline() -> None:
+    """
+    Emits the migration SQL without connecting to the database (`alembic upgrade --sql`).
+    """
+
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=Base.metadata,
+        literal_binds=True,
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """
+    Applies the migrations over a connection of the application engine, or the given one.
+    """
+
+    connection = context.config.attributes.get("connection")
+    if connection is not None:
+        migrate(connection)
+        return
+
+    with engine.connect() as connection:
+        migrate(connection)
+
+
+def migrate(connection) -> None:
+    """
+    Applies the migrations over a connection.
+    """
+
+    context.configure(
+        connection=connection,
+        target_metadata=Base.metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,71 @@
+import os
+import uuid
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, text
+
+from src.database import Base, engine
+import src.models  # noqa: F401
+
+
+def test_migrations_match_the_models():
+    with engine.connect() as connection:
+        # SQLite reflects UUID columns as NUMERIC, so only PostgreSQL compares column types.
+        context = MigrationContext.configure(
+            connection, opts={"compare_type": connection.dialect.name != "sqlite"}
+        )
+        differences = compare_metadata(context, Base.metadata)
+
+    assert differences == []
+
+
+def test_hs_code_dedup_migration_keeps_oldest_conversation_row(tmp_path):
+    config = Config(os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini"))
+    temporary_engine = create_engine(f"sqlite:///{tmp_path}/dedup.db")
+    user_id, batch_id = uuid.uuid4(), uuid.uuid4()
+
+    def product(hs_code, created_at, batch=None):
+        return {
+            "id": uuid.uuid4().hex, "user_id": user_id.hex, "product_name": f"{hs_code} {created_at}",
+            "hs_code": hs_code, "from_country": "China", "cofepris": "No Aplica", "igi_max": "0%",
+            "igi_reductions": "", "iva": "16%", "dta": "0.8%", "noms": "", "created_at": created_at,
+            "batch_id": batch.hex if batch else None,
+        }
+
+    with temporary_engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "0003")
+
+        connection.execute(
+            text(
+                "INSERT INTO excel_information (id, user_id, product_name, hs_code, from_country, cofepris, "
+                "igi_max, igi_reductions, iva, dta, noms, created_at, batch_id) VALUES (:id, :user_id, "
+                ":product_name, :hs_code, :from_country, :cofepris, :igi_max, :igi_reductions, :iva, :dta, "
+                ":noms, :created_at, :batch_id)"
+            ),
+            [
+                product('{"8471.30.01"}', "2026-01-01 00:00:00"),
+                product("8471.30.01", "2026-01-02 00:00:00"),
+                product("8471.30.01", "2026-01-03 00:00:00", batch_id),
+                product("8471.30.01", "2026-01-04 00:00:00", batch_id),
+                product("8507.60.99", "2026-01-01 00:00:00"),
+            ],
+        )
+
+        command.upgrade(config, "head")
+
+        rows = connection.execute(
+            text("SELECT product_name, hs_code, hs_code_normalized, batch_id FROM excel_information ORDER BY product_name")
+        ).all()
+
+    temporary_engine.dispose()
+
+    assert [(row[0], row[1], row[2], row[3] is None) for row in rows] == [
+        ("8471.30.01 2026-01-03 00:00:00", "8471.30.01", "84713001", False),
+        ("8471.30.01 2026-01-04 00:00:00", "8471.30.01", "84713001", False),
+        ("8507.60.99 2026-01-01 00:00:00", "8507.60.99", "85076099", True),
+        ("{\"8471.30.01\"} 2026-01-01 00:00:00", "8471.30.01", "84713001", True),
+    ]
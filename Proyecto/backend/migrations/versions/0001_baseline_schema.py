@@ -0,0 +1,69 @@
+"""
+Baseline schema: users, messages and excel_information.
+
+Databases created by the former `Base.metadata.create_all` call at import time already have
+these tables, so they are only created when missing and such databases upgrade in place.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Offline (`--sql`) runs cannot inspect the database and emit the full schema.
+    existing_tables = (
+        set() if op.get_context().as_sql else set(sa.inspect(op.get_bind()).get_table_names())
+    )
+
+    if "users" not in existing_tables:
+        op.create_table(
+            "users",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("google_id", sa.String(), nullable=True, unique=True),
+            sa.Column("email", sa.String(), nullable=True, unique=True),
+            sa.Column("private_id", sa.String(), nullable=True, unique=True),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+
+    if "messages" not in existing_tables:
+        op.create_table(
+            "messages",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("message", sa.JSON(), nullable=False),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+
+    if "excel_information" not in existing_tables:
+        op.create_table(
+            "excel_information",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("product_name", sa.String(), nullable=False),
+            sa.Column("hs_code", sa.String(), nullable=False),
+            sa.Column("from_country", sa.String(), nullable=False),
+            sa.Column("cofepris", sa.String(), nullable=False),
+            sa.Column("igi_max", sa.String(), nullable=False),
+            sa.Column("igi_reductions", sa.String(), nullable=False),
+            sa.Column("iva", sa.String(), nullable=False),
+            sa.Column("dta", sa.String(), nullable=False),
+            sa.Column("noms", sa.String(), nullable=False),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("excel_information")
+    op.drop_table("messages")
+    op.drop_table("users")
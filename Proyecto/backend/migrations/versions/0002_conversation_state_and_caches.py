@@ -0,0 +1,68 @@
+"""
+Conversation paging index, pending extraction counter, summaries and response cache.
+
+Adds the schema introduced since the baseline: the `(user_id, created_at)` index on
+`messages`, `users.pending_extractions`, and the `conversation_summaries` and
+`response_cache` tables. Objects already created by the former `create_all` call are kept;
+`create_all` never added columns, so `pending_extractions` is missing on such databases.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Offline (`--sql`) runs cannot inspect the database and emit every change.
+    offline = op.get_context().as_sql
+    inspector = None if offline else sa.inspect(op.get_bind())
+    existing_tables = set() if offline else set(inspector.get_table_names())
+    user_columns = set() if offline else {column["name"] for column in inspector.get_columns("users")}
+    message_indexes = set() if offline else {index["name"] for index in inspector.get_indexes("messages")}
+
+    if "pending_extractions" not in user_columns:
+        with op.batch_alter_table("users") as batch_op:
+            batch_op.add_column(
+                sa.Column("pending_extractions", sa.Integer(), nullable=False, server_default="0")
+            )
+
+    if "ix_messages_user_id_created_at" not in message_indexes:
+        op.create_index("ix_messages_user_id_created_at", "messages", ["user_id", "created_at"])
+
+    if "conversation_summaries" not in existing_tables:
+        op.create_table(
+            "conversation_summaries",
+            sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("summary", sa.Text(), nullable=False),
+            sa.Column("summarized_count", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+
+    if "response_cache" not in existing_tables:
+        op.create_table(
+            "response_cache",
+            sa.Column("key", sa.String(64), primary_key=True),
+            sa.Column("response", sa.Text(), nullable=False),
+            sa.Column("expires_at", sa.TIMESTAMP(), nullable=False),
+            sa.Column("last_used_at", sa.TIMESTAMP(), nullable=False),
+        )
+        op.create_index("ix_response_cache_last_used_at", "response_cache", ["last_used_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_response_cache_last_used_at", table_name="response_cache")
+    op.drop_table("response_cache")
+    op.drop_table("conversation_summaries")
+    op.drop_index("ix_messages_user_id_created_at", table_name="messages")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("pending_extractions")
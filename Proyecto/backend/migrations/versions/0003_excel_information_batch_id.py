@@ -0,0 +1,32 @@
+"""
+Batch classification identifier of the extracted product rows.
+
+Adds the nullable, indexed `excel_information.batch_id` column, set on the rows written by a
+batch classification so its workbook can be exported on its own.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("excel_information") as batch_op:
+        batch_op.add_column(sa.Column("batch_id", UUID(as_uuid=True), nullable=True))
+        batch_op.create_index("ix_excel_information_batch_id", ["batch_id"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("excel_information") as batch_op:
+        batch_op.drop_index("ix_excel_information_batch_id")
+        batch_op.drop_column("batch_id")
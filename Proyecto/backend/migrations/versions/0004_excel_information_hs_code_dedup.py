@@ -0,0 +1,103 @@
+"""
+Write-time deduplication of the extracted product rows by normalized HS code.
+
+Adds `excel_information.hs_code_normalized` and the partial unique index on
+`(user_id, hs_code_normalized)` over the rows without `batch_id`. Existing rows get their HS
+code cleaned of the `{`, `}` and `"` characters the extraction used to leave, and duplicate
+conversation rows of a user are reduced to the oldest one, which is the row the former
+read-time deduplication exported and the one the insert keeps. The rows are rewritten in Python, so this revision cannot run offline (`--sql`).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+import re
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+CHUNK_SIZE = 500
+
+
+def normalize(hs_code: str) -> str:
+    # Frozen copy of `src.models.normalize_excel_hs_code` at this revision.
+    digits = re.sub(r"\D", "", hs_code)
+    return digits or " ".join(hs_code.casefold().split())
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql:
+        raise RuntimeError("Revision 0004 rewrites existing rows and must run against the database")
+
+    with op.batch_alter_table("excel_information") as batch_op:
+        batch_op.add_column(sa.Column("hs_code_normalized", sa.String(), nullable=True))
+
+    table = sa.table(
+        "excel_information",
+        sa.column("id", UUID(as_uuid=True)),
+        sa.column("user_id", UUID(as_uuid=True)),
+        sa.column("hs_code", sa.String()),
+        sa.column("hs_code_normalized", sa.String()),
+        sa.column("batch_id", UUID(as_uuid=True)),
+        sa.column("created_at", sa.TIMESTAMP()),
+    )
+    bind = op.get_bind()
+
+    rows = bind.execute(
+        sa.select(table.c.id, table.c.user_id, table.c.hs_code, table.c.batch_id)
+        .order_by(table.c.created_at)
+    ).all()
+
+    kept = set()
+    duplicates = []
+    updates = defaultdict(list)
+
+    for row in rows:
+        hs_code = (row.hs_code or "").replace("{", "").replace("}", "").replace('"', "").strip()
+        key = normalize(hs_code)
+
+        if row.batch_id is None:
+            if (row.user_id, key) in kept:
+                duplicates.append(row.id)
+                continue
+            kept.add((row.user_id, key))
+
+        updates[(hs_code, key)].append(row.id)
+
+    for start in range(0, len(duplicates), CHUNK_SIZE):
+        bind.execute(table.delete().where(table.c.id.in_(duplicates[start:start + CHUNK_SIZE])))
+
+    for (hs_code, key), ids in updates.items():
+        for start in range(0, len(ids), CHUNK_SIZE):
+            bind.execute(
+                table.update()
+                .where(table.c.id.in_(ids[start:start + CHUNK_SIZE]))
+                .values(hs_code=hs_code, hs_code_normalized=key)
+            )
+
+    with op.batch_alter_table("excel_information") as batch_op:
+        batch_op.alter_column("hs_code_normalized", existing_type=sa.String(), nullable=False)
+
+    op.create_index(
+        "uq_excel_information_user_id_hs_code",
+        "excel_information",
+        ["user_id", "hs_code_normalized"],
+        unique=True,
+        postgresql_where=sa.text("batch_id IS NULL"),
+        sqlite_where=sa.text("batch_id IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_excel_information_user_id_hs_code", table_name="excel_information")
+    with op.batch_alter_table("excel_information") as batch_op:
+        batch_op.drop_column("hs_code_normalized")
@@ -0,0 +1,30 @@
+"""
+Version counter of the user's conversation workbook.
+
+Adds `users.excel_version`, incremented whenever a product row of the user's conversation
+is written, so cached `products.xlsx` workbooks and their ETags are invalidated on every
+worker without comparing the rows.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("excel_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("excel_version")
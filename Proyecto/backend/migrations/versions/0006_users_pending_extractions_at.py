@@ -0,0 +1,30 @@
+"""
+Expiry of the pending extraction count.
+
+Adds `users.pending_extractions_at`, the time of the user's last queued Excel data
+extraction. Extraction jobs live in the workers' memory, so a count left behind by jobs
+lost with their worker is ignored once it is older than `EXTRACTION_PENDING_TIMEOUT`.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("pending_extractions_at", sa.TIMESTAMP(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("pending_extractions_at")
@@ -0,0 +1,188 @@
+"""
+Agent module for the Naurat Importation Bot API.
+
+This module owns the LangGraph workflow that answers importation questions.
+
+Features:
+- Builds a single shared `ChatOpenAI` client, so every request reuses one HTTP connection pool.
+  Token usage is reported for streamed generations too and recorded in the metrics.
+- Compiles the LangGraph workflow once and reuses it across requests; per-request data
+  (the new prompt, language and summary) is passed at invocation time.
+- Each user has a durable conversation thread in the checkpointer opened at application
+  startup, so a turn only sends the new prompt and the graph resumes the stored messages.
+  Without it (e.g. in scripts) an in-memory checkpointer is used.
+- The model node sends the prebuilt system prompt, the rolling summary, the tariff facts of
+  the prompt and the newest thread messages that fit `HISTORY_TOKEN_BUDGET`, and drops messages beyond `HISTORY_MAX_MESSAGES`
+  from the thread so checkpoints stay bounded.
+- `answer_prompt` answers a single prompt with the same system prompt and facts, outside any
+  conversation thread (e.g. for batch classification).
+
+Environment Variables:
+- `OPENAI_API_KEY`: The API key required to authenticate requests to OpenAI.
+"""
+
+import os
+from contextlib import AsyncExitStack
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from langchain_core.messages import HumanMessage, RemoveMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import START, MessagesState, StateGraph
+
+from src.metrics import record_token_usage
+from src.ai.checkpointer import open_checkpointer
+from src.ai.prompts import build_agent_messages
+from src.ai.utils.history import (
+    HISTORY_MAX_MESSAGES,
+    HISTORY_TOKEN_BUDGET,
+    select_recent_chat_messages,
+)
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+AGENT_MODEL = "chatgpt-4o-latest"
+
+_checkpointer = None
+
+_checkpointer_stack = AsyncExitStack()
+
+
+class AgentState(MessagesState):
+    """
+    State of a user's conversation thread.
+
+    Attributes:
+        messages (list[BaseMessage]): The recent conversation, ending with the current prompt.
+        language (str): The language of the current prompt ('en' or 'es').
+        summary (str): The rolling summary of the turns no longer kept in `messages`.
+        facts (str): Tariff table facts for the HS codes in the current prompt.
+    """
+
+    language: str
+    summary: str
+    facts: str
+
+
+@lru_cache(maxsize=1)
+def get_model() -> "ChatOpenAI":
+    """
+    Returns the shared chat model client used by the agent.
+
+    `langchain_openai` (and the OpenAI SDK) take about a second to import, so they are only
+    imported when the first answer is generated rather than at process start.
+
+    Returns:
+        ChatOpenAI: The chat model client.
+    """
+
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=AGENT_MODEL,
+        temperature=1,
+        api_key=os.getenv("OPENAI_API_KEY"),
+        stream_usage=True,
+    )
+
+
+async def call_model(state: AgentState) -> dict:
+    """
+    LangGraph node that answers the last message of the thread.
+
+    Args:
+        state (AgentState): The thread state.
+
+    Returns:
+        dict: The model response to append, and removals of the messages that fall outside
+        the `HISTORY_MAX_MESSAGES` window once it is added.
+    """
+
+    messages = state["messages"]
+
+    response = await get_model().ainvoke(
+        build_agent_messages(
+            state.get("language", "es"),
+            state.get("summary"),
+            select_recent_chat_messages(messages, HISTORY_TOKEN_BUDGET),
+            state.get("facts"),
+        )
+    )
+    record_token_usage(AGENT_MODEL, getattr(response, "usage_metadata", None))
+
+    stale_messages = messages[: max(0, len(messages) + 1 - HISTORY_MAX_MESSAGES)]
+
+    return {"messages": [RemoveMessage(id=message.id) for message in stale_messages] + [response]}
+
+
+async def answer_prompt(prompt: str, language: str, facts: str | None = None) -> str:
+    """
+    Answers a single prompt without reading or writing a conversation thread.
+
+    Args:
+        prompt (str): The user prompt.
+        language (str): The detected prompt language ('en' or 'es').
+        facts (str | None): Tariff table facts or HS-code candidates for the prompt, if any.
+
+    Returns:
+        str: The model answer.
+    """
+
+    response = await get_model().ainvoke(
+        build_agent_messages(language, None, [HumanMessage(content=prompt)], facts)
+    )
+    record_token_usage(AGENT_MODEL, getattr(response, "usage_metadata", None))
+
+    return response.content
+
+
+def build_workflow() -> StateGraph:
+    """
+    Builds the (uncompiled) agent workflow with a single model node.
+
+    Returns:
+        StateGraph: The agent workflow.
+    """
+
+    workflow = StateGraph(state_schema=AgentState)
+    workflow.add_edge(START, "model")
+    workflow.add_node("model", call_model)
+
+    return workflow
+
+
+async def init_checkpointer() -> None:
+    """
+    Opens the durable checkpointer used by the agent graph from now on.
+    """
+
+    global _checkpointer
+
+    _checkpointer = await _checkpointer_stack.enter_async_context(open_checkpointer())
+    get_agent.cache_clear()
+
+
+async def close_checkpointer() -> None:
+    """
+    Closes the durable checkpointer.
+    """
+
+    global _checkpointer
+
+    await _checkpointer_stack.aclose()
+    _checkpointer = None
+    get_agent.cache_clear()
+
+
+@lru_cache(maxsize=1)
+def get_agent():
+    """
+    Returns the compiled agent graph, compiling it on first use.
+
+    Returns:
+        CompiledStateGraph: The compiled, reusable agent graph.
+    """
+
+    return build_workflow().compile(checkpointer=_checkpointer or MemorySaver())
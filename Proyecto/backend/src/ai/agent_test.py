@@ -0,0 +1,51 @@
+import asyncio
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage
+
+import src.ai.agent as agent
+from src.ai.prompts import SYSTEM_PROMPTS
+
+
+class RecordingModel:
+    def __init__(self):
+        self.calls = []
+
+    async def ainvoke(self, messages):
+        self.calls.append(messages)
+        return AIMessage(content="respuesta")
+
+
+def test_call_model_sends_system_prompt_summary_and_thread(monkeypatch):
+    model = RecordingModel()
+    monkeypatch.setattr(agent, "get_model", lambda: model)
+
+    thread = [
+        HumanMessage(content="Quiero importar laptops", id="1"),
+        AIMessage(content="¿Desde qué país?", id="2"),
+        HumanMessage(content="Desde China", id="3"),
+    ]
+
+    result = asyncio.run(
+        agent.call_model({"messages": thread, "language": "es", "summary": "Resumen previo"})
+    )
+
+    sent = model.calls[0]
+    assert isinstance(sent[0], SystemMessage) and sent[0].content == SYSTEM_PROMPTS["es"]
+    assert "Resumen previo" in sent[1].content
+    assert sent[2:] == thread
+    assert result == {"messages": [AIMessage(content="respuesta")]}
+
+
+def test_call_model_drops_messages_outside_the_window(monkeypatch):
+    monkeypatch.setattr(agent, "get_model", lambda: RecordingModel())
+    monkeypatch.setattr(agent, "HISTORY_MAX_MESSAGES", 4)
+
+    thread = [HumanMessage(content=f"mensaje {index}", id=str(index)) for index in range(5)]
+
+    result = asyncio.run(agent.call_model({"messages": thread, "language": "es", "summary": ""}))
+
+    removed = [message.id for message in result["messages"] if isinstance(message, RemoveMessage)]
+    assert removed == ["0", "1"]
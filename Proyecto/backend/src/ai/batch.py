@@ -0,0 +1,246 @@
+"""
+Batch classification module for the Naurat Importation Bot API.
+
+This module answers a list of product descriptions pasted or uploaded at once by a broker,
+and stores one `ExcelInformation` row per classified product.
+
+Features:
+- Reads the products from a JSON list or from an uploaded CSV or XLSX file (the `product`,
+  `producto`, `description` or `descripcion` column, or else the first column). Uploads
+  are bounded in size, XLSX files also in uncompressed size, and reading stops once the
+  batch is known to be too large. Only raw CSV, XLSX or binary bodies are accepted
+  (`BATCH_UPLOAD_MEDIA_TYPES`), so a multipart form is never read as a product list.
+- Each product goes through the `ask_agent` prompt pipeline (language detection, response
+  cache, tariff facts or HS-code candidates, agent prompt) outside the user's conversation
+  thread, then through the same local answer parsing, falling back to the LLM extraction.
+- Products are processed concurrently, at most `BATCH_CONCURRENCY` at a time, and a progress
+  event is produced as each one finishes.
+- The rows of the whole batch are written in one bulk insert and carry the batch ID, so the
+  batch workbook is exported with `generate_excel`.
+
+Environment Variables:
+- `BATCH_CONCURRENCY`: Products processed at the same time. Defaults to 8.
+- `BATCH_MAX_ITEMS`: Maximum number of products per batch. Defaults to 500.
+- `BATCH_MAX_UPLOAD_BYTES`: Maximum size of an uploaded file. Defaults to 5 MiB; an XLSX
+  file may expand to at most 20 times this size.
+"""
+
+import asyncio
+import csv
+import io
+import os
+import zipfile
+
+from src.database import AsyncSessionLocal
+from src.metrics import track_stage
+from src.ai.agent import answer_prompt
+from src.ai.crud import answer_regulations, excel_information_from_data, get_data, product_answer_data
+from src.ai.utils.detect_language import detect_language
+from src.ai.utils.hs_search import prompt_facts
+from src.ai.utils.response_cache import response_cache, response_cache_key
+
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+BATCH_MAX_UPLOAD_BYTES = int(os.getenv("BATCH_MAX_UPLOAD_BYTES", str(5 * 1024 * 1024)))
+
+XLSX_MAX_EXPANSION = 20
+
+BATCH_UPLOAD_MEDIA_TYPES = frozenset({
+    "text/csv",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/octet-stream",
+})
+
+PRODUCT_COLUMNS = ("product", "producto", "product_name", "description", "descripcion", "descripción")
+
+
+def _products_from_rows(rows, max_items: int | None = None) -> list[str]:
+    """
+    Returns the product descriptions of table rows.
+
+    Args:
+        rows (Iterable[Sequence]): The rows, the first non-empty one possibly a header.
+        max_items (int | None): Stop reading once more than this many descriptions are found.
+
+    Returns:
+        list[str]: The non-empty descriptions, in order (at most `max_items + 1`).
+    """
+
+    products = []
+    column = None
+
+    for row in rows:
+        row = ["" if value is None else str(value).strip() for value in row]
+        if not any(row):
+            continue
+
+        if column is None:
+            header = [value.lower() for value in row]
+            column = next((header.index(name) for name in PRODUCT_COLUMNS if name in header), None)
+            if column is not None:
+                continue
+            column = 0
+
+        if column < len(row) and row[column]:
+            products.append(row[column])
+            if max_items is not None and len(products) > max_items:
+                break
+
+    return products
+
+
+def read_products(content: bytes, max_items: int | None = None) -> list[str]:
+    """
+    Reads the product descriptions of an uploaded CSV or XLSX file.
+
+    Args:
+        content (bytes): The file content; XLSX files are recognized by their ZIP signature.
+        max_items (int | None): Stop reading once more than this many descriptions are found.
+
+    Returns:
+        list[str]: The non-empty descriptions, in order (at most `max_items + 1`).
+
+    Raises:
+        ValueError: If the file is neither a readable XLSX workbook nor UTF-8 CSV, or the
+            workbook expands to more than `XLSX_MAX_EXPANSION` times `BATCH_MAX_UPLOAD_BYTES`.
+    """
+
+    if content.startswith(b"PK\x03\x04"):
+        from openpyxl import load_workbook
+
+        try:
+            with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                expanded_size = sum(member.file_size for member in archive.infolist())
+        except zipfile.BadZipFile as e:
+            raise ValueError("The file is not a readable XLSX workbook") from e
+
+        if expanded_size > XLSX_MAX_EXPANSION * BATCH_MAX_UPLOAD_BYTES:
+            raise ValueError("The XLSX workbook is too large once uncompressed")
+
+        try:
+            workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        except (zipfile.BadZipFile, KeyError, OSError) as e:
+            raise ValueError("The file is not a readable XLSX workbook") from e
+
+        try:
+            return _products_from_rows(workbook.worksheets[0].iter_rows(values_only=True), max_items)
+        finally:
+            workbook.close()
+
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise ValueError("The file must be an XLSX workbook or a UTF-8 CSV file") from e
+
+    return _products_from_rows(csv.reader(io.StringIO(text)), max_items)
+
+
+async def classify_product(product: str) -> dict | None:
+    """
+    Answers one product description and extracts its product data.
+
+    No database session is held during the LLM call, so slow answers do not keep pool
+    connections checked out.
+
+    Args:
+        product (str): The product description, used as the prompt.
+
+    Returns:
+        dict | None: The structured product data, or None if the answer is not about a product.
+    """
+
+    with track_stage("detect_language"):
+        language = await detect_language(product)
+
+    with track_stage("facts"):
+        facts = await prompt_facts(product, language)
+
+    cache_key = response_cache_key(product, language, facts)
+
+    async with AsyncSessionLocal() as db:
+        with track_stage("response_cache"):
+            response = await response_cache.get(cache_key, db)
+
+    if response is None:
+        with track_stage("llm"):
+            response = await answer_prompt(product, language, facts)
+
+        async with AsyncSessionLocal() as db:
+            await response_cache.set(cache_key, response, db)
+
+    is_product_answer, data = product_answer_data(product, response, language)
+
+    if data is None and is_product_answer:
+        with track_stage("get_data"):
+            data = await get_data(response, *answer_regulations(response))
+
+    return data
+
+
+async def run_batch(products: list[str], user_id, batch_id, concurrency: int = BATCH_CONCURRENCY):
+    """
+    Classifies products concurrently and stores their rows in one bulk insert.
+
+    A failed product is reported and skipped; it does not stop the batch. If the consumer
+    stops iterating (e.g. the client disconnects), the pending products are cancelled and
+    nothing is stored.
+
+    Args:
+        products (list[str]): The product descriptions.
+        user_id (UUID): The ID of the user owning the rows.
+        batch_id (UUID): The batch ID stored in the rows.
+        concurrency (int): Maximum number of products processed at the same time.
+
+    Yields:
+        tuple[str, dict]: A `progress` event per finished product (index, product, status,
+        HS code or error detail, and the completed and total counts), then a `done` event
+        with the counts of classified, skipped and failed products.
+    """
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, product: str):
+        async with semaphore:
+            try:
+                return index, await classify_product(product), None
+            except Exception as e:
+                return index, None, str(e) or type(e).__name__
+
+    tasks = [asyncio.create_task(run(index, product)) for index, product in enumerate(products)]
+    results = {}
+    failed = 0
+
+    try:
+        for completed, task in enumerate(asyncio.as_completed(tasks), start=1):
+            index, data, error = await task
+            progress = {"index": index, "product": products[index], "completed": completed, "total": len(products)}
+
+            if error is not None:
+                failed += 1
+                progress.update(status="failed", detail=error)
+            elif data is None:
+                progress.update(status="skipped")
+            else:
+                results[index] = data
+                progress.update(status="classified", hs_code=data["HS Code"])
+
+            yield "progress", progress
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    async with AsyncSessionLocal() as db:
+        db.add_all([excel_information_from_data(user_id, results[index], batch_id) for index in sorted(results)])
+        with track_stage("commit"):
+            await db.commit()
+
+    yield "done", {
+        "batch_id": str(batch_id),
+        "total": len(products),
+        "classified": len(results),
+        "skipped": len(products) - len(results) - failed,
+        "failed": failed,
+    }
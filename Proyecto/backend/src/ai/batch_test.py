@@ -0,0 +1,121 @@
+import asyncio
+import io
+import uuid
+
+import pytest
+from openpyxl import Workbook
+
+import src.ai.batch as batch
+
+
+def test_read_products_csv_uses_product_column():
+    content = "sku,producto\n1,Audífonos bluetooth\n2,\n3,Laptop 14 pulgadas\n".encode("utf-8-sig")
+
+    assert batch.read_products(content) == ["Audífonos bluetooth", "Laptop 14 pulgadas"]
+
+
+def test_read_products_without_header_uses_first_column():
+    assert batch.read_products(b"tenis de correr\nbaterias de litio\n") == ["tenis de correr", "baterias de litio"]
+
+
+def test_read_products_xlsx():
+    workbook = Workbook()
+    workbook.active.append(["Description", "Qty"])
+    workbook.active.append(["Lithium batteries", 10])
+    workbook.active.append([None, None])
+    workbook.active.append(["Running shoes", 5])
+    content = io.BytesIO()
+    workbook.save(content)
+
+    assert batch.read_products(content.getvalue()) == ["Lithium batteries", "Running shoes"]
+
+
+def test_read_products_stops_after_max_items():
+    content = "producto\n" + "".join(f"item {index}\n" for index in range(1000))
+
+    assert batch.read_products(content.encode(), max_items=3) == ["item 0", "item 1", "item 2", "item 3"]
+
+
+def test_read_products_rejects_xlsx_expanding_too_much(monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_MAX_UPLOAD_BYTES", 100)
+    workbook = Workbook()
+    workbook.active.append(["Product"])
+    content = io.BytesIO()
+    workbook.save(content)
+
+    with pytest.raises(ValueError, match="uncompressed"):
+        batch.read_products(content.getvalue())
+
+
+def test_read_products_rejects_binary_files():
+    with pytest.raises(ValueError):
+        batch.read_products(b"\xff\xfe\x00binary")
+
+
+def test_run_batch_bounds_concurrency(monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def fake_classify_product(product):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return None
+
+    monkeypatch.setattr(batch, "classify_product", fake_classify_product)
+
+    async def collect():
+        return [event async for event in batch.run_batch([f"p{i}" for i in range(10)], uuid.uuid4(), uuid.uuid4(), 3)]
+
+    events = asyncio.run(collect())
+
+    assert peak == 3
+    assert [event for event, _ in events].count("progress") == 10
+    assert events[-1] == ("done", {
+        "batch_id": events[-1][1]["batch_id"], "total": 10, "classified": 0, "skipped": 10, "failed": 0,
+    })
+
+
+def test_classify_product_holds_no_session_during_the_llm_call(monkeypatch):
+    from contextlib import asynccontextmanager
+
+    open_sessions = 0
+    sessions_during_llm = []
+
+    @asynccontextmanager
+    async def fake_session():
+        nonlocal open_sessions
+        open_sessions += 1
+        try:
+            yield object()
+        finally:
+            open_sessions -= 1
+
+    async def fake_detect_language(text):
+        return "es"
+
+    async def fake_cache_get(key, db):
+        return None
+
+    async def fake_cache_set(key, response, db):
+        assert open_sessions == 1
+
+    async def fake_prompt_facts(prompt, language):
+        return None
+
+    async def fake_answer_prompt(prompt, language, facts):
+        sessions_during_llm.append(open_sessions)
+        return "Sin datos de producto"
+
+    monkeypatch.setattr(batch, "AsyncSessionLocal", fake_session)
+    monkeypatch.setattr(batch, "detect_language", fake_detect_language)
+    monkeypatch.setattr(batch.response_cache, "get", fake_cache_get)
+    monkeypatch.setattr(batch.response_cache, "set", fake_cache_set)
+    monkeypatch.setattr(batch, "prompt_facts", fake_prompt_facts)
+    monkeypatch.setattr(batch, "answer_prompt", fake_answer_prompt)
+    monkeypatch.setattr(batch, "product_answer_data", lambda prompt, response, language: (False, None))
+
+    assert asyncio.run(batch.classify_product("tornillos")) is None
+    assert sessions_during_llm == [0]
@@ -0,0 +1,85 @@
+"""
+Checkpointer module for the Naurat Importation Bot API.
+
+This module opens the durable LangGraph checkpointer that stores each user's conversation
+thread, so the agent resumes a conversation from its last checkpoint instead of rebuilding it
+from the `Messages` table on every turn.
+
+Features:
+- SQLite-backed (`AsyncSqliteSaver`) for development and PostgreSQL-backed
+  (`AsyncPostgresSaver` over a psycopg connection pool) in production, chosen from the URL.
+- One thread per user, derived from the user ID.
+
+Environment Variables:
+- `CHECKPOINT_DATABASE_URL`: Connection string of the checkpoint store. Defaults to `DATABASE_URL`.
+- `CHECKPOINT_POOL_SIZE`: Maximum PostgreSQL connections used by the checkpointer. Defaults to 10.
+"""
+
+import os
+from contextlib import asynccontextmanager
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+
+CHECKPOINT_DATABASE_URL = os.getenv("CHECKPOINT_DATABASE_URL") or os.getenv("DATABASE_URL")
+
+CHECKPOINT_POOL_SIZE = int(os.getenv("CHECKPOINT_POOL_SIZE", "10"))
+
+
+def thread_config(user_id) -> dict:
+    """
+    Returns the LangGraph config selecting a user's conversation thread.
+
+    Args:
+        user_id (UUID): The user ID.
+
+    Returns:
+        dict: The config with the user's `thread_id`.
+    """
+
+    return {"configurable": {"thread_id": f"user:{user_id}"}}
+
+
+@asynccontextmanager
+async def open_checkpointer(database_url: str = CHECKPOINT_DATABASE_URL):
+    """
+    Opens the checkpointer of a database URL and creates its tables if needed.
+
+    Args:
+        database_url (str): A `sqlite://` or `postgresql://` connection string; a driver
+            suffix such as `+psycopg2` is ignored.
+
+    Yields:
+        BaseCheckpointSaver: The open checkpointer.
+
+    Raises:
+        ValueError: If the database is neither SQLite nor PostgreSQL.
+    """
+
+    scheme, _, rest = database_url.partition("://")
+    dialect = scheme.split("+")[0]
+
+    if dialect == "sqlite":
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        async with AsyncSqliteSaver.from_conn_string(rest[1:] or ":memory:") as checkpointer:
+            await checkpointer.setup()
+            yield checkpointer
+
+    elif dialect in ("postgres", "postgresql"):
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+        from psycopg.rows import dict_row
+        from psycopg_pool import AsyncConnectionPool
+
+        async with AsyncConnectionPool(
+            f"postgresql://{rest}",
+            max_size=CHECKPOINT_POOL_SIZE,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            open=False,
+        ) as pool:
+            checkpointer: BaseCheckpointSaver = AsyncPostgresSaver(pool)
+            await checkpointer.setup()
+            yield checkpointer
+
+    else:
+        raise ValueError(f"Unsupported checkpoint database: {dialect}")
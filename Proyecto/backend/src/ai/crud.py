@@ -3,122 +3,195 @@ CRUD operations for handling user data and Excel file generation.
 
 This module provides functions to:
 - Retrieve data from a database and generate an Excel file.
-- Extract relevant product data using OpenAI's GPT-4o-mini model.
-- Save extracted data into the database.
+- Extract relevant product data by parsing the agent answer locally, falling back to
+  OpenAI's GPT-4o-mini model, with the tax rates of known fractions taken from the tariff table.
+- Build the product data of an agent answer locally (parsed answer or tariff fraction).
+- Save extracted data into the database, once per normalized HS code of the user (the
+  first extraction of an HS code is kept, as the former read-time deduplication did).
+- Run the extraction as a background job and track how many are still pending per user.
+  The count expires `EXTRACTION_PENDING_TIMEOUT` seconds after the last queued extraction,
+  so jobs lost with their worker (crash, redeploy) do not leave it pending forever.
+- Version each user's conversation workbook, so cached exports are invalidated on writes.
 
 Dependencies:
-- SQLAlchemy for database interactions.
+- SQLAlchemy asynchronous sessions for database interactions.
 - FastAPI's HTTPException for error handling.
-- OpenAI's API for data extraction.
-- Pandas and OpenPyXL for Excel file processing.
+- OpenAI's API for data extraction, called through the shared async HTTP client.
+- OpenPyXL (write-only mode) for Excel file generation, imported on first use.
+
+Environment Variables:
+- `EXTRACTION_PENDING_TIMEOUT`: Seconds after the last queued extraction of a user during
+  which its pending count is reported. Defaults to 900.
 """
 
+import ast
+import asyncio
+import csv
 import os
+import re
+from datetime import datetime, timedelta, timezone
 from io import BytesIO
-from sqlalchemy.orm import Session
+from tempfile import SpooledTemporaryFile
+from sqlalchemy import case, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
-from src.models import Users, ExcelInformation
-from openpyxl.styles import Border, Side
-import pandas as pd
-import requests
+from src.models import Users, ExcelInformation, normalize_excel_hs_code
+from src.metrics import record_token_usage, track_stage
+from src.ai.utils.http_client import get_http_client
+from src.ai.utils.parse_answer import parse_import_answer
+from src.ai.utils.tariff import TariffEntry, format_hs_code, get_tariff_index
+
+
+EXCEL_COLUMNS = [
+    ("Nombre del Producto", ExcelInformation.product_name),
+    ("Código HS", ExcelInformation.hs_code),
+    ("Origen del País", ExcelInformation.from_country),
+    ("Impuestos IGI (Tasa Máxima)", ExcelInformation.igi_max),
+    ("Impuestos IGI (Reducciones aplicables)", ExcelInformation.igi_reductions),
+    ("IVA (%)", ExcelInformation.iva),
+    ("DTA (%)", ExcelInformation.dta),
+    ("NOMs", ExcelInformation.noms),
+    ("COFEPRIS", ExcelInformation.cofepris),
+]
+
+# Version of the workbook layout written by `generate_excel`; part of the cache key and ETag
+# of exported workbooks, so bump it whenever the columns or their formatting change.
+EXCEL_FORMAT_VERSION = 1
+
+PRODUCT_ANSWER_PATTERN = re.compile(r"Información\s+de\s+importación\s+para|Import\s+information\s+for")
+
+SCFI_NOM_PATTERN = re.compile(r"NOM-\d{3}-SCFI-\d{4}\s+\(.*?\)", re.IGNORECASE)
 
+EXTRACTION_PENDING_TIMEOUT = float(os.getenv("EXTRACTION_PENDING_TIMEOUT", "900"))
 
-def generate_excel(user_email: str, db: Session) -> BytesIO:
+
+async def generate_excel(user_id, db: AsyncSession, batch_id=None) -> BytesIO:
     """
     Generates an Excel file containing product information associated with a user.
 
-    This function retrieves product data from the database based on the user's email 
-    and creates an Excel file formatted with borders and column width adjustments.
+    This function streams the user's product rows from the database cursor and writes them
+    into a write-only workbook formatted with borders and column width adjustments. Rows are
+    spooled once (to disk past 1 MB) while the column widths are computed, because widths
+    must be written before the first row, so memory stays flat for large exports. The
+    workbook is rendered in a worker thread, so large exports do not block the event loop.
+
+    Rows are deduplicated when written, so the user's workbook reads its conversation rows
+    (one per normalized HS code) and a batch workbook the rows of that batch (one per
+    classified product). Both are in insertion order: `created_at`, then the time-ordered `id`
+    for rows created within the same second.
 
     Args:
-        user_email (str): The email of the user whose data should be retrieved.
-        db (Session): The database session.
+        user_id (UUID): The ID of the user whose data should be retrieved, resolved by the caller.
+        db (AsyncSession): The asynchronous database session.
+        batch_id (UUID | None): Restricts the workbook to the rows of one batch classification.
 
     Returns:
         BytesIO: An in-memory Excel file.
 
     Raises:
-        HTTPException: If the user or associated data is not found in the database.
-    """
-    
-    user_record = db.query(Users).filter(Users.email == user_email).first()
-    if not user_record:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    excel_data = db.query(ExcelInformation).filter(ExcelInformation.user_id == user_record.id).all()
-
-    if not excel_data:
-        raise HTTPException(status_code=404, detail="No data found for this user")
-
-    data = {
-        "Nombre del Producto": [],
-        "Código HS": [],
-        "Origen del País": [],
-        "Impuestos IGI (Tasa Máxima)": [],
-        "Impuestos IGI (Reducciones aplicables)": [],
-        "IVA (%)": [],
-        "DTA (%)": [],
-        "NOMs": [],
-        "COFEPRIS": [],
-    }
+        HTTPException: If no data is found for the user in the database.
+    """
 
-    seen_hs_codes = set()
-
-    for record in excel_data:
-        hs_code = str(record.hs_code).replace("{", "").replace("}", "").replace('"', '')
-        
-        if hs_code not in seen_hs_codes:
-            data["Nombre del Producto"].append(record.product_name)
-            data["Código HS"].append(hs_code)
-            data["Origen del País"].append(record.from_country)
-            data["Impuestos IGI (Tasa Máxima)"].append(record.igi_max)
-            data["Impuestos IGI (Reducciones aplicables)"].append(record.igi_reductions)
-            data["IVA (%)"].append(record.iva)
-            data["DTA (%)"].append(record.dta)
-            data["NOMs"].append(record.noms)
-            data["COFEPRIS"].append(record.cofepris)
-            
-            seen_hs_codes.add(hs_code)
-
-    df = pd.DataFrame(data)
-    output = BytesIO()
+    query = select(*[column for _, column in EXCEL_COLUMNS]).where(ExcelInformation.user_id == user_id)
+    if batch_id is None:
+        query = query.where(ExcelInformation.batch_id.is_(None))
+    else:
+        query = query.where(ExcelInformation.batch_id == batch_id)
+    query = query.order_by(ExcelInformation.created_at, ExcelInformation.id)
+
+    excel_data = await db.stream(query.execution_options(yield_per=1000))
+
+    column_widths = [len(header) for header, _ in EXCEL_COLUMNS]
+    row_count = 0
+
+    with SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", newline="", encoding="utf-8") as spool:
+        spool_writer = csv.writer(spool)
+
+        async for record in excel_data:
+            row = ["" if value is None else str(value) for value in record]
+
+            spool_writer.writerow(row)
+            row_count += 1
+
+            for index, value in enumerate(row):
+                column_widths[index] = max(column_widths[index], len(value))
+
+        if not row_count:
+            raise HTTPException(status_code=404, detail="No data found for this user")
+
+        return await asyncio.to_thread(render_excel, spool, column_widths)
+
+
+def render_excel(spool, column_widths: list[int]) -> BytesIO:
+    """
+    Renders spooled product rows as a formatted Excel workbook.
+
+    Args:
+        spool (SpooledTemporaryFile): The CSV rows written by `generate_excel`.
+        column_widths (list[int]): The widest value of each column, header included.
+
+    Returns:
+        BytesIO: An in-memory Excel file, positioned at its start.
+    """
 
-    thin_border = Border(left=Side(style='thin'), 
-                         right=Side(style='thin'), 
-                         top=Side(style='thin'), 
+    # Imported on first export so that process start does not pay for openpyxl.
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+    from openpyxl.utils import get_column_letter
+
+    headers = [header for header, _ in EXCEL_COLUMNS]
+
+    thin_border = Border(left=Side(style='thin'),
+                         right=Side(style='thin'),
+                         top=Side(style='thin'),
                          bottom=Side(style='thin'))
 
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, header=True)
-        worksheet = writer.sheets['Sheet1']
-
-        for col in worksheet.columns:
-            max_length = 0
-            column = col[0].column_letter  
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(cell.value)
-                except TypeError:
-                    pass
-            adjusted_width = max_length + 2  
-            worksheet.column_dimensions[column].width = adjusted_width
-
-        for row in worksheet.iter_rows(min_row=2, max_row=len(df)+1, min_col=1, max_col=worksheet.max_column):
-            for cell in row:
-                cell.border = thin_border
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Sheet1")
+
+    for index, width in enumerate(column_widths, start=1):
+        worksheet.column_dimensions[get_column_letter(index)].width = width + 2
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(worksheet, value=header)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center", vertical="top")
+        cell.border = thin_border
+        header_cells.append(cell)
+    worksheet.append(header_cells)
+
+    # Write-only rows are serialized on append, so one bordered cell per column is
+    # styled once and reused for every row instead of styling each cell.
+    row_cells = []
+    for _ in headers:
+        cell = WriteOnlyCell(worksheet)
+        cell.border = thin_border
+        row_cells.append(cell)
+
+    spool.seek(0)
+    for row in csv.reader(spool):
+        for cell, value in zip(row_cells, row):
+            cell.value = value or None
+        worksheet.append(row_cells)
+
+    output = BytesIO()
+    workbook.save(output)
 
     output.seek(0)
     return output
 
 
-def get_data(search_text: str, noms: list, cofepris: str) -> dict:
+async def get_data(search_text: str, noms: list, cofepris: str) -> dict:
     """
-    Extracts structured product information from a text using OpenAI's GPT-4o-mini model.
+    Extracts structured product information from an agent answer.
 
-    The function sends a request to OpenAI's API, providing a text search query and 
-    regulatory information (NOMs and COFEPRIS). It expects the API to return a dictionary 
-    containing details such as product name, HS Code, country of origin, and tax details.
+    The answer is first parsed locally with the template-aware `parse_import_answer`. Only when
+    that fails, the function sends a request to OpenAI's GPT-4o-mini model, providing a text
+    search query and regulatory information (NOMs and COFEPRIS). It expects the API to return
+    a dictionary containing details such as product name, HS Code, country of origin, and tax details.
 
     Args:
         search_text (str): The text input containing product details.
@@ -129,7 +202,7 @@ def get_data(search_text: str, noms: list, cofepris: str) -> dict:
         dict: Extracted product information including tax details and regulatory data.
 
     Raises:
-        requests.RequestException: If the API request fails.
+        httpx.HTTPError: If the API request fails.
         KeyError: If the API response structure is unexpected.
     """
 
@@ -138,6 +211,11 @@ def get_data(search_text: str, noms: list, cofepris: str) -> dict:
         "COFEPRIS": cofepris,
     }
 
+    parsed_answer = parse_import_answer(search_text)
+    if parsed_answer:
+        data_dict.update(parsed_answer)
+        return data_dict
+
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
@@ -163,51 +241,331 @@ def get_data(search_text: str, noms: list, cofepris: str) -> dict:
         "max_tokens": 300,
     }
 
-    response = requests.post(
+    response = await get_http_client().post(
         "https://api.openai.com/v1/chat/completions", headers=headers, json=payload, timeout=30
     )
 
     data = response.json()
+    record_token_usage(payload["model"], data.get("usage"))
 
-    agent_response = eval((data['choices'][0]['message']['content']).replace("```", "").replace("python", ""))
+    agent_response = ast.literal_eval((data['choices'][0]['message']['content']).replace("```", "").replace("python", "").strip())
 
     data_dict.update(agent_response)
 
     return data_dict
 
 
-def save_data_into_db(user_email: str, data: dict, db: Session) -> None:
+def excel_information_from_data(user_id, data: dict, batch_id=None) -> ExcelInformation:
     """
-    Saves extracted product data into the database.
-
-    This function associates the extracted product details with a user in the database
-    and stores relevant information, such as HS Code, country of origin, and tax details.
+    Builds the `ExcelInformation` row of the extracted product data.
 
     Args:
-        user_email (str): The email of the user to associate the data with.
-        data (dict): The structured product data to be saved.
-        db (Session): The database session.
+        user_id (UUID): The ID of the user to associate the data with.
+        data (dict): The structured product data returned by `get_data`.
+        batch_id (UUID | None): The batch classification producing the row, if any.
 
-    Raises:
-        HTTPException: If the user is not found in the database.
+    Returns:
+        ExcelInformation: The row, not yet added to a session.
     """
 
-    user_record = db.query(Users).filter(Users.email == user_email).first()
-    if not user_record:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    excel_data = ExcelInformation(
-        user_id=user_record.id,
+    noms = data["NOMs"]
+    hs_code = str(data["HS Code"]).replace("{", "").replace("}", "").replace('"', "").strip()
+
+    return ExcelInformation(
+        user_id=user_id,
         product_name=data["Nombre del Producto"],
-        hs_code=data["HS Code"],
+        hs_code=hs_code,
+        hs_code_normalized=normalize_excel_hs_code(hs_code),
         from_country=data["Origen del País"],
         igi_max=data["Impuestos IGI (Tasa Máxima)"],
         igi_reductions=data["Impuestos IGI (Reducciones aplicables)"],
         iva=data["IVA (%)"],
         dta=data["DTA (%)"],
-        noms=data["NOMs"],
+        noms=", ".join(noms) if isinstance(noms, list) else noms,
         cofepris=data["COFEPRIS"],
+        batch_id=batch_id,
+    )
+
+
+def apply_tariff(data: dict, entry: TariffEntry | None) -> dict:
+    """
+    Replaces the generated tax rates with the tariff table ones when the fraction is known.
+
+    Args:
+        data (dict): The structured product data returned by `get_data`.
+        entry (TariffEntry | None): The tariff entry of the product's HS code, if any.
+
+    Returns:
+        dict: The data, with "Impuestos IGI (Tasa Máxima)", "IVA (%)" and "DTA (%)" taken
+        from the table.
+    """
+
+    if entry is None:
+        return data
+
+    return {
+        **data,
+        "Impuestos IGI (Tasa Máxima)": entry.igi_max,
+        "IVA (%)": entry.iva,
+        "DTA (%)": entry.dta,
+    }
+
+
+def data_from_tariff(entry: TariffEntry, noms: list, cofepris: str, language: str) -> dict:
+    """
+    Builds the structured product data of a tariff fraction, without any LLM call.
+
+    Args:
+        entry (TariffEntry): The tariff entry.
+        noms (list): A list of NOMs applicable to the product.
+        cofepris (str): COFEPRIS status for the product.
+        language (str): The answer language ('en' or 'es').
+
+    Returns:
+        dict: The same keys as `get_data`.
+    """
+
+    return apply_tariff(
+        {
+            "Nombre del Producto": entry.description,
+            "HS Code": format_hs_code(entry.hs_code),
+            "Origen del País": "Not specified" if language == "en" else "No especificado",
+            "Impuestos IGI (Reducciones aplicables)": "",
+            "NOMs": noms,
+            "COFEPRIS": cofepris,
+        },
+        entry,
     )
 
-    db.add(excel_data)
-    db.commit()
+
+def answer_regulations(response: str) -> tuple:
+    """
+    Returns the regulatory data of an agent answer.
+
+    Args:
+        response (str): The agent answer.
+
+    Returns:
+        tuple: The SCFI NOMs with their descriptions (an empty string if there are none) and
+        the COFEPRIS status ("Aplica" or "No Aplica").
+    """
+
+    noms = SCFI_NOM_PATTERN.findall(response)
+    cofepris = "Aplica" if "COFEPRIS" in response else "No Aplica"
+
+    return noms if noms else "", cofepris
+
+
+def product_answer_data(prompt: str, response: str, language: str) -> tuple:
+    """
+    Builds the product data of an agent answer without any LLM call.
+
+    The answer is parsed locally; when that fails, the first known tariff fraction written in
+    the answer (or else in the prompt) is used. The tariff table's IGI, IVA and DTA take
+    precedence over the generated ones.
+
+    Args:
+        prompt (str): The user prompt.
+        response (str): The agent answer.
+        language (str): The answer language ('en' or 'es').
+
+    Returns:
+        tuple: Whether the answer describes a product, and its structured data (None when it
+        is not a product answer or only the LLM extraction of `get_data` can read it).
+    """
+
+    if not PRODUCT_ANSWER_PATTERN.search(response):
+        return False, None
+
+    noms, cofepris = answer_regulations(response)
+
+    with track_stage("parse_answer"):
+        parsed_answer = parse_import_answer(response)
+    tariff_index = get_tariff_index()
+
+    if parsed_answer:
+        return True, apply_tariff(
+            {"NOMs": noms, "COFEPRIS": cofepris, **parsed_answer},
+            tariff_index.lookup(parsed_answer["HS Code"]),
+        )
+
+    tariff_entries = tariff_index.find_in_text(response) or tariff_index.find_in_text(prompt)
+    if tariff_entries:
+        return True, data_from_tariff(tariff_entries[0], noms, cofepris, language)
+
+    return True, None
+
+
+def excel_information_insert(user_id, data: dict, dialect: str):
+    """
+    Builds the `INSERT ... ON CONFLICT DO NOTHING` of a user's product data.
+
+    The conflict target is the partial unique index on `(user_id, hs_code_normalized)`, so a
+    product whose HS code the user already has is skipped: the row of the first extraction,
+    and its place in the export, are kept, as the former read-time deduplication did.
+
+    Args:
+        user_id (UUID): The ID of the user to associate the data with.
+        data (dict): The structured product data returned by `get_data`.
+        dialect (str): The database dialect name, `postgresql` or `sqlite`.
+
+    Returns:
+        Insert: The insert statement; its result's `rowcount` is 0 when the row was skipped.
+    """
+
+    row = excel_information_from_data(user_id, data)
+    values = {
+        column.name: getattr(row, column.key)
+        for column in ExcelInformation.__table__.columns
+        if column.name not in ("id", "batch_id", "created_at")
+    }
+
+    insert = (postgresql if dialect == "postgresql" else sqlite).insert(ExcelInformation)
+    statement = insert.values(values)
+
+    return statement.on_conflict_do_nothing(
+        index_elements=[ExcelInformation.user_id, ExcelInformation.hs_code_normalized],
+        index_where=ExcelInformation.batch_id.is_(None),
+    )
+
+
+async def save_data_into_db(user_id, data: dict, db: AsyncSession) -> None:
+    """
+    Saves extracted product data into the database.
+
+    This function associates the extracted product details with a user in the database
+    and stores relevant information, such as HS Code, country of origin, and tax details.
+    A product with an HS code the user already has is skipped; otherwise the user's workbook
+    version is incremented, invalidating the cached `products.xlsx`.
+
+    Args:
+        user_id (UUID): The ID of the user to associate the data with, resolved by the caller.
+        data (dict): The structured product data to be saved.
+        db (AsyncSession): The asynchronous database session.
+    """
+
+    result = await db.execute(excel_information_insert(user_id, data, db.bind.dialect.name))
+    if result.rowcount:
+        await bump_excel_version(user_id, db)
+    await db.commit()
+
+
+async def extract_excel_information(
+    user_id, response: str, noms: list, cofepris: str, db: AsyncSession
+) -> None:
+    """
+    Extracts the product data of an agent answer and stores it, as a background job.
+
+    Args:
+        user_id (UUID): The ID of the user to associate the data with.
+        response (str): The agent answer.
+        noms (list): A list of NOMs applicable to the product.
+        cofepris (str): COFEPRIS status for the product.
+        db (AsyncSession): The asynchronous database session owned by the job.
+    """
+
+    with track_stage("get_data"):
+        data = await get_data(response, noms, cofepris)
+
+    await save_data_into_db(user_id=user_id, data=data, db=db)
+
+
+def extraction_pending_cutoff() -> datetime:
+    """
+    Returns the oldest `Users.pending_extractions_at` whose pending count is still reported.
+
+    Returns:
+        datetime: The naive UTC cutoff, `EXTRACTION_PENDING_TIMEOUT` seconds ago.
+    """
+
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=EXTRACTION_PENDING_TIMEOUT)
+
+
+async def get_excel_state(user_id, db: AsyncSession) -> tuple:
+    """
+    Returns how many Excel data extractions of a user are still queued or running, and the
+    version of the user's conversation workbook.
+
+    A count whose last extraction was queued more than `EXTRACTION_PENDING_TIMEOUT` seconds
+    ago is reported as 0: its jobs were lost (e.g. with a crashed worker) or gave up.
+
+    Args:
+        user_id (UUID): The user ID.
+        db (AsyncSession): The asynchronous database session.
+
+    Returns:
+        tuple: The number of pending extractions and the workbook version.
+    """
+
+    state = (
+        await db.execute(
+            select(Users.pending_extractions, Users.pending_extractions_at, Users.excel_version)
+            .where(Users.id == user_id)
+        )
+    ).first()
+
+    if not state:
+        return 0, 0
+
+    pending, pending_at, excel_version = state
+    if pending_at is None or pending_at < extraction_pending_cutoff():
+        pending = 0
+
+    return pending, excel_version
+
+
+async def bump_excel_version(user_id, db: AsyncSession) -> None:
+    """
+    Invalidates the cached workbook of a stored user after one of its conversation rows is
+    written. The caller commits the session, together with the row.
+
+    Args:
+        user_id (UUID): The user ID.
+        db (AsyncSession): The asynchronous database session.
+    """
+
+    await db.execute(
+        update(Users)
+        .where(Users.id == user_id)
+        .values(excel_version=Users.excel_version + 1)
+    )
+
+
+async def mark_extraction_pending(user_id, db: AsyncSession) -> None:
+    """
+    Counts a queued extraction for a stored user. An expired count restarts at 1, so jobs
+    lost before it expired are not counted again. The caller commits the session.
+
+    Args:
+        user_id (UUID): The user ID.
+        db (AsyncSession): The asynchronous database session.
+    """
+
+    await db.execute(
+        update(Users)
+        .where(Users.id == user_id)
+        .values(
+            pending_extractions=case(
+                (Users.pending_extractions_at >= extraction_pending_cutoff(), Users.pending_extractions + 1),
+                else_=1,
+            ),
+            pending_extractions_at=datetime.now(timezone.utc).replace(tzinfo=None),
+        )
+    )
+
+
+async def finish_extraction(user_id, db: AsyncSession) -> None:
+    """
+    Removes a finished (or abandoned) extraction from a user's pending count.
+
+    Args:
+        user_id (UUID): The user ID.
+        db (AsyncSession): The asynchronous database session owned by the job.
+    """
+
+    await db.execute(
+        update(Users)
+        .where(Users.id == user_id, Users.pending_extractions > 0)
+        .values(pending_extractions=Users.pending_extractions - 1)
+    )
+    await db.commit()
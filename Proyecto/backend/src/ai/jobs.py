@@ -0,0 +1,256 @@
+"""
+Background job module for the Naurat Importation Bot API.
+
+This module runs bookkeeping work (Excel data extraction, history summaries) after the
+response has been sent, so users do not wait for it.
+
+Features:
+- An asyncio queue drained by a fixed number of workers (bounded concurrency).
+- Retries with exponential backoff, and an optional callback once a job succeeds or gives up.
+  Jobs dropped or interrupted when the queue stops also get their callback, so bookkeeping
+  such as the pending extraction count is released.
+- Queue depth and job counters for monitoring.
+- When the workers are not running (e.g. outside the application lifespan) or the queue is
+  full, jobs run inline so no work is lost.
+
+Environment Variables:
+- `JOB_WORKERS`: Number of concurrent workers. Defaults to 4.
+- `JOB_QUEUE_SIZE`: Maximum number of queued jobs. Defaults to 1000.
+- `JOB_MAX_RETRIES`: Retries after the first failed attempt. Defaults to 3.
+- `JOB_RETRY_DELAY`: Delay before the first retry, in seconds; doubled on each retry. Defaults to 1.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable
+
+from src.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+def in_session(func: Callable[..., Awaitable[None]], *args) -> Job:
+    """
+    Wraps a coroutine function taking a trailing `db` argument into a job with its own session.
+
+    Request-scoped sessions are closed before background jobs run, so every attempt opens a
+    fresh asynchronous session.
+
+    Args:
+        func (Callable[..., Awaitable[None]]): The coroutine function, e.g. `refresh_summary`.
+        *args: Positional arguments passed before the session.
+
+    Returns:
+        Job: The job to submit.
+    """
+
+    async def job() -> None:
+        async with AsyncSessionLocal() as db:
+            await func(*args, db)
+
+    return job
+
+
+class JobQueue:
+    """
+    Asynchronous job queue with a fixed pool of workers.
+
+    Attributes:
+        workers (int): Number of concurrent workers.
+        max_retries (int): Retries after the first failed attempt.
+        retry_delay (float): Delay before the first retry, in seconds.
+        processed (int): Jobs that completed successfully.
+        failed (int): Jobs that failed after every retry.
+        retried (int): Retry attempts made.
+    """
+
+    def __init__(self, workers: int, maxsize: int, max_retries: int, retry_delay: float):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.running_jobs = 0
+        self._queue = None
+        self._tasks = []
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether the workers are running.
+
+        Returns:
+            bool: True between `start` and `stop`.
+        """
+
+        return bool(self._tasks)
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of jobs waiting for a worker.
+
+        Returns:
+            int: The queue depth.
+        """
+
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self) -> None:
+        """
+        Starts the workers on the running event loop.
+        """
+
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 30) -> None:
+        """
+        Waits up to `timeout` seconds for queued jobs to finish, then stops the workers.
+
+        Jobs still running are cancelled and jobs still queued are dropped; the callbacks of
+        both are awaited.
+
+        Args:
+            timeout (float): Maximum seconds to wait for the queue to drain.
+        """
+
+        if not self.running:
+            return
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Stopping job queue with %s pending jobs", self.depth)
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        while not self._queue.empty():
+            name, _, on_done = self._queue.get_nowait()
+            self._queue.task_done()
+            self.failed += 1
+            await self._complete(name, on_done)
+
+    async def submit(self, name: str, job: Job, on_done: Job | None = None) -> None:
+        """
+        Queues a job, or runs it inline when the workers are stopped or the queue is full.
+
+        Args:
+            name (str): Job name used in logs.
+            job (Job): Coroutine function with no arguments; it must open its own database session.
+            on_done (Job | None): Awaited once after the last attempt, whether it succeeded
+                or not.
+        """
+
+        if self.running:
+            try:
+                self._queue.put_nowait((name, job, on_done))
+                return
+            except asyncio.QueueFull:
+                logger.warning("Job queue full, running %s inline", name)
+
+        await self._run(name, job, on_done)
+
+    async def _worker(self) -> None:
+        """
+        Takes jobs from the queue and runs them until cancelled.
+        """
+
+        while True:
+            name, job, on_done = await self._queue.get()
+            try:
+                await self._run(name, job, on_done)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, name: str, job: Job, on_done: Job | None) -> None:
+        """
+        Runs a job with retries and reports its final outcome.
+
+        Args:
+            name (str): Job name used in logs.
+            job (Job): The job to run.
+            on_done (Job | None): Callback awaited after the last attempt, or after the job
+                is cancelled.
+        """
+
+        self.running_jobs += 1
+        succeeded = False
+        cancelled = False
+
+        try:
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        await job()
+                        succeeded = True
+                        break
+                    except Exception:
+                        if attempt == self.max_retries:
+                            logger.exception("Job %s failed after %s attempts", name, attempt + 1)
+                        else:
+                            self.retried += 1
+                            await asyncio.sleep(self.retry_delay * 2 ** attempt)
+            except asyncio.CancelledError:
+                # Interrupted by `stop`: the job is abandoned, but its callback still runs.
+                logger.warning("Job %s cancelled while running", name)
+                cancelled = True
+
+            if succeeded:
+                self.processed += 1
+            else:
+                self.failed += 1
+
+            await self._complete(name, on_done)
+        finally:
+            self.running_jobs -= 1
+
+        if cancelled:
+            raise asyncio.CancelledError
+
+    async def _complete(self, name: str, on_done: Job | None) -> None:
+        """
+        Awaits a job's callback, logging its failure.
+
+        Args:
+            name (str): Job name used in logs.
+            on_done (Job | None): Callback awaited after the last attempt.
+        """
+
+        if on_done:
+            try:
+                await on_done()
+            except Exception:
+                logger.exception("Completion callback of job %s failed", name)
+
+    def stats(self) -> dict:
+        """
+        Returns the queue counters.
+
+        Returns:
+            dict: Queue depth, running jobs and processed, failed and retried counts.
+        """
+
+        return {
+            "depth": self.depth,
+            "running": self.running_jobs,
+            "processed": self.processed,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+
+job_queue = JobQueue(
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    maxsize=int(os.getenv("JOB_QUEUE_SIZE", "1000")),
+    max_retries=int(os.getenv("JOB_MAX_RETRIES", "3")),
+    retry_delay=float(os.getenv("JOB_RETRY_DELAY", "1")),
+)
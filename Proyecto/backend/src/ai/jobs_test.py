@@ -0,0 +1,95 @@
+import asyncio
+
+from src.ai.jobs import JobQueue
+
+
+def test_job_queue_retries_then_calls_on_done():
+    queue = JobQueue(workers=1, maxsize=10, max_retries=2, retry_delay=0)
+    attempts = []
+    done = []
+
+    async def flaky_job():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("temporary failure")
+
+    async def on_done():
+        done.append(1)
+
+    async def scenario():
+        await queue.start()
+        await queue.submit("flaky", flaky_job, on_done=on_done)
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+    assert len(attempts) == 3
+    assert done == [1]
+    assert queue.stats() == {"depth": 0, "running": 0, "processed": 1, "failed": 0, "retried": 2}
+
+
+def test_job_queue_bounds_concurrency():
+    queue = JobQueue(workers=2, maxsize=10, max_retries=0, retry_delay=0)
+    running = []
+    peak = []
+
+    async def job():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    async def scenario():
+        await queue.start()
+        for _ in range(6):
+            await queue.submit("job", job)
+        depth = queue.depth
+        await queue.stop()
+        return depth
+
+    assert asyncio.run(scenario()) == 6
+    assert max(peak) == 2
+    assert queue.processed == 6
+
+
+def test_job_queue_runs_inline_when_stopped():
+    queue = JobQueue(workers=1, maxsize=10, max_retries=1, retry_delay=0)
+    done = []
+
+    async def failing_job():
+        raise RuntimeError("permanent failure")
+
+    async def on_done():
+        done.append(1)
+
+    asyncio.run(queue.submit("failing", failing_job, on_done=on_done))
+
+    assert done == [1]
+    assert queue.failed == 1
+    assert queue.retried == 1
+
+
+def test_job_queue_stop_calls_on_done_of_dropped_and_cancelled_jobs():
+    queue = JobQueue(workers=1, maxsize=10, max_retries=0, retry_delay=0)
+    done = []
+
+    async def slow_job():
+        await asyncio.sleep(10)
+
+    def on_done(name):
+        async def callback():
+            done.append(name)
+
+        return callback
+
+    async def scenario():
+        await queue.start()
+        await queue.submit("running", slow_job, on_done=on_done("running"))
+        await queue.submit("queued", slow_job, on_done=on_done("queued"))
+        await asyncio.sleep(0)
+        await queue.stop(timeout=0.01)
+
+    asyncio.run(scenario())
+
+    assert done == ["running", "queued"]
+    assert queue.stats() == {"depth": 0, "running": 0, "processed": 0, "failed": 2, "retried": 0}
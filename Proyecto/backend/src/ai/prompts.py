@@ -0,0 +1,118 @@
+"""
+Prompt module for the Naurat Importation Bot API.
+
+This module assembles the chat messages sent to the agent.
+
+Features:
+- The per-language system prompts are built once at import time from `constants/en.py`
+  and `constants/es.py`, so every request sends a byte-identical prefix that the provider's
+  prompt caching can reuse.
+- The system prompt is sent once, followed by the conversation summary and tariff table
+  facts or HS-code candidates (if any) and the recent thread as role-tagged human/AI messages ending with the new prompt.
+"""
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from src.ai.constants import en, es
+
+
+def build_system_prompt(
+    role: str, goal: str, backstory: str, task: str, expected_output: str, labels: tuple
+) -> str:
+    """
+    Builds the system prompt of one language.
+
+    Args:
+        role (str): The agent role.
+        goal (str): The agent goal.
+        backstory (str): The agent backstory.
+        task (str): The task description.
+        expected_output (str): The expected answer template.
+        labels (tuple): The objective, context, task and output section titles.
+
+    Returns:
+        str: The system prompt.
+    """
+
+    objective_label, context_label, task_label, output_label = labels
+
+    return (
+        f"{role}\n\n"
+        f"{objective_label}\n{goal}\n\n"
+        f"{context_label}\n{backstory}"
+        f"{task_label}\n{task}"
+        f"{output_label}\n{expected_output}"
+    )
+
+
+SYSTEM_PROMPTS = {
+    "en": build_system_prompt(
+        en.EN_NAURAT_AGENT_ROLE,
+        en.EN_NAURAT_AGENT_GOAL,
+        en.EN_NAURAT_AGENT_BACKSTORY,
+        en.EN_NAURAT_TASK_DESCRIPTION,
+        en.EN_NAURAT_TASK_EXPECTED_OUTPUT,
+        ("Agent's objective:", "Agent's context:", "Agent's task:", "Agent's output:"),
+    ),
+    "es": build_system_prompt(
+        es.NAURAT_AGENT_ROLE,
+        es.NAURAT_AGENT_GOAL,
+        es.NAURAT_AGENT_BACKSTORY,
+        es.NAURAT_TASK_DESCRIPTION,
+        es.NAURAT_TASK_EXPECTED_OUTPUT,
+        ("Objetivo del agente:", "Contexto del agente:", "Tarea del agente:", "Salida del agente:"),
+    ),
+}
+
+SUMMARY_TITLES = {
+    "en": "Conversation summary:",
+    "es": "Resumen de la conversación:",
+}
+
+
+def history_to_messages(history: list[dict]) -> list[BaseMessage]:
+    """
+    Converts stored message payloads into role-tagged chat messages.
+
+    Args:
+        history (list[dict]): Messages as stored in `Messages.message`, oldest first.
+
+    Returns:
+        list[BaseMessage]: Human and AI messages in the same order.
+    """
+
+    return [
+        AIMessage(content=message["message"])
+        if message["owner"] == "ai"
+        else HumanMessage(content=message["message"])
+        for message in history
+    ]
+
+
+def build_agent_messages(
+    language: str, summary: str | None, messages: list[BaseMessage], facts: str | None = None
+) -> list[BaseMessage]:
+    """
+    Builds the messages sent to the model for one turn.
+
+    Args:
+        language (str): The detected prompt language; anything but 'en' uses Spanish.
+        summary (str | None): The rolling summary of the older conversation, if any.
+        messages (list[BaseMessage]): The recent thread messages, ending with the new prompt.
+        facts (str | None): Tariff table facts for the HS codes in the prompt, or candidate
+            HS codes from the search index, if any.
+
+    Returns:
+        list[BaseMessage]: The system prompt, the summary, the facts and the thread messages.
+    """
+
+    language = "en" if language == "en" else "es"
+    prefix = [SystemMessage(content=SYSTEM_PROMPTS[language])]
+
+    if summary:
+        prefix.append(SystemMessage(content=f"{SUMMARY_TITLES[language]}\n{summary}"))
+
+    if facts:
+        prefix.append(SystemMessage(content=facts))
+
+    return prefix + messages
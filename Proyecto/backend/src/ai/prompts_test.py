@@ -0,0 +1,40 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from src.ai.constants import en, es
+from src.ai.prompts import SYSTEM_PROMPTS, build_agent_messages, history_to_messages
+
+
+def test_system_prompts_are_built_from_the_constants():
+    assert SYSTEM_PROMPTS["en"].startswith(en.EN_NAURAT_AGENT_ROLE)
+    assert en.EN_NAURAT_TASK_EXPECTED_OUTPUT in SYSTEM_PROMPTS["en"]
+    assert SYSTEM_PROMPTS["es"].startswith(es.NAURAT_AGENT_ROLE)
+    assert es.NAURAT_TASK_EXPECTED_OUTPUT in SYSTEM_PROMPTS["es"]
+
+
+def test_build_agent_messages_sends_the_system_prompt_once_with_role_tagged_history():
+    history = [
+        {"owner": "human", "message": "Quiero importar laptops", "lang": "es"},
+        {"owner": "ai", "message": "Claro, ¿desde qué país?", "lang": "es"},
+    ]
+
+    messages = build_agent_messages(
+        "es", "Resumen previo", history_to_messages(history) + [HumanMessage(content="Desde China")]
+    )
+
+    assert [type(message) for message in messages] == [
+        SystemMessage,
+        SystemMessage,
+        HumanMessage,
+        AIMessage,
+        HumanMessage,
+    ]
+    assert messages[0].content is SYSTEM_PROMPTS["es"]
+    assert messages[1].content == "Resumen de la conversación:\nResumen previo"
+    assert messages[-1].content == "Desde China"
+    assert sum(SYSTEM_PROMPTS["es"] in message.content for message in messages) == 1
+
+
+def test_build_agent_messages_without_history():
+    messages = build_agent_messages("en", None, [HumanMessage(content="Import shoes from Vietnam")])
+
+    assert [message.content for message in messages] == [SYSTEM_PROMPTS["en"], "Import shoes from Vietnam"]
@@ -6,8 +6,18 @@ conversation retrieval, and Excel file generation.
 
 Routes:
 - /google_login/: Handles user login via Google authentication and database check.
-- /bot_conversation/{user_email}: Retrieves the conversation history of a user.
-- /get_excel/: Generates and returns an Excel file for the user.
+- /bot_conversation/{user_email}: Retrieves the conversation history of a user, optionally paginated;
+  revalidated with ETag / Last-Modified so unchanged polls get a 304.
+- /get_excel/: Returns the user's Excel file, cached per workbook version and revalidated with ETags.
+- /importation-bot/: Answers a user prompt with the AI agent.
+- /importation-bot/stream/: Same as /importation-bot/, streamed as Server-Sent Events.
+- /importation-bot/batch/: Classifies a list of products, streaming per-product progress.
+- /importation-bot/batch/upload/: Same as /importation-bot/batch/, for a CSV or XLSX file.
+- /tariff/{hs_code}: Returns the tariff table facts of an HS code, or the fractions under it.
+- /hs-search: Returns the HS codes that best match a product name.
+- /cache_stats/: Reports the hit/miss counters of the response, identity, language and XLSX caches.
+- /job_stats/: Reports the depth and counters of the background job queue.
+- /db_stats/: Reports the connection pool state of the database engines.
 
 Dependencies:
 - Database session (db).
@@ -15,36 +25,57 @@ Dependencies:
 '''
 
 
-import uuid
+import asyncio
 import codecs
-import os
+import hashlib
+import json
 import re
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from urllib.parse import urlencode
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
-from sqlalchemy.orm import Session
-from src.ai.schemas import GoogleLogin, AskAgent
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.ai.schemas import GoogleLogin, AskAgent, BatchAskAgent
 
-from langchain_core.messages import HumanMessage, SystemMessage
-from langgraph.graph import START, MessagesState, StateGraph
+from langchain_core.messages import AIMessage, HumanMessage
 
 
 
-from src.database import get_db
+from src.database import AsyncSessionLocal, get_async_db, pool_stats
 from src.models import Users, Messages
+from src.metrics import track_stage
+from src.ai.agent import get_agent
+from src.ai.batch import (
+    BATCH_MAX_ITEMS,
+    BATCH_MAX_UPLOAD_BYTES,
+    BATCH_UPLOAD_MEDIA_TYPES,
+    read_products,
+    run_batch,
+)
+from src.ai.checkpointer import thread_config
 from src.ai.crud import *
-from src.ai.constants.en import *
-from src.ai.constants.es import *
-from src.ai.utils.detect_language import detect_language
+from src.ai.jobs import Job, in_session, job_queue
+from src.ai.prompts import history_to_messages
+from src.ai.utils.artifact_cache import xlsx_cache
+from src.ai.utils.detect_language import detect_language, language_cache
+from src.ai.utils.hs_search import hs_search, prompt_facts
+from src.ai.utils.history import load_recent_messages, load_summary, refresh_summary
+from src.ai.utils.identity import forget_user, get_user_id, identity_cache, remember_user
+from src.ai.utils.pagination import decode_cursor, encode_cursor
+from src.ai.utils.response_cache import response_cache, response_cache_key
+from src.ai.utils.tariff import format_hs_code, get_tariff_index
 
 
 ai_router = APIRouter()
 
 
 @ai_router.post("/google-login/")
-def google_login(user_data: GoogleLogin, db: Session = Depends(get_db)):
+async def google_login(user_data: GoogleLogin, db: AsyncSession = Depends(get_async_db)):
 
     '''
     Handles user login via Google authentication.
@@ -54,7 +85,7 @@ def google_login(user_data: GoogleLogin, db: Session = Depends(get_db)):
 
     Args:
         user_data (GoogleLogin): The user data containing the email obtained from Google Login.
-        db (Session, optional): The database session dependency.
+        db (AsyncSession, optional): The asynchronous database session dependency.
 
     Returns:
         JSONResponse: A response indicating that the user has successfully logged in.
@@ -65,89 +96,518 @@ def google_login(user_data: GoogleLogin, db: Session = Depends(get_db)):
 
     email = user_data.email
 
-    user_record = db.query(Users).filter(Users.email == email).first()
-    if not user_record:
+    if await get_user_id(db, email=email) is None:
+        forget_user(email=email)
         user_record = Users(email=email)
         db.add(user_record)
-        db.commit()
+        await db.commit()
+        remember_user(user_record)
 
     return JSONResponse(
         content={"message": "User logged in successfully"}, status_code=200
     )
 
 
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether an `If-None-Match` header matches an entity tag (weak comparison).
+
+    Args:
+        if_none_match (str | None): The header value, a list of entity tags or `*`.
+        etag (str): The current entity tag.
+
+    Returns:
+        bool: True if the client's copy is current.
+    """
+
+    if not if_none_match:
+        return False
+
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(request: Request, etag: str, last_modified: datetime | None = None) -> bool:
+    """
+    Evaluates the conditional headers of a GET request.
+
+    `If-None-Match` takes precedence; `If-Modified-Since` is only used without it.
+
+    Args:
+        request (Request): The request.
+        etag (str): The current entity tag.
+        last_modified (datetime | None): The current modification time (UTC), if any.
+
+    Returns:
+        bool: True if a 304 response should be sent.
+    """
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if last_modified is None or not if_modified_since:
+        return False
+
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    return last_modified.replace(microsecond=0) <= since
+
+
 @ai_router.get("/bot_conversation/{user_email}")
-def get_user_conversation(user_email: str, db: Session = Depends(get_db)):
+async def get_user_conversation(
+    request: Request,
+    user_email: str,
+    limit: int | None = Query(None, ge=1, le=500),
+    before: str | None = None,
+    after: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
 
     '''
     Retrieve the conversation history for a given user.
 
-    This endpoint retrieves all messages exchanged with a user, ordered by their creation date.
+    This endpoint retrieves the messages exchanged with a user, ordered by their creation date.
+    Without `limit` the whole conversation is returned. With `limit`, a single page is returned
+    using keyset pagination over the `(user_id, created_at)` index: the newest page by default,
+    the page just older than the `before` cursor, or the page just newer than the `after` cursor.
+
+    The `ETag` (and `Last-Modified`) validators are derived from the time and the count of the
+    user's messages, read from the `(user_id, created_at)` index, so a poll sending them back in
+    `If-None-Match` (or `If-Modified-Since`) gets a 304 without the messages being loaded.
+    `Last-Modified` is omitted while the newest message is less than a second old, since a
+    message stored later within the same second would not change it.
 
     Args:
+        request (Request): The request, read for its conditional headers.
         user_email (str): The email of the user whose conversation is being fetched.
-        db (Session, optional): The database session dependency.
+        limit (int | None, optional): Maximum number of messages per page (1-500).
+        before (str | None, optional): Cursor of a message; only older messages are returned.
+        after (str | None, optional): Cursor of a message; only newer messages are returned.
+        db (AsyncSession, optional): The asynchronous database session dependency.
 
     Returns:
-        JSONResponse: A JSON response containing the user's conversation history.
+        JSONResponse: A JSON response containing the user's conversation history and, for a
+        non-empty page, the `before` and `after` cursors of its oldest and newest messages.
 
     Status Codes:
         - 200: Successfully retrieved the conversation.
+        - 304: The client's copy, identified by `If-None-Match` or `If-Modified-Since`, is current.
+        - 400: Invalid cursor, or both `before` and `after` were given.
         - 404: User not found or no conversation available.
     '''
 
-    user_record = db.query(Users).filter(Users.email == user_email).first()
-    if not user_record:
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+
+    try:
+        cursor = decode_cursor(before or after) if (before or after) else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    user_id = await get_user_id(db, email=user_email)
+    if not user_id:
         raise HTTPException(
             status_code=404, detail="No conversation found for this user"
         )
 
-    all_messages = (
-        db.query(Messages)
-        .filter(Messages.user_id == user_record.id)
-        .order_by(Messages.created_at.asc())
-        .all()
-    )
+    latest, count = (
+        await db.execute(
+            select(func.max(Messages.created_at), func.count()).where(Messages.user_id == user_id)
+        )
+    ).one()
+
+    validator = f"{user_id}:{latest.isoformat() if latest else ''}:{count}:{limit}:{before}:{after}"
+    etag = f'W/"{hashlib.sha256(validator.encode()).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if latest is not None:
+        latest = latest.replace(tzinfo=timezone.utc) if latest.tzinfo is None else latest.astimezone(timezone.utc)
+        if datetime.now(timezone.utc) - latest >= timedelta(seconds=1):
+            headers["Last-Modified"] = format_datetime(latest.replace(microsecond=0), usegmt=True)
+        else:
+            latest = None
+
+    if not_modified(request, etag, latest):
+        return Response(status_code=304, headers=headers)
+
+    query = select(Messages).where(Messages.user_id == user_id)
+    position = tuple_(Messages.created_at, Messages.id)
+    newest_first = after is None and limit is not None
+
+    if before:
+        query = query.where(position < cursor)
+    elif after:
+        query = query.where(position > cursor)
+
+    if newest_first:
+        query = query.order_by(Messages.created_at.desc(), Messages.id.desc())
+    else:
+        query = query.order_by(Messages.created_at.asc(), Messages.id.asc())
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    all_messages = list(await db.scalars(query))
+
+    if newest_first:
+        all_messages.reverse()
 
     conversation_list = []
     for message in all_messages:
         conversation_list.append(message.message)
 
-    return JSONResponse(content={"conversation": conversation_list}, status_code=200)
+    content = {"conversation": conversation_list}
+
+    if limit is not None and all_messages:
+        content["cursors"] = {
+            "before": encode_cursor(all_messages[0].created_at, all_messages[0].id),
+            "after": encode_cursor(all_messages[-1].created_at, all_messages[-1].id),
+        }
+
+    return JSONResponse(content=content, status_code=200, headers=headers)
 
 
 @ai_router.get("/get_excel/")
-def get_excel(user_email: str, db: Session = Depends(get_db)):
+async def get_excel(
+    request: Request,
+    user_email: str,
+    batch_id: uuid.UUID | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Generate and return an Excel file for the given user.
 
-    This endpoint generates an Excel file based on the user's data and returns it.
+    This endpoint generates an Excel file based on the user's data and returns it. Product
+    data is extracted by background jobs, so the `X-Extraction-Status` header reports whether
+    some of the user's recent answers are still `pending` or every extraction is `complete`.
+    With `batch_id`, the workbook only holds the products of that batch classification.
+
+    Rendered workbooks are cached per user, workbook version (incremented when a row of the
+    user's conversation is written; batch workbooks never change) and `EXCEL_FORMAT_VERSION`.
+    The `ETag` header identifies both versions, so a client sending it back in
+    `If-None-Match` gets a 304 without the workbook being queried, rendered or sent. The
+    conditional is only evaluated once the workbook is known to exist: a conversation
+    written at least once, or else a cached or rendered workbook. `If-None-Match: *` (or a
+    stale tag) therefore never answers 304 in place of a 202 or 404.
 
     Args:
+        request (Request): The request, read for its `If-None-Match` header.
         user_email (str): The email of the user for whom the Excel file is generated.
-        db (Session, optional): The database session dependency.
+        batch_id (UUID | None, optional): The batch returned by `/importation-bot/batch/`.
+        db (AsyncSession, optional): The asynchronous database session dependency.
 
     Returns:
-        StreamingResponse: A streaming response containing the generated Excel file.
+        Response: The Excel file, or an empty 304 response.
 
     Status Codes:
         - 200: Successfully generated and returned the Excel file.
+        - 202: No data yet, but extractions are still pending.
+        - 304: The client's copy, identified by `If-None-Match`, is current.
         - 404: User not found in the database.
     """
 
-    user = db.query(Users).filter(Users.email == user_email).first()
-    if not user:
+    user_id = await get_user_id(db, email=user_email)
+    if not user_id:
         raise HTTPException(status_code=404, detail="User not found")
-    buffer = generate_excel(user_email=user_email, db=db)
-    return StreamingResponse(
-        buffer,
+
+    pending, excel_version = await get_excel_state(user_id, db)
+    extraction_status = "pending" if pending else "complete"
+
+    version = f"{EXCEL_FORMAT_VERSION}.{'batch' if batch_id else excel_version}"
+    cache_key = f"{user_id}/{batch_id or 'conversation'}:{version}"
+    etag = f'"{hashlib.sha256(cache_key.encode()).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "X-Extraction-Status": extraction_status}
+
+    # A written conversation always has rows; other workbooks may not exist yet.
+    exists = batch_id is None and excel_version > 0
+    if exists and not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    content = await xlsx_cache.get(cache_key)
+
+    if content is None:
+        try:
+            with track_stage("excel_render"):
+                buffer = await generate_excel(user_id=user_id, db=db, batch_id=batch_id)
+        except HTTPException as e:
+            if e.status_code == 404 and pending:
+                return JSONResponse(
+                    content={"status": extraction_status, "pending_extractions": pending},
+                    status_code=202,
+                    headers={"X-Extraction-Status": extraction_status},
+                )
+            raise
+
+        content = buffer.getvalue()
+        await xlsx_cache.set(cache_key, content)
+
+    if not exists and not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(
+        content,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment;filename=products.xlsx"}
+        headers={"Content-Disposition": "attachment;filename=products.xlsx", **headers},
     )
 
 
+async def prepare_agent_input(user_prompt: AskAgent, db: AsyncSession) -> tuple:
+    """
+    Resolves the user, detects the prompt language and builds the agent input.
+
+    The agent resumes the user's checkpointed thread, so the input only carries the new
+    prompt, its language, the rolling summary of older turns and the tariff table facts of
+    the HS codes written in the prompt or, when it has none, the best HS-code candidates of
+    the local search index. A thread is seeded once
+    from the stored `Messages` when it is still empty (conversations started before the
+    checkpointer). A new private user is not committed here: it is inserted with the first
+    turn, so the history queries are skipped.
+
+    Args:
+        user_prompt (AskAgent): The user's prompt containing the input message or question.
+        db (AsyncSession): The asynchronous database session.
+
+    Returns:
+        tuple: The user ID, the new `Users` record to insert with the turn (None for an
+        existing user), the detected language, the agent input and the response cache key
+        (None when the user has prior history, since the answer then depends on it).
+
+    Raises:
+        HTTPException: If no user matches the email and no private identifier was given.
+    """
+
+    prompt = codecs.decode(user_prompt.prompt, "unicode_escape")
+    with track_stage("detect_language"):
+        language = await detect_language(prompt)
+
+    with track_stage("identity"):
+        user_id = await get_user_id(
+            db, email=user_prompt.user_email, private_id=user_prompt.user_id
+        )
+    new_user = None
+
+    if not user_id:
+        if not user_prompt.user_id:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        # Inserted together with the turn by `save_agent_response`.
+        new_user = Users(id=uuid.uuid4(), private_id=user_prompt.user_id, pending_extractions=0)
+        user_id = new_user.id
+
+    summary = ""
+    has_history = False
+    seed_messages = []
+
+    if new_user is None:
+        with track_stage("history"):
+            summary = await load_summary(user_id, db)
+            thread = await get_agent().aget_state(thread_config(user_id))
+            has_history = bool(thread.values.get("messages"))
+
+            if not has_history:
+                seed_messages = history_to_messages(await load_recent_messages(user_id, db))
+                has_history = bool(seed_messages)
+
+    with track_stage("facts"):
+        facts = await prompt_facts(prompt, language)
+
+    cache_key = None if (summary or has_history) else response_cache_key(prompt, language, facts)
+
+    agent_input = {
+        "messages": seed_messages + [HumanMessage(content=prompt)],
+        "language": language,
+        "summary": summary,
+        "facts": facts,
+    }
+
+    return user_id, new_user, language, agent_input, cache_key
+
+
+async def record_cached_turn(user_id, agent_input: dict, response: str) -> None:
+    """
+    Appends a turn answered from the response cache to the user's thread.
+
+    Args:
+        user_id (UUID): The user ID.
+        agent_input (dict): The agent input built by `prepare_agent_input`.
+        response (str): The cached response.
+    """
+
+    await get_agent().aupdate_state(
+        thread_config(user_id),
+        {**agent_input, "messages": agent_input["messages"] + [AIMessage(content=response)]},
+        as_node="model",
+    )
+
+
+async def write_turn(
+    user_prompt: AskAgent,
+    user_id,
+    language: str,
+    response: str,
+    noms_in_response: list[str],
+    db: AsyncSession,
+    new_user: Users | None = None,
+) -> Job | None:
+    """
+    Writes and commits the rows of a finished turn.
+
+    Args:
+        user_prompt (AskAgent): The user's original prompt.
+        user_id (UUID): The ID of the user the conversation belongs to.
+        language (str): The detected prompt language ('en' or 'es').
+        response (str): The complete agent response.
+        noms_in_response (list[str]): The NOMs found in the response.
+        db (AsyncSession): The asynchronous database session.
+        new_user (Users | None): The user created by `prepare_agent_input`, if any.
+
+    Returns:
+        Job | None: The LLM extraction job to queue, if the answer needs one.
+
+    Raises:
+        IntegrityError: If `new_user` was created meanwhile by a concurrent request.
+    """
+
+    extraction = None
+    turn_rows = []
+
+    if new_user is not None:
+        forget_user(private_id=new_user.private_id)
+        db.add(new_user)
+        # Sessions do not autoflush: the user row must be written before the Core insert
+        # below references it.
+        await db.flush()
+
+    is_product_answer, product_data = product_answer_data(user_prompt.prompt, response, language)
+
+    if product_data:
+        result = await db.execute(excel_information_insert(user_id, product_data, db.bind.dialect.name))
+        if new_user is not None:
+            new_user.excel_version = 1
+        elif result.rowcount:
+            await bump_excel_version(user_id, db)
+    elif is_product_answer:
+        extraction = in_session(extract_excel_information, user_id, response, *answer_regulations(response))
+        if new_user is not None:
+            new_user.pending_extractions = 1
+            new_user.pending_extractions_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        else:
+            await mark_extraction_pending(user_id, db)
+
+    turn_rows.append(
+        Messages(
+            user_id=user_id,
+            message={"owner": "human", "message": user_prompt.prompt, "lang": language},
+        )
+    )
+
+    turn_rows.append(
+        Messages(
+            user_id=user_id,
+            message={
+                "owner": "ai",
+                "message": response,
+                "lang": language,
+                "noms": noms_in_response,
+            },
+        )
+    )
+
+    db.add_all(turn_rows)
+    with track_stage("commit"):
+        await db.commit()
+
+    return extraction
+
+
+async def save_agent_response(
+    user_prompt: AskAgent,
+    user_id,
+    language: str,
+    response: str,
+    db: AsyncSession,
+    new_user: Users | None = None,
+) -> dict:
+    """
+    Persists a finished turn and queues the Excel data extraction and the summary refresh.
+
+    The turn is written as one unit of work: a new user, both messages and, when the answer
+    parses locally or its HS code is in the tariff table, its `ExcelInformation` row (skipped
+    if the user already has its normalized HS code, otherwise with the user's workbook version
+    incremented) are
+    committed together; the tariff table's IGI, IVA and DTA take precedence over the generated
+    ones. Answers that need the LLM extraction, and the conversation summary, run as
+    background jobs after the response is sent. When a concurrent request created the same
+    new private user first, the turn is written for that user instead.
+
+    Args:
+        user_prompt (AskAgent): The user's original prompt.
+        user_id (UUID): The ID of the user the conversation belongs to.
+        language (str): The detected prompt language ('en' or 'es').
+        response (str): The complete agent response.
+        db (AsyncSession): The asynchronous database session.
+        new_user (Users | None): The user created by `prepare_agent_input`, if any.
+
+    Returns:
+        dict: The response payload with the message, the NOMs found and the language.
+    """
+
+    with track_stage("nom_extraction"):
+        noms_in_response = re.findall(r"NOM-\d{3}-[A-Z]+-\d{4}", response)
+
+    try:
+        extraction = await write_turn(
+            user_prompt, user_id, language, response, noms_in_response, db, new_user=new_user
+        )
+    except IntegrityError:
+        if new_user is None:
+            raise
+        await db.rollback()
+        user_id = await get_user_id(db, private_id=new_user.private_id)
+        if not user_id:
+            raise
+        new_user = None
+        extraction = await write_turn(user_prompt, user_id, language, response, noms_in_response, db)
+
+    if new_user is not None:
+        remember_user(new_user)
+
+    if extraction:
+        await job_queue.submit(
+            "excel-extraction", extraction, on_done=in_session(finish_extraction, user_id)
+        )
+    await job_queue.submit("conversation-summary", in_session(refresh_summary, user_id))
+
+    return {"message": response, "noms": noms_in_response, "lang": language}
+
+
+def format_sse(data: dict, event: str | None = None) -> str:
+    """
+    Formats a payload as a Server-Sent Events message.
+
+    Args:
+        data (dict): The JSON-serializable payload.
+        event (str | None): Optional event name; unnamed events are delivered as `message`.
+
+    Returns:
+        str: The encoded SSE message.
+    """
+
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @ai_router.post("/importation-bot/")
-async def ask_agent(user_prompt: AskAgent, db: Session = Depends(get_db)):
+async def ask_agent(user_prompt: AskAgent, db: AsyncSession = Depends(get_async_db)):
 
 
     """
@@ -155,11 +615,15 @@ async def ask_agent(user_prompt: AskAgent, db: Session = Depends(get_db)):
 
     This endpoint receives a user prompt, detects the language of the input text,
 
-    and interacts with the AI agent to generate a response.
+    and interacts with the AI agent to generate a response. Every I/O step (OpenAI calls,
+
+    database queries and the LangGraph invocation) is awaited, so a slow generation does not
+
+    block other requests served by the same worker.
 
     Args:
         user_prompt (AskAgent): The user's prompt containing the input message or question.
-        db (Session, optional): The database session dependency.
+        db (AsyncSession, optional): The asynchronous database session dependency.
 
     Returns:
 
@@ -174,132 +638,359 @@ async def ask_agent(user_prompt: AskAgent, db: Session = Depends(get_db)):
     """
 
     try:
-        prompt = codecs.decode(user_prompt.prompt, "unicode_escape")
-        language = detect_language(prompt)
-
-        agent_objective = (
-            "Agent's objective:" if language == "en" else "Objetivo del agente:"
-        )
-        agent_context = (
-            "Agent's context:" if language == "en" else "Contexto del agente:"
-        )
-        agent_task = "Agent's task:" if language == "en" else "Tarea del agente:"
-        agent_output = "Agent's output:" if language == "en" else "Salida del agente:"
-
-        initial_context = (
-            f"{EN_NAURAT_AGENT_ROLE if language == 'en' else NAURAT_AGENT_ROLE}\n\n"
-            f"{agent_objective}\n{EN_NAURAT_AGENT_GOAL if language == 'en' else NAURAT_AGENT_GOAL}\n\n"
-            f"{agent_context}\n{EN_NAURAT_AGENT_BACKSTORY if language == 'en' else NAURAT_AGENT_BACKSTORY}"
-            f"{agent_task}\n{EN_NAURAT_TASK_DESCRIPTION if language == 'en' else NAURAT_TASK_DESCRIPTION}"
-            f"{agent_output}\n{EN_NAURAT_TASK_EXPECTED_OUTPUT if language == 'en' else NAURAT_TASK_EXPECTED_OUTPUT} "
+        user_id, new_user, language, agent_input, cache_key = await prepare_agent_input(
+            user_prompt, db
         )
 
-       
-        workflow = StateGraph(state_schema=MessagesState)
-        model = ChatOpenAI(
-            model="chatgpt-4o-latest",
-            temperature=1,
-            api_key=os.getenv("OPENAI_API_KEY"),
+        with track_stage("response_cache"):
+            response = await response_cache.get(cache_key, db) if cache_key else None
+
+        if response is None:
+            with track_stage("llm"):
+                result = await get_agent().ainvoke(agent_input, config=thread_config(user_id))
+
+            response = result["messages"][-1].content
+
+            if cache_key:
+                await response_cache.set(cache_key, response, db)
+        else:
+            await record_cached_turn(user_id, agent_input, response)
+
+        return JSONResponse(
+            content=await save_agent_response(
+                user_prompt, user_id, language, response, db, new_user=new_user
+            ),
+            status_code=200,
         )
 
-       
-        def call_model(state: MessagesState):
-            response = model.invoke(state["messages"])
-            return {"messages": response}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        workflow.add_edge(START, "model")
-        workflow.add_node("model", call_model)
 
-        memory = MemorySaver()
-        app = workflow.compile(checkpointer=memory)
+@ai_router.post("/importation-bot/stream/")
+async def ask_agent_stream(user_prompt: AskAgent, db: AsyncSession = Depends(get_async_db)):
+    """
+    Ask the AI agent a question and stream the answer as Server-Sent Events.
 
-        thread_id = uuid.uuid4()
+    Tokens are sent as unnamed events (`data: {"token": "..."}`) while the model generates them.
+    Once the generation completes, the turn is persisted, the NOM/Excel extraction is queued and a
+    final `done` event carries the same payload as `/importation-bot/`. Failures after the
+    stream has started are reported with an `error` event.
 
-        if user_prompt.user_email:
-            user = db.query(Users).filter(Users.email == user_prompt.user_email).first()
-        else:
-            user = (
-                db.query(Users).filter(Users.private_id == user_prompt.user_id).first()
-            )
-
-        if not user:
-            if user_prompt.user_id:
-                user = Users(private_id=user_prompt.user_id)
-                db.add(user)
-                db.commit()
-
-        all_messages = (
-            db.query(Messages)
-            .filter(Messages.user_id == user.id)
-            .order_by(Messages.created_at.asc())
-            .all()
-        )
+    Args:
+        user_prompt (AskAgent): The user's prompt containing the input message or question.
+        db (AsyncSession, optional): The asynchronous database session dependency.
+
+    Returns:
+        StreamingResponse: A `text/event-stream` response.
 
-        conversation_list = []
-        for message in all_messages:
-            conversation_list.append(message.message)
+    Status Codes:
+        - 200: The stream started.
+        - 400: Error occurred while preparing the user prompt.
+    """
 
-        conversation_history = "\n".join(
-            [
-                f"{msg['owner'].capitalize()}: {msg['message']}"
-                for msg in conversation_list
-            ]
+    try:
+        user_id, new_user, language, agent_input, cache_key = await prepare_agent_input(
+            user_prompt, db
         )
+        cached_response = await response_cache.get(cache_key, db) if cache_key else None
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def event_stream():
+        tokens = []
+
+        try:
+            if cached_response is not None:
+                tokens.append(cached_response)
+                yield format_sse({"token": cached_response})
+                await record_cached_turn(user_id, agent_input, cached_response)
+            else:
+                with track_stage("llm"):
+                    async for chunk, _ in get_agent().astream(
+                        agent_input, config=thread_config(user_id), stream_mode="messages"
+                    ):
+                        if chunk.content:
+                            tokens.append(chunk.content)
+                            yield format_sse({"token": chunk.content})
+
+            # The request-scoped session is closed once the response starts, so the
+            # turn is persisted with a session owned by the stream itself.
+            async with AsyncSessionLocal() as stream_db:
+                if cache_key and cached_response is None:
+                    await response_cache.set(cache_key, "".join(tokens), stream_db)
+
+                payload = await save_agent_response(
+                    user_prompt, user_id, language, "".join(tokens), stream_db, new_user=new_user
+                )
+            yield format_sse(payload, event="done")
+
+        except HTTPException as e:
+            yield format_sse({"detail": e.detail, "status_code": e.status_code}, event="error")
+        except Exception as e:
+            yield format_sse({"detail": str(e)}, event="error")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def stream_batch(products: list[str], user_email: str, db: AsyncSession) -> StreamingResponse:
+    """
+    Validates a batch and streams its classification as Server-Sent Events.
+
+    Args:
+        products (list[str]): The product descriptions.
+        user_email (str): Email of the user owning the results.
+        db (AsyncSession): The asynchronous database session.
+
+    Returns:
+        StreamingResponse: A `text/event-stream` response with `progress` events and a final
+        `done` event carrying the batch ID and the workbook URL.
+
+    Raises:
+        HTTPException: If the user does not exist (404) or the batch is empty or larger than
+        `BATCH_MAX_ITEMS` (400).
+    """
 
-        input_message = HumanMessage(
-            content=f"{initial_context}\n\n{conversation_history}\nHuman: {prompt}\nAi:"
+    user_id = await get_user_id(db, email=user_email)
+    if not user_id:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    products = [product.strip() for product in products if product.strip()]
+    if not products:
+        raise HTTPException(status_code=400, detail="No products to classify")
+    if len(products) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400, detail=f"A batch holds at most {BATCH_MAX_ITEMS} products"
         )
 
-        config = {"configurable": {"thread_id": thread_id}}
-        result_messages = []
+    batch_id = uuid.uuid4()
 
-        for event in app.stream(
-            {"messages": [SystemMessage(content=initial_context), input_message]},
-            config,
-            stream_mode="values",
-        ):
-            result_messages.append(event["messages"][-1].content)
+    async def event_stream():
+        try:
+            async for event, payload in run_batch(products, user_id, batch_id):
+                if event == "done":
+                    query = urlencode({"user_email": user_email, "batch_id": str(batch_id)})
+                    payload["excel_url"] = f"/ai/get_excel/?{query}"
+                yield format_sse(payload, event=event)
+        except HTTPException as e:
+            yield format_sse({"detail": e.detail, "status_code": e.status_code}, event="error")
+        except Exception as e:
+            yield format_sse({"detail": str(e)}, event="error")
 
-        response = result_messages[-1]
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        noms_in_response = re.findall(r"NOM-\d{3}-[A-Z]+-\d{4}", response)
 
-        answer_product_es = re.search(r"Información\s+de\s+importación\s+para", response)
+@ai_router.post("/importation-bot/batch/")
+async def ask_agent_batch(batch: BatchAskAgent, db: AsyncSession = Depends(get_async_db)):
+    """
+    Classify several products at once and stream the progress as Server-Sent Events.
 
-        answer_product_en = re.search(r"Import\s+information\s+for", response)
+    Every product is answered like a first-turn `/importation-bot/` prompt, outside the user's
+    conversation, with at most `BATCH_CONCURRENCY` products in flight. A `progress` event is
+    sent as each product finishes (`classified` with its HS code, `skipped` when the answer
+    has no product data, or `failed`); the rows are then stored in one bulk insert and a
+    final `done` event carries the counts, the batch ID and the URL of its workbook.
 
-        if answer_product_es or answer_product_en:
+    Args:
+        batch (BatchAskAgent): The product descriptions and the user's email.
+        db (AsyncSession, optional): The asynchronous database session dependency.
 
-            noms_result = re.findall(r"NOM-\d{3}-SCFI-\d{4}\s+\(.*?\)", response, re.IGNORECASE)
+    Returns:
+        StreamingResponse: A `text/event-stream` response.
 
+    Status Codes:
+        - 200: The stream started.
+        - 400: The batch is empty or larger than `BATCH_MAX_ITEMS`.
+        - 404: User not found.
+    """
 
-            cofepris_result = "Aplica" if "COFEPRIS" in response else "No Aplica"
+    return await stream_batch(batch.products, batch.user_email, db)
 
 
-            save_data_into_db( user_email=user_prompt.user_email,data=get_data(response, noms_result if noms_result else "", cofepris_result), db=db)
+@ai_router.post("/importation-bot/batch/upload/")
+async def ask_agent_batch_upload(
+    request: Request, user_email: str, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Classify the products of an uploaded CSV or XLSX file, like `/importation-bot/batch/`.
 
-        new_human_message = Messages(
-            user_id=user.id,
-            message={"owner": "human", "message": user_prompt.prompt, "lang": language},
-        )
-        db.add(new_human_message)
+    The file is sent as the raw request body, of at most `BATCH_MAX_UPLOAD_BYTES`, with a
+    `text/csv`, XLSX or `application/octet-stream` `Content-Type`; multipart forms are
+    rejected rather than read as products. The products are read in a worker thread from its `product`, `producto`, `description` or
+    `descripcion` column, or else from its first column, stopping once the file is known to
+    hold more than `BATCH_MAX_ITEMS` products.
 
-        new_ai_message = Messages(
-            user_id=user.id,
-            message={
-                "owner": "ai",
-                "message": response,
-                "lang": language,
-                "noms": noms_in_response,
-            },
-        )
-        db.add(new_ai_message)
-        db.commit()
+    Args:
+        request (Request): The request whose body is the file.
+        user_email (str): Email of the user owning the results.
+        db (AsyncSession, optional): The asynchronous database session dependency.
 
-        return JSONResponse(
-            content={"message": response, "noms": noms_in_response, "lang": language},
-            status_code=200,
+    Returns:
+        StreamingResponse: A `text/event-stream` response.
+
+    Status Codes:
+        - 200: The stream started.
+        - 400: The file is unreadable, empty or holds more than `BATCH_MAX_ITEMS` products.
+        - 404: User not found.
+        - 413: The file is larger than `BATCH_MAX_UPLOAD_BYTES`.
+        - 415: The body is not a raw CSV, XLSX or binary file (e.g. a multipart form).
+    """
+
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type not in BATCH_UPLOAD_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=415,
+            detail="Send the file as the raw body with a text/csv, XLSX or application/octet-stream Content-Type",
         )
 
-    except Exception as e:
+    too_large = HTTPException(status_code=413, detail=f"The file must not exceed {BATCH_MAX_UPLOAD_BYTES} bytes")
+
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > BATCH_MAX_UPLOAD_BYTES:
+        raise too_large
+
+    content = bytearray()
+    async for chunk in request.stream():
+        content.extend(chunk)
+        if len(content) > BATCH_MAX_UPLOAD_BYTES:
+            raise too_large
+
+    try:
+        products = await asyncio.to_thread(read_products, bytes(content), BATCH_MAX_ITEMS)
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+    return await stream_batch(products, user_email, db)
+
+
+@ai_router.get("/tariff/{hs_code}")
+def get_tariff(hs_code: str, limit: int = Query(50, ge=1, le=500)):
+    """
+    Look up an HS code in the local tariff table.
+
+    A complete fraction (e.g. `8471.30.01`) returns its facts; a chapter, heading or
+    subheading returns the fractions under it.
+
+    Args:
+        hs_code (str): The HS code, with or without dots.
+        limit (int, optional): Maximum number of fractions returned for a prefix (1-500).
+
+    Returns:
+        JSONResponse: The fraction facts, or `{"matches": [...]}` for a prefix.
+
+    Status Codes:
+        - 200: The code or prefix was found.
+        - 404: No fraction matches the code.
+    """
+
+    tariff_index = get_tariff_index()
+
+    def serialize(entry) -> dict:
+        return {**entry._asdict(), "hs_code": format_hs_code(entry.hs_code)}
+
+    entry = tariff_index.get(hs_code)
+    if entry is not None:
+        return JSONResponse(content=serialize(entry), status_code=200)
+
+    matches = tariff_index.prefix(hs_code, limit=limit)
+    if not matches:
+        raise HTTPException(status_code=404, detail="HS code not found in the tariff table")
+
+    return JSONResponse(content={"matches": [serialize(match) for match in matches]}, status_code=200)
+
+
+@ai_router.get("/hs-search")
+async def search_hs_codes(
+    q: str = Query(..., min_length=2, max_length=200),
+    k: int = Query(5, ge=1, le=50),
+):
+    """
+    Find the HS codes that best match a product name.
+
+    Results come from a local BM25 index over the tariff table descriptions, so no LLM call
+    is made and no user's stored products are exposed.
+
+    Args:
+        q (str): The product name, in Spanish or English.
+        k (int, optional): Maximum number of HS codes returned (1-50).
+
+    Returns:
+        JSONResponse: The query and the candidates (`hs_code`, `description`, `score`), best first.
+
+    Status Codes:
+        - 200: Search completed, possibly without results.
+    """
+
+    hs_index = await hs_search.get_index()
+
+    return JSONResponse(content={"query": q, "results": hs_index.search(q, k)}, status_code=200)
+
+
+@ai_router.get("/cache_stats/")
+def get_cache_stats():
+    """
+    Report the counters of the agent response, user identity, language and XLSX workbook
+    caches for this worker process.
+
+    Returns:
+        JSONResponse: The response cache backend, hits, misses and hit rate, the identity
+        and language cache hits, misses, hit rate and entries (shared by every worker with
+        the `sqlite` cache backend), and the XLSX cache hits, misses, hit rate, entries and
+        bytes in memory.
+
+    Status Codes:
+        - 200: Successfully returned the counters.
+    """
+
+    return JSONResponse(
+        content={
+            "response_cache": response_cache.stats(),
+            "identity_cache": identity_cache.stats(),
+            "language_cache": language_cache.stats(),
+            "xlsx_cache": xlsx_cache.stats(),
+        },
+        status_code=200,
+    )
+
+
+@ai_router.get("/job_stats/")
+def get_job_stats():
+    """
+    Report the depth and counters of the background job queue for this worker process.
+
+    Returns:
+        JSONResponse: The queue depth, running jobs and processed, failed and retried counts.
+
+    Status Codes:
+        - 200: Successfully returned the counters.
+    """
+
+    return JSONResponse(content={"jobs": job_queue.stats()}, status_code=200)
+
+
+@ai_router.get("/db_stats/")
+def get_db_stats():
+    """
+    Report the connection pool state of the database engines for this worker process.
+
+    Returns:
+        JSONResponse: Per engine, the pool class and, for queue pools, its size, checked-out,
+        idle and overflow connections and its timeout.
+
+    Status Codes:
+        - 200: Successfully returned the pool state.
+    """
+
+    return JSONResponse(content={"pools": pool_stats()}, status_code=200)
@@ -1,99 +1,57 @@
+import asyncio
 import io
+import os
 import re
+import uuid
 import pytest
-from datetime import datetime
+from datetime import timedelta
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-
-from src.ai.router import ai_router, StateGraph
-from src.database import get_db
+from openpyxl import load_workbook
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.ai.router import ai_router
+from src.ai.agent import StateGraph
+from src.database import Base, get_async_db
+from src.models import ExcelInformation, Messages, Users
+from src.ai.schemas import AskAgent
 import src.ai.crud as crud
 import src.ai.utils.detect_language as detect_mod
 
 
-class FakeColumn:
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return lambda instance: getattr(instance, self.name) == other
-
-
-class FakeUser:
-    email = FakeColumn("email")
-    private_id = FakeColumn("private_id")
-
-    def __init__(self, email=None, private_id=None):
-        self.email = email
-        self.private_id = private_id
-        self.id = None
-
-
-class FakeMessage:
-    def __init__(self, user_id, message, created_at=None):
-        self.user_id = user_id
-        self.message = message
-        self.created_at = created_at or datetime.now()
-
-
-class FakeQuery:
-    def __init__(self, items):
-        self.items = items
-
-    def filter(self, condition):
-        self.items = list(filter(condition, self.items))
-        return self
-
-    def order_by(self, key_func):
-        self.items = sorted(self.items, key=key_func)
-        return self
-
-    def first(self):
-        return self.items[0] if self.items else None
-
-    def all(self):
-        return self.items
-
-
-class FakeDBSession:
-    def __init__(self):
-        self.users = []
-        self.messages = []
-        self._id_counter = 1
-
-    def query(self, model):
-        if model.__name__ == "Users":
-            return FakeQuery(self.users)
-        elif model.__name__ == "Messages":
-            return FakeQuery(self.messages)
-        return FakeQuery([])
-
-    def add(self, obj):
-        if hasattr(obj, "email"):
-            if not getattr(obj, "id", None):
-                obj.id = self._id_counter
-                self._id_counter += 1
-            self.users.append(obj)
-        elif hasattr(obj, "user_id"):
-            self.messages.append(obj)
-
-    def commit(self):
-        pass
-
 app = FastAPI()
 app.include_router(ai_router)
 client = TestClient(app)
 
 
 @pytest.fixture
-def fake_db():
-    db = FakeDBSession()
-    app.dependency_overrides[get_db] = lambda: db
-    yield db
-    app.dependency_overrides[get_db] = lambda: FakeDBSession()
+def isolated_db(tmp_path):
+    # NullPool: connections are opened by the test client's event loop, not by asyncio.run.
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/router.db", poolclass=NullPool)
+    # Same session options as `AsyncSessionLocal`, with foreign keys enforced like PostgreSQL.
+    sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    event.listen(engine.sync_engine, "connect", lambda connection, record: connection.execute("PRAGMA foreign_keys=ON"))
+
+    async def create_tables():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
 
+    async def override_get_async_db():
+        async with sessions() as db:
+            yield db
 
-def fake_generate_excel(user_email, db):
+    asyncio.run(create_tables())
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    yield sessions
+    app.dependency_overrides.pop(get_async_db)
+    asyncio.run(engine.dispose())
+
+
+async def fake_generate_excel(user_id, db):
     return io.BytesIO(b"Contenido de Excel simulado")
 
 
@@ -105,18 +63,40 @@ class DummyMessage:
         self.content = content
 
 
+class DummyState:
+    def __init__(self, values):
+        self.values = values
+
+
 class FakeStreamApp:
     def stream(self, payload, config, stream_mode):
         yield {"messages": [DummyMessage("Test AI response NOM-001-SCFI-2023 (dummy)")]}
 
+    async def ainvoke(self, payload, config=None):
+        return {"messages": [DummyMessage("Test AI response NOM-001-SCFI-2023 (dummy)")]}
+
+    async def astream(self, payload, config=None, stream_mode=None):
+        for token in ["Test AI response ", "NOM-001-SCFI-2023 ", "(dummy)"]:
+            yield DummyMessage(token), {}
+
+    async def aget_state(self, config):
+        return DummyState({})
+
+    async def aupdate_state(self, config, values, as_node=None):
+        return config
+
 
 StateGraph.compile = lambda self, checkpointer: FakeStreamApp()
 
 
-crud.save_data_into_db = lambda user_email, data, db: None
+crud.save_data_into_db = lambda user_id, data, db: None
+
+
+async def fake_detect_language_remote(text):
+    return "en"
 
 
-detect_mod.detect_language = lambda text: "en"
+detect_mod.detect_language_remote = fake_detect_language_remote
 
 def test_google_login():
     payload = {"email": "test@example.com"}
@@ -144,6 +124,493 @@ def test_ask_agent_invalid_payload():
     }
     response = client.post("/importation-bot/", json=payload)
    
+    assert response.status_code == 404
+
+
+def test_ask_agent_new_private_user():
+    payload = {
+        "prompt": "Test prompt",
+        "user_email": None,
+        "user_id": "private-123"
+    }
+    response = client.post("/importation-bot/", json=payload)
+
+    assert response.status_code == 200
+    assert response.json()["noms"] == ["NOM-001-SCFI-2023"]
+    assert response.json()["lang"] == "en"
+
+
+def test_ask_agent_new_user_product_answer_respects_foreign_keys(isolated_db, monkeypatch):
+    import src.ai.router as router
+    from sqlalchemy import select
+
+    product = {
+        "Nombre del Producto": "Laptops", "HS Code": "8471.30.01", "Origen del País": "China",
+        "Impuestos IGI (Tasa Máxima)": "0%", "Impuestos IGI (Reducciones aplicables)": "",
+        "IVA (%)": "16%", "DTA (%)": "0.8%", "NOMs": [], "COFEPRIS": "No Aplica",
+    }
+    monkeypatch.setattr(router, "product_answer_data", lambda prompt, response, language: (True, product))
+
+    response = client.post("/importation-bot/", json={"prompt": "Import laptops", "user_id": "private-fk"})
+    assert response.status_code == 200
+
+    async def stored():
+        async with isolated_db() as db:
+            return (await db.execute(select(Users.excel_version, ExcelInformation.hs_code).join(ExcelInformation))).all()
+
+    assert asyncio.run(stored()) == [(1, "8471.30.01")]
+
+
+def test_save_agent_response_joins_a_private_user_created_concurrently(isolated_db, monkeypatch):
+    import src.ai.router as router
+    from sqlalchemy import select
+
+    async def no_jobs(name, job, on_done=None):
+        pass
+
+    monkeypatch.setattr(router.job_queue, "submit", no_jobs)
+    existing_id = uuid.uuid4()
+
+    async def scenario():
+        async with isolated_db() as db:
+            db.add(Users(id=existing_id, private_id="private-race"))
+            await db.commit()
+
+        async with isolated_db() as db:
+            late_user = Users(id=uuid.uuid4(), private_id="private-race", pending_extractions=0)
+            await router.save_agent_response(
+                AskAgent(prompt="Hola", user_id="private-race"), late_user.id, "es", "Respuesta", db,
+                new_user=late_user,
+            )
+            return (await db.execute(select(Messages.user_id))).scalars().all()
+
+    assert asyncio.run(scenario()) == [existing_id, existing_id]
+
+
+def test_ask_agent_stream():
+    payload = {
+        "prompt": "Test stream prompt",
+        "user_email": None,
+        "user_id": "private-456"
+    }
+    response = client.post("/importation-bot/stream/", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = response.text.strip().split("\n\n")
+    assert events[0] == 'data: {"token": "Test AI response "}'
+    assert events[-1].startswith("event: done\n")
+    assert '"noms": ["NOM-001-SCFI-2023"]' in events[-1]
+
+
+def test_bot_conversation_keyset_pagination():
+    email = "pages@example.com"
+    client.post("/google-login/", json={"email": email})
+    for turn in range(3):
+        client.post("/importation-bot/", json={"prompt": f"Test prompt {turn}", "user_email": email})
+
+    full = client.get(f"/bot_conversation/{email}").json()["conversation"]
+    assert len(full) == 6
+
+    newest = client.get(f"/bot_conversation/{email}?limit=4").json()
+    older = client.get(
+        f"/bot_conversation/{email}?limit=4&before={newest['cursors']['before']}"
+    ).json()
+    newer = client.get(
+        f"/bot_conversation/{email}?limit=4&after={older['cursors']['after']}"
+    ).json()
+
+    assert len(newest["conversation"]) == 4
+    assert len(older["conversation"]) == 2
+    assert older["conversation"] + newest["conversation"] == full
+    assert newer["conversation"] == newest["conversation"]
+
+
+def test_bot_conversation_conditional_get(isolated_db):
+    from datetime import datetime, timedelta
+    from src.models import Messages
+
+    async def create_user():
+        async with isolated_db() as db:
+            user = Users(email="polling@example.com")
+            db.add(user)
+            await db.commit()
+            return user.id
+
+    async def add_message(text, created_at):
+        async with isolated_db() as db:
+            db.add(Messages(user_id=user_id, message={"owner": "human", "message": text}, created_at=created_at))
+            await db.commit()
+
+    user_id = asyncio.run(create_user())
+    an_hour_ago = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    asyncio.run(add_message("first", an_hour_ago))
+    url = "/bot_conversation/polling@example.com"
+
+    first = client.get(url)
+    assert first.status_code == 200
+    etag, last_modified = first.headers["ETag"], first.headers["Last-Modified"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(f"{url}?limit=1", headers={"If-None-Match": etag}).status_code == 200
+
+    # Same second as the first message: only the message count changes.
+    asyncio.run(add_message("second", an_hour_ago))
+
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(changed.json()["conversation"]) == 2
+    assert changed.headers["ETag"] != etag
+
+
+def test_bot_conversation_keeps_turn_order_within_a_second(isolated_db):
+    from src.models import time_ordered_uuid
+
+    ids = [time_ordered_uuid() for _ in range(1000)]
+    assert ids == sorted(ids) and sorted(id.hex for id in ids) == [id.hex for id in ids]
+    assert {id.version for id in ids} == {7}
+
+    email = "turn-order@example.com"
+    client.post("/google-login/", json={"email": email})
+    for turn in range(20):
+        client.post("/importation-bot/", json={"prompt": f"Order prompt {turn}", "user_email": email})
+
+    conversation = client.get(f"/bot_conversation/{email}").json()["conversation"]
+    assert [message["owner"] for message in conversation] == ["human", "ai"] * 20
+    assert [message["message"] for message in conversation[::2]] == [f"Order prompt {turn}" for turn in range(20)]
+
+
+def test_bot_conversation_invalid_cursor():
+    client.post("/google-login/", json={"email": "cursor@example.com"})
+    response = client.get("/bot_conversation/cursor@example.com?limit=2&before=not-a-cursor")
     assert response.status_code == 400
 
 
+def test_ask_agent_response_cache_hit_for_new_users():
+    stats_before = client.get("/cache_stats/").json()["response_cache"]
+
+    for user_id in ("cache-user-1", "cache-user-2"):
+        response = client.post(
+            "/importation-bot/",
+            json={"prompt": "Import cached laptops from China", "user_id": user_id},
+        )
+        assert response.status_code == 200
+
+    stats_after = client.get("/cache_stats/").json()["response_cache"]
+    assert stats_after["hits"] == stats_before["hits"] + 1
+    assert stats_after["misses"] == stats_before["misses"] + 1
+
+
+def test_get_excel_reports_pending_extraction(monkeypatch):
+    import src.ai.router as router
+
+    async def no_data_yet(user_id, db, batch_id=None):
+        raise router.HTTPException(status_code=404, detail="No data found for this user")
+
+    async def known_user(db, email=None, private_id=None):
+        return "user-1"
+
+    async def one_pending(user_id, db):
+        return 1, 0
+
+    monkeypatch.setattr(router, "get_user_id", known_user)
+    monkeypatch.setattr(router, "get_excel_state", one_pending)
+    monkeypatch.setattr(router, "generate_excel", no_data_yet)
+
+    response = client.get("/get_excel/?user_email=pending@example.com")
+    assert response.status_code == 202
+    assert response.headers["X-Extraction-Status"] == "pending"
+    assert response.json() == {"status": "pending", "pending_extractions": 1}
+
+    assert client.get("/get_excel/?user_email=pending@example.com", headers={"If-None-Match": "*"}).status_code == 202
+
+
+def test_pending_extraction_count_expires(isolated_db):
+    user_id = uuid.uuid4()
+    lost_at = crud.extraction_pending_cutoff() - timedelta(seconds=60)
+
+    async def scenario():
+        async with isolated_db() as db:
+            db.add(Users(id=user_id, email="lost@example.com", pending_extractions=2, pending_extractions_at=lost_at))
+            await db.commit()
+            expired = await crud.get_excel_state(user_id, db)
+
+            await crud.mark_extraction_pending(user_id, db)
+            await db.commit()
+            return expired, await crud.get_excel_state(user_id, db)
+
+    assert asyncio.run(scenario()) == ((0, 0), (1, 0))
+
+
+def test_get_tariff(monkeypatch):
+    import src.ai.router as router
+    from src.ai.utils.tariff import TariffEntry, TariffIndex
+
+    tariff_index = TariffIndex([
+        TariffEntry("84713001", "Laptops", "0%", "16%", "0.8%"),
+        TariffEntry("84713099", "Las demás", "0%", "16%", "0.8%"),
+    ])
+    monkeypatch.setattr(router, "get_tariff_index", lambda: tariff_index)
+
+    response = client.get("/tariff/8471.30.01")
+    assert response.status_code == 200
+    assert response.json() == {
+        "hs_code": "8471.30.01", "description": "Laptops", "igi_max": "0%", "iva": "16%", "dta": "0.8%"
+    }
+
+    assert len(client.get("/tariff/847130").json()["matches"]) == 2
+    assert client.get("/tariff/9999").status_code == 404
+
+
+def test_hs_search(monkeypatch):
+    import src.ai.router as router
+    from src.ai.utils.hs_search import BM25Index
+
+    monkeypatch.setattr(router.hs_search, "index", BM25Index([
+        ("85183001", "Audífonos y auriculares"),
+        ("84713001", "Máquinas automáticas para tratamiento de datos portátiles"),
+    ]))
+
+    response = client.get("/hs-search", params={"q": "audifonos", "k": 3})
+
+    assert response.status_code == 200
+    assert [result["hs_code"] for result in response.json()["results"]] == ["8518.30.01"]
+    assert client.get("/hs-search", params={"q": "audifonos", "k": 0}).status_code == 422
+
+
+def test_get_excel_renders_user_rows(isolated_db):
+    async def seed():
+        async with isolated_db() as db:
+            user = Users(email="excel-rows@example.com")
+            db.add(user)
+            await db.flush()
+            db.add_all([
+                ExcelInformation(
+                    user_id=user.id, product_name=f"Producto {index}", hs_code=f"8471.30.0{index}",
+                    from_country="China", cofepris="No Aplica", igi_max="0%", igi_reductions="T-MEC",
+                    iva="16%", dta="0.8%", noms="",
+                )
+                for index in range(3)
+            ])
+            await db.commit()
+
+    asyncio.run(seed())
+
+    response = client.get("/get_excel/?user_email=excel-rows@example.com")
+
+    assert response.status_code == 200
+    assert response.headers["X-Extraction-Status"] == "complete"
+
+    rows = list(load_workbook(io.BytesIO(response.content)).active.values)
+    assert rows[0][0] == "Nombre del Producto"
+    assert [row[1] for row in rows[1:]] == ["8471.30.00", "8471.30.01", "8471.30.02"]
+
+
+def test_get_excel_revalidates_cached_workbook(isolated_db, monkeypatch):
+    import src.ai.router as router
+    from src.ai.utils.artifact_cache import ArtifactCache
+
+    monkeypatch.setattr(router, "xlsx_cache", ArtifactCache(1024 * 1024))
+    renders = []
+    generate_excel = router.generate_excel
+
+    async def counted_generate_excel(user_id, db, batch_id=None):
+        renders.append(user_id)
+        return await generate_excel(user_id=user_id, db=db, batch_id=batch_id)
+
+    monkeypatch.setattr(router, "generate_excel", counted_generate_excel)
+
+    def data(hs_code):
+        return {
+            "Nombre del Producto": "Laptops", "HS Code": hs_code, "Origen del País": "China",
+            "Impuestos IGI (Tasa Máxima)": "0%", "Impuestos IGI (Reducciones aplicables)": "",
+            "IVA (%)": "16%", "DTA (%)": "0.8%", "NOMs": [], "COFEPRIS": "No Aplica",
+        }
+
+    async def save(hs_code):
+        async with isolated_db() as db:
+            user_id = await router.get_user_id(db, email="etag@example.com")
+            if user_id is None:
+                user = Users(email="etag@example.com")
+                db.add(user)
+                await db.commit()
+                user_id = user.id
+            # What `crud.save_data_into_db` (stubbed for these tests) writes.
+            await db.execute(crud.excel_information_insert(user_id, data(hs_code), "sqlite"))
+            await crud.bump_excel_version(user_id, db)
+            await db.commit()
+
+    asyncio.run(save("8471.30.01"))
+    url = "/get_excel/?user_email=etag@example.com"
+
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and len(renders) == 1
+
+    revalidated = client.get(url, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+
+    assert client.get(url).content == first.content
+    assert len(renders) == 1
+
+    asyncio.run(save("8518.30.01"))
+
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(renders) == 2
+    assert len(list(load_workbook(io.BytesIO(changed.content)).active.values)) == 3
+
+    assert client.get(url, headers={"If-None-Match": "*"}).status_code == 304
+
+    monkeypatch.setattr(router, "EXCEL_FORMAT_VERSION", router.EXCEL_FORMAT_VERSION + 1)
+    relaid = client.get(url, headers={"If-None-Match": changed.headers["ETag"]})
+    assert relaid.status_code == 200
+    assert relaid.headers["ETag"] != changed.headers["ETag"]
+    assert len(renders) == 3
+
+
+def test_db_stats():
+    response = client.get("/db_stats/")
+
+    assert response.status_code == 200
+    assert set(response.json()["pools"]) == {"async", "sync"}
+
+
+def test_ask_agent_batch_streams_progress_and_exports_workbook(monkeypatch):
+    import json
+    import src.ai.batch as batch
+    from src.ai.utils.parse_answer_test import ENGLISH_BATTERIES, SPANISH_LAPTOPS
+
+    answers = {
+        "laptops desde China": SPANISH_LAPTOPS,
+        "lithium batteries from China": ENGLISH_BATTERIES,
+        "hola": "Hola, ¿en qué puedo ayudarte?",
+    }
+
+    async def fake_answer_prompt(prompt, language, facts=None):
+        if prompt not in answers:
+            raise RuntimeError("model unavailable")
+        return answers[prompt]
+
+    monkeypatch.setattr(batch, "answer_prompt", fake_answer_prompt)
+    client.post("/google-login/", json={"email": "batch@example.com"})
+
+    response = client.post("/importation-bot/batch/", json={
+        "products": ["laptops desde China", "lithium batteries from China", "hola", "unknown product", " "],
+        "user_email": "batch@example.com",
+    })
+
+    assert response.status_code == 200
+    events = [
+        (re.search(r"event: (\w+)", block).group(1), json.loads(re.search(r"data: (.*)", block).group(1)))
+        for block in response.text.strip().split("\n\n")
+    ]
+    progress = {payload["product"]: payload for event, payload in events if event == "progress"}
+    assert progress["laptops desde China"]["status"] == "classified"
+    assert progress["laptops desde China"]["hs_code"] == "8471.30.01"
+    assert progress["hola"]["status"] == "skipped"
+    assert progress["unknown product"]["status"] == "failed"
+
+    event, done = events[-1]
+    assert event == "done"
+    assert (done["total"], done["classified"], done["skipped"], done["failed"]) == (4, 2, 1, 1)
+
+    workbook = client.get(done["excel_url"].removeprefix("/ai"))
+    rows = list(load_workbook(io.BytesIO(workbook.content)).active.values)
+    assert [row[1] for row in rows[1:]] == ["8471.30.01", "8507.60.99"]
+
+
+def test_ask_agent_batch_rejects_unknown_user_and_empty_batch():
+    assert client.post(
+        "/importation-bot/batch/", json={"products": ["laptops"], "user_email": "nobody@example.com"}
+    ).status_code == 404
+
+    client.post("/google-login/", json={"email": "batch-empty@example.com"})
+    assert client.post(
+        "/importation-bot/batch/upload/?user_email=batch-empty@example.com",
+        content=b"product\n\n",
+        headers={"Content-Type": "text/csv"},
+    ).status_code == 400
+
+
+def test_ask_agent_batch_upload_bounds_size_and_items(monkeypatch):
+    import src.ai.router as router
+
+    monkeypatch.setattr(router, "BATCH_MAX_UPLOAD_BYTES", 64)
+    url = "/importation-bot/batch/upload/?user_email=batch-bounds@example.com"
+    client.post("/google-login/", json={"email": "batch-bounds@example.com"})
+    csv_type = {"Content-Type": "text/csv"}
+
+    assert client.post(url, content=b"x" * 65, headers=csv_type).status_code == 413
+    # Without Content-Length the body is still read only up to the limit.
+    assert client.post(url, content=iter([b"product\n", b"y" * 64]), headers=csv_type).status_code == 413
+
+    monkeypatch.setattr(router, "BATCH_MAX_ITEMS", 2)
+    response = client.post(url, content=b"a\nb\nc\nd\n", headers=csv_type)
+    assert response.status_code == 400
+    assert "at most 2" in response.json()["detail"]
+
+
+def test_ask_agent_batch_upload_rejects_multipart_forms():
+    url = "/importation-bot/batch/upload/?user_email=batch-form@example.com"
+
+    response = client.post(url, files={"file": ("products.csv", b"product\nlaptops\n", "text/csv")})
+    assert response.status_code == 415
+    assert client.post(url, content=b"product\nlaptops\n").status_code == 415
+
+
+def test_excel_information_insert_keeps_the_first_row_of_a_normalized_hs_code(isolated_db):
+    from sqlalchemy import select
+
+    def data(hs_code, igi_max):
+        return {
+            "Nombre del Producto": "Laptops", "HS Code": hs_code, "Origen del País": "China",
+            "Impuestos IGI (Tasa Máxima)": igi_max, "Impuestos IGI (Reducciones aplicables)": "",
+            "IVA (%)": "16%", "DTA (%)": "0.8%", "NOMs": [], "COFEPRIS": "No Aplica",
+        }
+
+    async def insert_twice():
+        async with isolated_db() as db:
+            user = Users(email="insert@example.com")
+            db.add(user)
+            await db.flush()
+
+            first = await db.execute(crud.excel_information_insert(user.id, data('{"8471.30.01"}', "5%"), "sqlite"))
+            second = await db.execute(crud.excel_information_insert(user.id, data("84713001", "0%"), "sqlite"))
+            await db.commit()
+
+            rows = (await db.execute(select(ExcelInformation.hs_code, ExcelInformation.igi_max))).all()
+            return first.rowcount, second.rowcount, rows
+
+    assert asyncio.run(insert_twice()) == (1, 0, [("8471.30.01", "5%")])
+
+
+def test_get_excel_keeps_insertion_order(isolated_db):
+    def data(hs_code):
+        return {
+            "Nombre del Producto": f"Producto {hs_code}", "HS Code": hs_code, "Origen del País": "China",
+            "Impuestos IGI (Tasa Máxima)": "0%", "Impuestos IGI (Reducciones aplicables)": "",
+            "IVA (%)": "16%", "DTA (%)": "0.8%", "NOMs": [], "COFEPRIS": "No Aplica",
+        }
+
+    async def seed():
+        async with isolated_db() as db:
+            user = Users(email="excel-order@example.com")
+            db.add(user)
+            await db.flush()
+
+            for hs_code in ("8518.30.01", "8471.30.01", "8518.30.01", "0101.21.01"):
+                await db.execute(crud.excel_information_insert(user.id, data(hs_code), "sqlite"))
+            await db.commit()
+
+    asyncio.run(seed())
+
+    response = client.get("/get_excel/?user_email=excel-order@example.com")
+
+    rows = list(load_workbook(io.BytesIO(response.content)).active.values)
+    assert [row[1] for row in rows[1:]] == ["8518.30.01", "8471.30.01", "0101.21.01"]
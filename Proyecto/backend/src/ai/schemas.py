@@ -26,6 +26,19 @@ class AskAgent(BaseModel):
     user_id: str | None = None
 
 
+class BatchAskAgent(BaseModel):
+    """
+    Schema for classifying several products at once.
+
+    Attributes:
+        products (list[str]): The product descriptions, one per item.
+        user_email (str): Email of the user owning the results.
+    """
+
+    products: list[str]
+    user_email: str
+
+
 class GoogleLogin(BaseModel):
     """
     Schema for handling Google login requests.
@@ -0,0 +1,287 @@
+"""
+Artifact cache module for the Naurat Importation Bot API.
+
+This module keeps rendered files (the `products.xlsx` workbooks) so repeated downloads of an
+unchanged export skip the query and the rendering.
+
+Features:
+- An in-memory tier bounded by the total size of its artifacts, with least-recently-used
+  eviction.
+- An optional on-disk tier (one file per artifact, in one directory per scope), shared by
+  the worker processes of a host; disk hits are promoted to memory. Its reads and writes
+  run in a worker thread, off the event loop, and its size bound is enforced by a sweep
+  every `XLSX_CACHE_DISK_SWEEP_EVERY` stores, so it may overshoot by that many artifacts.
+- Keys are `scope:version` strings: storing a new version of a scope drops its older
+  versions from both tiers, so stale workbooks do not wait for eviction.
+- Hit and miss counters for monitoring.
+
+Environment Variables:
+- `XLSX_CACHE_MAX_BYTES`: Size of the memory tier. Defaults to 64 MiB; 0 disables it.
+- `XLSX_CACHE_DIR`: Directory of the disk tier. Without it only memory is used.
+- `XLSX_CACHE_DISK_MAX_BYTES`: Size of the disk tier. Defaults to 1 GiB.
+- `XLSX_CACHE_DISK_SWEEP_EVERY`: Stores between two sweeps of the disk tier. Defaults to 50.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+XLSX_CACHE_MAX_BYTES = int(os.getenv("XLSX_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+XLSX_CACHE_DIR = os.getenv("XLSX_CACHE_DIR")
+
+XLSX_CACHE_DISK_MAX_BYTES = int(os.getenv("XLSX_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+XLSX_CACHE_DISK_SWEEP_EVERY = int(os.getenv("XLSX_CACHE_DISK_SWEEP_EVERY", "50"))
+
+
+def _scope(key: str) -> str:
+    return key.rsplit(":", 1)[0]
+
+
+class ArtifactCache:
+    """
+    Size-bounded LRU cache of binary artifacts with an optional on-disk tier.
+
+    Attributes:
+        max_bytes (int): Maximum total size of the memory tier.
+        directory (str | None): Directory of the disk tier, if enabled.
+        disk_max_bytes (int): Maximum total size of the disk tier.
+        sweep_every (int): Stores between two sweeps enforcing `disk_max_bytes`.
+        hits (int): Number of lookups served from memory or disk.
+        misses (int): Number of lookups found in neither tier.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        directory: str | None = None,
+        disk_max_bytes: int = 0,
+        sweep_every: int = XLSX_CACHE_DISK_SWEEP_EVERY,
+    ):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self.sweep_every = sweep_every
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._stores = 0
+        self._lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        """
+        Returns the disk tier file of a key, in the directory of its scope.
+
+        Args:
+            key (str): The `scope:version` key.
+
+        Returns:
+            str: The file path.
+        """
+
+        scope_hash = hashlib.sha256(_scope(key).encode()).hexdigest()[:32]
+        key_hash = hashlib.sha256(key.encode()).hexdigest()[:32]
+        return os.path.join(self.directory, scope_hash, f"{key_hash}.bin")
+
+    def _remember(self, key: str, data: bytes) -> None:
+        """
+        Stores an artifact in the memory tier, evicting the least recently used ones.
+        The caller holds the lock.
+
+        Args:
+            key (str): The key.
+            data (bytes): The artifact.
+        """
+
+        if len(data) > self.max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+
+        self._entries[key] = data
+        self._size += len(data)
+
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    async def get(self, key: str) -> bytes | None:
+        """
+        Returns a cached artifact, from memory or else from disk.
+
+        Args:
+            key (str): The `scope:version` key.
+
+        Returns:
+            bytes | None: The artifact, or None if neither tier has it.
+        """
+
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        if self.directory:
+            data = await asyncio.to_thread(self._read_from_disk, key)
+
+            if data is not None:
+                with self._lock:
+                    self._remember(key, data)
+                    self.hits += 1
+                return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def set(self, key: str, data: bytes) -> None:
+        """
+        Stores an artifact in both tiers and drops the other versions of its scope.
+
+        Args:
+            key (str): The `scope:version` key.
+            data (bytes): The artifact.
+        """
+
+        scope = _scope(key)
+
+        with self._lock:
+            for stale_key in [stale for stale in self._entries if _scope(stale) == scope and stale != key]:
+                self._size -= len(self._entries.pop(stale_key))
+            self._remember(key, data)
+
+        if self.directory:
+            with self._lock:
+                self._stores += 1
+                sweep = self._stores % self.sweep_every == 0
+            await asyncio.to_thread(self._store_on_disk, key, data, sweep)
+
+    def _read_from_disk(self, key: str) -> bytes | None:
+        """
+        Reads an artifact from the disk tier and marks it as recently used.
+
+        Args:
+            key (str): The `scope:version` key.
+
+        Returns:
+            bytes | None: The artifact, or None if the disk tier does not have it.
+        """
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as artifact_file:
+                data = artifact_file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return data
+
+    def _store_on_disk(self, key: str, data: bytes, sweep: bool) -> None:
+        """
+        Writes an artifact to the disk tier atomically, drops the other versions of its
+        scope and, on sweeps, enforces the size bound.
+
+        Args:
+            key (str): The `scope:version` key.
+            data (bytes): The artifact.
+            sweep (bool): Whether to enforce `disk_max_bytes`.
+        """
+
+        path = self._path(key)
+        scope_directory = os.path.dirname(path)
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        for attempt in range(2):
+            os.makedirs(scope_directory, exist_ok=True)
+            try:
+                with open(temporary_path, "wb") as artifact_file:
+                    artifact_file.write(data)
+                os.replace(temporary_path, path)
+                break
+            except FileNotFoundError:
+                # A sweep removed the (then empty) scope directory; create it again.
+                self._remove(temporary_path)
+                if attempt:
+                    raise
+
+        for entry in os.scandir(scope_directory):
+            if entry.name.endswith(".bin") and entry.path != path:
+                self._remove(entry.path)
+
+        if sweep:
+            self._sweep_disk()
+
+    def _sweep_disk(self) -> None:
+        """
+        Removes the least recently used artifacts of the disk tier until it fits
+        `disk_max_bytes`, and the scope directories left empty.
+        """
+
+        files = []
+        for scope_entry in os.scandir(self.directory):
+            if not scope_entry.is_dir():
+                continue
+            for entry in os.scandir(scope_entry.path):
+                if not entry.name.endswith(".bin"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, file_path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            self._remove(file_path)
+            total -= size
+
+        for scope_entry in os.scandir(self.directory):
+            if scope_entry.is_dir():
+                try:
+                    os.rmdir(scope_entry.path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: The hits, misses, hit rate, and the entries and bytes of the memory tier.
+        """
+
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "disk": bool(self.directory),
+        }
+
+
+xlsx_cache = ArtifactCache(XLSX_CACHE_MAX_BYTES, XLSX_CACHE_DIR, XLSX_CACHE_DISK_MAX_BYTES)
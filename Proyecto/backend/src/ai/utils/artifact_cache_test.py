@@ -0,0 +1,82 @@
+import asyncio
+import os
+
+from src.ai.utils.artifact_cache import ArtifactCache
+
+
+def disk_size(directory) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def test_artifact_cache_bounds_memory_by_size():
+    cache = ArtifactCache(max_bytes=10)
+
+    async def scenario():
+        await cache.set("a:1", b"1234")
+        await cache.set("b:1", b"5678")
+        assert await cache.get("a:1") == b"1234"
+
+        await cache.set("c:1", b"90ab")
+
+        assert await cache.get("b:1") is None
+        assert await cache.get("a:1") == b"1234"
+        assert cache.stats()["bytes"] == 8
+
+        await cache.set("big:1", b"x" * 11)
+        assert await cache.get("big:1") is None
+
+    asyncio.run(scenario())
+
+
+def test_artifact_cache_drops_older_versions_of_a_scope():
+    cache = ArtifactCache(max_bytes=100)
+
+    async def scenario():
+        await cache.set("user/conversation:1", b"old")
+        await cache.set("user/batch:batch", b"batch")
+        await cache.set("user/conversation:2", b"new")
+
+        assert await cache.get("user/conversation:1") is None
+        assert await cache.get("user/conversation:2") == b"new"
+        assert await cache.get("user/batch:batch") == b"batch"
+
+    asyncio.run(scenario())
+
+
+def test_artifact_cache_disk_tier_is_shared_and_bounded(tmp_path):
+    writer = ArtifactCache(max_bytes=100, directory=str(tmp_path), disk_max_bytes=10, sweep_every=1)
+    reader = ArtifactCache(max_bytes=100, directory=str(tmp_path), disk_max_bytes=10, sweep_every=1)
+
+    async def scenario():
+        await writer.set("a:1", b"1234")
+        await writer.set("a:2", b"5678")
+
+        assert await reader.get("a:1") is None
+        assert await reader.get("a:2") == b"5678"
+        assert reader.stats()["entries"] == 1
+
+        await writer.set("b:1", b"abcd")
+        await writer.set("c:1", b"efgh")
+
+        assert disk_size(tmp_path) <= 10
+        assert await reader.get("c:1") == b"efgh"
+
+    asyncio.run(scenario())
+
+
+def test_artifact_cache_sweeps_the_disk_tier_periodically(tmp_path):
+    cache = ArtifactCache(max_bytes=0, directory=str(tmp_path), disk_max_bytes=8, sweep_every=3)
+
+    async def scenario():
+        await cache.set("a:1", b"1234")
+        await cache.set("b:1", b"5678")
+        for age, key in enumerate(["b:1", "a:1"], start=1):
+            os.utime(cache._path(key), (1000 - age, 1000 - age))
+        await cache.set("c:1", b"90ab")
+        swept = disk_size(tmp_path)
+
+        await cache.set("d:1", b"cdef")
+        return swept, disk_size(tmp_path), await cache.get("c:1"), await cache.get("a:1")
+
+    assert asyncio.run(scenario()) == (8, 12, b"90ab", None)
+    assert len(os.listdir(tmp_path)) == 3
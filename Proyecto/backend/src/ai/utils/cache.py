@@ -0,0 +1,396 @@
+"""
+Cache module for the Naurat Importation Bot API.
+
+This module provides small thread-safe LRU caches with per-entry expiration, used by the
+response cache and other hot lookups, with an in-process and a cross-process backend.
+
+Features:
+- `TTLCache` keeps the entries in the memory of one process.
+- `SQLiteCache` keeps them in a SQLite file (WAL mode), so every worker process of a server
+  reads and warms the same entries. Values are stored as JSON (never unpickled), in a
+  directory only the server's user may write to.
+- `make_cache` picks the backend from `CACHE_BACKEND`, so each cache is declared once.
+- Least-recently-used eviction once `max_entries` is reached.
+- Entries expire `ttl_seconds` after they are stored.
+- Hit and miss counters for monitoring.
+- The `sqlite` backend waits at most `SHARED_CACHE_BUSY_TIMEOUT_MS` for a lock held by
+  another worker, so the event loop calling it is never stalled for long: a busy lookup
+  is a miss, and a busy write is skipped.
+
+Environment Variables:
+- `CACHE_BACKEND`: `memory` (default) or `sqlite`. The multi-worker launcher in `src.main`
+  defaults it to `sqlite`.
+- `SHARED_CACHE_PATH`: File of the `sqlite` backend. Defaults to `cache.sqlite3` in a
+  private (0700) `naurat-cache-<uid>` directory of the system temporary directory.
+- `SHARED_CACHE_BUSY_TIMEOUT_MS`: Longest wait for the lock of the `sqlite` backend.
+  Defaults to 50.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+
+SHARED_CACHE_BUSY_TIMEOUT_MS = float(os.getenv("SHARED_CACHE_BUSY_TIMEOUT_MS", "50"))
+
+SHARED_CACHE_PATH = os.getenv(
+    "SHARED_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), f"naurat-cache-{os.getuid() if hasattr(os, 'getuid') else 0}", "cache.sqlite3"),
+)
+
+
+def _encode_value(value) -> str:
+    """
+    Serializes a cache value to JSON; UUIDs are tagged so they are restored as such.
+
+    Args:
+        value (Any): A JSON-compatible value, possibly holding UUIDs.
+
+    Returns:
+        str: The JSON text.
+    """
+
+    def default(item):
+        if isinstance(item, uuid.UUID):
+            return {"__uuid__": str(item)}
+        raise TypeError(f"Cache values must be JSON-compatible, not {type(item).__name__}")
+
+    return json.dumps(value, default=default)
+
+
+def _decode_value(text: str):
+    """
+    Restores a cache value serialized by `_encode_value`.
+
+    Args:
+        text (str): The JSON text.
+
+    Returns:
+        Any: The value.
+    """
+
+    return json.loads(text, object_hook=lambda item: uuid.UUID(item["__uuid__"]) if "__uuid__" in item else item)
+
+
+def ensure_private_directory(directory: str) -> None:
+    """
+    Creates a directory of files shared by the worker processes (e.g. the shared cache),
+    readable and writable by this user only.
+
+    Args:
+        directory (str): The directory.
+
+    Raises:
+        PermissionError: If the directory belongs to another user or others may write to it,
+            so they could plant or replace its files.
+    """
+
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    if not hasattr(os, "getuid"):
+        return
+
+    status = os.stat(directory)
+    if status.st_uid != os.getuid() or status.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"The directory {directory} must be owned and only writable by this user")
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time-to-live.
+
+    Attributes:
+        max_entries (int): Maximum number of entries kept.
+        ttl_seconds (float): Lifetime of an entry, in seconds.
+        hits (int): Number of lookups that found a live entry.
+        misses (int): Number of lookups that found nothing or an expired entry.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the live value stored for a key and marks it as recently used.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            Any | None: The cached value, or None if it is missing or expired.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value) -> None:
+        """
+        Stores a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to store.
+        """
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key) -> None:
+        """
+        Removes a key from the cache if present.
+
+        Args:
+            key (Hashable): The cache key.
+        """
+
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Removes every entry from the cache. Counters are kept.
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: The hits, misses, hit rate and current number of entries.
+        """
+
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+class SQLiteCache:
+    """
+    LRU cache whose entries expire after a fixed time-to-live, stored in a SQLite file.
+
+    Every process opening the same file shares the entries; each cache is one table of the
+    file. Values are stored as JSON, so they must be JSON-compatible (UUIDs included), and
+    keys are stored by their `repr`, so they must be strings, numbers or tuples of them.
+
+    Attributes:
+        path (str): The SQLite file.
+        name (str): The table name suffix.
+        max_entries (int): Maximum number of entries kept.
+        ttl_seconds (float): Lifetime of an entry, in seconds.
+        hits (int): Number of lookups of this process that found a live entry.
+        misses (int): Number of lookups of this process that found nothing or an expired entry.
+    """
+
+    def __init__(self, path: str, name: str, max_entries: int, ttl_seconds: float):
+        if not re.fullmatch(r"\w+", name):
+            raise ValueError(f"Invalid cache name: {name!r}")
+
+        ensure_private_directory(os.path.dirname(os.path.abspath(path)))
+
+        self.path = path
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._table = f"cache_{name}"
+        self._local = threading.local()
+
+        connection = self._connection()
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{self._table}_used_at ON {self._table} (used_at)")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{self._table}_expires_at ON {self._table} (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns the connection of the calling thread, opening it on first use.
+
+        Returns:
+            sqlite3.Connection: An autocommit connection in WAL mode.
+        """
+
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=SHARED_CACHE_BUSY_TIMEOUT_MS / 1000, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+
+        return connection
+
+    def _write(self, statement: str, parameters: tuple = ()) -> None:
+        """
+        Runs a write statement, skipping it if another process holds the lock too long.
+
+        Args:
+            statement (str): The SQL statement.
+            parameters (tuple): Its parameters.
+        """
+
+        try:
+            self._connection().execute(statement, parameters)
+        except sqlite3.OperationalError as e:
+            logger.warning("Shared cache %s write skipped: %s", self.name, e)
+
+    def get(self, key):
+        """
+        Returns the live value stored for a key and marks it as recently used.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            Any | None: The cached value, or None if it is missing, expired or the file is busy.
+        """
+
+        now = time.time()
+
+        try:
+            row = self._connection().execute(
+                f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (repr(key),)
+            ).fetchone()
+        except sqlite3.OperationalError as e:
+            logger.warning("Shared cache %s lookup failed: %s", self.name, e)
+            row = None
+
+        if row is None or row[1] < now:
+            if row is not None:
+                self._write(f"DELETE FROM {self._table} WHERE key = ?", (repr(key),))
+            self.misses += 1
+            return None
+
+        self._write(f"UPDATE {self._table} SET used_at = ? WHERE key = ?", (now, repr(key)))
+        self.hits += 1
+        return _decode_value(row[0])
+
+    def set(self, key, value) -> None:
+        """
+        Stores a value, evicting the expired and least recently used entries if the cache is full.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to store.
+        """
+
+        connection = self._connection()
+        now = time.time()
+
+        try:
+            connection.execute(
+                f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (repr(key), _encode_value(value), now + self.ttl_seconds, now),
+            )
+
+            if connection.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0] > self.max_entries:
+                connection.execute(f"DELETE FROM {self._table} WHERE expires_at <= ?", (now,))
+                connection.execute(
+                    f"DELETE FROM {self._table} WHERE key IN "
+                    f"(SELECT key FROM {self._table} ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except sqlite3.OperationalError as e:
+            logger.warning("Shared cache %s write skipped: %s", self.name, e)
+
+    def delete(self, key) -> None:
+        """
+        Removes a key from the cache if present.
+
+        Args:
+            key (Hashable): The cache key.
+        """
+
+        self._write(f"DELETE FROM {self._table} WHERE key = ?", (repr(key),))
+
+    def clear(self) -> None:
+        """
+        Removes every entry from the cache, for every process. Counters are kept.
+        """
+
+        self._connection().execute(f"DELETE FROM {self._table}")
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: The hits and misses of this process, the hit rate and the current number of
+            shared entries.
+        """
+
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self._connection().execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0],
+        }
+
+
+def make_cache(name: str, max_entries: int, ttl_seconds: float) -> TTLCache | SQLiteCache:
+    """
+    Creates a cache with the backend selected by `CACHE_BACKEND`.
+
+    Args:
+        name (str): The cache name, used as table name by the `sqlite` backend.
+        max_entries (int): Maximum number of entries kept.
+        ttl_seconds (float): Lifetime of an entry, in seconds.
+
+    Returns:
+        TTLCache | SQLiteCache: The in-process or the shared cache.
+
+    Raises:
+        ValueError: If `CACHE_BACKEND` is not `memory` or `sqlite`.
+    """
+
+    if CACHE_BACKEND == "memory":
+        return TTLCache(max_entries, ttl_seconds)
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCache(SHARED_CACHE_PATH, name, max_entries, ttl_seconds)
+
+    raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND!r}")
@@ -0,0 +1,170 @@
+import sqlite3
+import uuid
+
+import pytest
+
+import src.ai.utils.cache as cache_mod
+from src.ai.utils.cache import SQLiteCache, TTLCache
+from src.ai.utils.response_cache import response_cache_key
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+
+    cache = TTLCache(max_entries=10, ttl_seconds=5)
+    cache.set("a", 1)
+    now[0] += 6
+
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_response_cache_key_normalizes_prompt():
+    assert response_cache_key("¿Importar  Laptops desde China?", "es") == response_cache_key(
+        "importar laptops desde china", "es"
+    )
+    assert response_cache_key("laptops", "es") != response_cache_key("laptops", "en")
+
+
+def test_response_cache_key_changes_with_the_facts():
+    facts = "- 8471.30.01 (Laptops): IGI tasa máxima 0%, IVA 16%, DTA 0.8%."
+
+    assert response_cache_key("laptops 8471.30.01", "es", facts) != response_cache_key("laptops 8471.30.01", "es")
+    assert response_cache_key("laptops 8471.30.01", "es", facts) != response_cache_key(
+        "laptops 8471.30.01", "es", facts.replace("0%", "5%", 1)
+    )
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = SQLiteCache(path, "identity", max_entries=10, ttl_seconds=60)
+    second = SQLiteCache(path, "identity", max_entries=10, ttl_seconds=60)
+
+    first.set(("email", "a@example.com"), {"id": 1})
+
+    assert second.get(("email", "a@example.com")) == {"id": 1}
+    second.delete(("email", "a@example.com"))
+    assert first.get(("email", "a@example.com")) is None
+
+
+def test_sqlite_cache_evicts_and_expires(tmp_path, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_mod.time, "time", lambda: now[0])
+
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), "responses", max_entries=2, ttl_seconds=5)
+    cache.set("a", 1)
+    now[0] += 1
+    cache.set("b", 2)
+    now[0] += 1
+    assert cache.get("a") == 1
+
+    now[0] += 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["entries"] == 2
+
+    now[0] += 10
+    assert cache.get("c") is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_sqlite_cache_stores_json_values(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path, "identity", max_entries=10, ttl_seconds=60)
+    user_id = uuid.uuid4()
+    cache.set(("email", "a@example.com"), user_id)
+
+    assert cache.get(("email", "a@example.com")) == user_id
+    stored = sqlite3.connect(path).execute("SELECT value FROM cache_identity").fetchone()[0]
+    assert stored == f'{{"__uuid__": "{user_id}"}}'
+
+
+def test_sqlite_cache_rejects_a_directory_others_can_write(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+
+    with pytest.raises(PermissionError):
+        SQLiteCache(str(shared / "cache.sqlite3"), "identity", max_entries=10, ttl_seconds=60)
+
+
+def test_sqlite_cache_skips_writes_while_another_process_holds_the_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_mod, "SHARED_CACHE_BUSY_TIMEOUT_MS", 10)
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path, "language", max_entries=10, ttl_seconds=60)
+    cache.set("hola", "es")
+
+    locker = sqlite3.connect(path, isolation_level=None)
+    locker.execute("BEGIN EXCLUSIVE")
+    try:
+        # WAL readers are not blocked; the recency update and the new entry are skipped.
+        assert cache.get("hola") == "es"
+        cache.set("hello", "en")
+    finally:
+        locker.execute("ROLLBACK")
+
+    assert cache.get("hola") == "es"
+    assert cache.get("hello") is None
+
+
+def test_database_response_cache_upserts_evicts_and_survives_errors(tmp_path, monkeypatch):
+    import asyncio
+
+    from sqlalchemy import func, select, text
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    import src.ai.utils.response_cache as response_cache_mod
+    from src.database import Base
+    from src.models import CachedResponse
+
+    monkeypatch.setattr(response_cache_mod, "RESPONSE_CACHE_EVICT_EVERY", 4)
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/responses.db")
+        sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        cache = response_cache_mod.ResponseCache("database", max_entries=2, ttl_seconds=60)
+
+        # Two workers caching the same first turn.
+        async with sessions() as first, sessions() as second:
+            assert await cache.get("same", first) is None
+            assert await cache.get("same", second) is None
+            await cache.set("same", "first answer", first)
+            await cache.set("same", "second answer", second)
+
+        async with sessions() as db:
+            assert await cache.get("same", db) == "second answer"
+            await cache.set("other", "b", db)
+            await cache.set("third", "c", db)
+            entries = await db.scalar(select(func.count()).select_from(CachedResponse))
+
+        async with sessions() as db:
+            await db.execute(text("DROP TABLE response_cache"))
+            await db.commit()
+            assert await cache.get("same", db) is None
+            await cache.set("same", "lost", db)
+
+        await engine.dispose()
+        return entries
+
+    assert asyncio.run(scenario()) == 2
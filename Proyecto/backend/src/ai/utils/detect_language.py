@@ -1,23 +1,133 @@
 """
 Language detection module for the Naurat Importation Bot API.
 
-This module provides functionality to detect whether a given text is in English or Spanish
-using OpenAI's GPT-4o-mini model.
+This module provides functionality to detect whether a given text is in English or Spanish.
 
 Features:
-- Sends a request to OpenAI's API to determine the language of a given text.
-- Returns 'en' for English and 'es' for Spanish.
+- Detects the language locally with a bundled stopword model (no network, well under 1 ms).
+- Falls back to OpenAI's GPT-4o-mini model only when the local confidence is too low,
+  e.g. for one-word prompts such as product names. The remote answers are cached (shared by
+  the worker processes with the `sqlite` cache backend), so a repeated product name is only
+  sent once.
+- Returns 'en' for English and 'es' for Spanish. The model is asked for exactly `es` or
+  `en`; a reply naming the language ("Spanish", "Español") is accepted as well, and an
+  unrecognized one falls back to the local guess.
 - Utilizes environment variables for API authentication.
 
 Environment Variables:
 - `OPENAI_API_KEY`: The API key required to authenticate requests to OpenAI.
+- `LANGUAGE_CONFIDENCE_THRESHOLD`: Minimum local confidence (0-1) to skip the remote call.
+  Defaults to 0.5.
+- `LANGUAGE_CACHE_TTL`: Lifetime of a cached remote answer, in seconds. Defaults to 86400.
+- `LANGUAGE_CACHE_MAX_ENTRIES`: Maximum number of cached remote answers. Defaults to 10000.
 """
 
 import os
-import requests
+import re
 
+from src.metrics import record_token_usage
+from src.ai.utils.cache import make_cache
+from src.ai.utils.http_client import get_http_client
 
-def detect_language(user_text: str) -> str:
+
+SPANISH_STOPWORDS = frozenset(
+    """
+    de la que el en y los del se las por un para con una su al lo como más pero sus le ya o
+    este sí porque esta entre cuando muy sin sobre también hasta hay donde quien desde todo
+    nos durante todos uno les ni contra otros ese eso ante ellos e esto mí antes algunos qué
+    unos yo otro otras otra él tanto esa estos mucho quienes nada muchos cual poco ella estar
+    estas algunas algo nosotros mi mis tú te ti tu tus ellas nosotras vosotros es son está
+    están fue era ser tiene tienen hacer puedo puede quiero necesito cómo cuál cuánto cuáles
+    cuánta dónde cuándo gracias hola buenos buenas días tardes importar importación producto
+    productos impuestos desde quisiera podrías sería cuesta precio aranceles arancel país
+    """.split()
+)
+
+ENGLISH_STOPWORDS = frozenset(
+    """
+    the of and to in is you that it he was for on are as with his they at be this have from
+    or one had by but not what all were we when your can said there use an each which she do
+    how their if will up other about out many then them these so some her would make like
+    him into time has look two more write go see way could people my than first been call
+    who its now find down did get come made may part i am want need please thanks hello
+    import importing imports product products taxes tax does should which what's i'm much
+    cost price tariff tariffs country would could our us any
+    """.split()
+) - SPANISH_STOPWORDS
+
+SPANISH_MARKERS = re.compile(r"[ñáéíóúü¿¡]")
+
+TOKEN_PATTERN = re.compile(r"[a-zñáéíóúü']+")
+
+LANGUAGE_CACHE_TTL = int(os.getenv("LANGUAGE_CACHE_TTL", "86400"))
+
+LANGUAGE_CACHE_MAX_ENTRIES = int(os.getenv("LANGUAGE_CACHE_MAX_ENTRIES", "10000"))
+
+# Remote answers keyed by the lowercased, whitespace-collapsed text.
+language_cache = make_cache("language", LANGUAGE_CACHE_MAX_ENTRIES, LANGUAGE_CACHE_TTL)
+
+
+def detect_language_local(user_text: str) -> tuple[str, float]:
+    """
+    Detects the language of the given text with the bundled stopword model.
+
+    Each Spanish or English stopword found in the text counts as one vote for its language,
+    and Spanish-only characters (ñ, accents, ¿, ¡) add an extra vote for Spanish.
+
+    Args:
+        user_text (str): The text whose language needs to be identified.
+
+    Returns:
+        tuple[str, float]: The detected language ('en' or 'es') and a confidence between 0 and 1.
+    """
+
+    text = user_text.lower()
+
+    spanish_votes = len(SPANISH_MARKERS.findall(text))
+    english_votes = 0
+
+    for token in TOKEN_PATTERN.findall(text):
+        if token in SPANISH_STOPWORDS:
+            spanish_votes += 1
+        elif token in ENGLISH_STOPWORDS:
+            english_votes += 1
+
+    language = "es" if spanish_votes > english_votes else "en"
+    confidence = abs(spanish_votes - english_votes) / (spanish_votes + english_votes + 1)
+
+    return language, confidence
+
+
+REMOTE_ANSWER_PATTERNS = (
+    ("es", re.compile(r"\b(es|spanish|espanol|español)\b")),
+    ("en", re.compile(r"\b(en|english|ingles|inglés)\b")),
+)
+
+
+def parse_language_answer(answer: str) -> str | None:
+    """
+    Reads the language code out of the remote model's reply.
+
+    Args:
+        answer (str): The reply, e.g. "es", "'en'" or "Spanish".
+
+    Returns:
+        str | None: 'en' or 'es', or None if the reply names neither language.
+    """
+
+    answer = answer.strip().strip("'\".").lower()
+
+    if answer in ("es", "en"):
+        return answer
+
+    for language, pattern in REMOTE_ANSWER_PATTERNS:
+        if pattern.search(answer):
+            return language
+
+    return None
+
+
+async def detect_language_remote(user_text: str) -> str:
     """
     Detects the language of the given text using OpenAI's GPT-4o-mini model.
 
@@ -28,10 +138,11 @@ def detect_language(user_text: str) -> str:
         user_text (str): The text whose language needs to be identified.
 
     Returns:
-        str: 'en' if the text is in English, 'es' if the text is in Spanish.
+        str: 'en' if the text is in English, 'es' if the text is in Spanish. A reply naming
+        neither falls back to the local stopword model's guess.
 
     Raises:
-        requests.RequestException: If there is an error in the API request.
+        httpx.HTTPError: If there is an error in the API request.
         KeyError: If the API response structure is unexpected.
     """
 
@@ -48,8 +159,9 @@ def detect_language(user_text: str) -> str:
                 "content": [
                     {
                         "type": "text",
-                        "text": "Tell me if the text language is in English or in Spanish, "
-                                "if it is in English, please write 'en', if it is in Spanish, please write 'es'.",
+                        "text": "Tell me if the following text is in English or in Spanish. "
+                                "Answer with exactly two lowercase letters and nothing else: "
+                                "'en' for English or 'es' for Spanish.",
                     },
                     {
                         "type": "text",
@@ -58,12 +170,52 @@ def detect_language(user_text: str) -> str:
                 ],
             }
         ],
-        "max_tokens": 300,
+        "max_tokens": 5,
+        "temperature": 0,
     }
 
-    response = requests.post(
+    response = await get_http_client().post(
         "https://api.openai.com/v1/chat/completions", headers=headers, json=payload, timeout=20
     )
 
     data = response.json()
-    return data['choices'][0]['message']['content']
+    record_token_usage(payload["model"], data.get("usage"))
+
+    answer = data['choices'][0]['message']['content']
+
+    return parse_language_answer(answer) or detect_language_local(user_text)[0]
+
+
+async def detect_language(user_text: str) -> str:
+    """
+    Detects whether the given text is in English or Spanish.
+
+    The bundled stopword model is tried first; the remote GPT-4o-mini call is only made
+    when the local confidence is below `LANGUAGE_CONFIDENCE_THRESHOLD` and the text is not
+    in `language_cache`.
+
+    Args:
+        user_text (str): The text whose language needs to be identified.
+
+    Returns:
+        str: 'en' if the text is in English, 'es' if the text is in Spanish.
+
+    Raises:
+        httpx.HTTPError: If the remote fallback request fails.
+        KeyError: If the remote fallback response structure is unexpected.
+    """
+
+    language, confidence = detect_language_local(user_text)
+
+    if confidence >= float(os.getenv("LANGUAGE_CONFIDENCE_THRESHOLD", "0.5")):
+        return language
+
+    key = " ".join(user_text.lower().split())
+    cached = language_cache.get(key)
+    if cached is not None:
+        return cached
+
+    language = await detect_language_remote(user_text)
+    language_cache.set(key, language)
+
+    return language
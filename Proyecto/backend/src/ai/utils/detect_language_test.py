@@ -0,0 +1,63 @@
+import asyncio
+
+import src.ai.utils.detect_language as detect_mod
+
+
+def test_detect_language_local_spanish():
+    language, confidence = detect_mod.detect_language_local(
+        "¿Qué impuestos pago por importar laptops desde China?"
+    )
+    assert language == "es"
+    assert confidence >= 0.5
+
+
+def test_detect_language_local_english():
+    language, confidence = detect_mod.detect_language_local(
+        "How much tax do I pay to import laptops from China?"
+    )
+    assert language == "en"
+    assert confidence >= 0.5
+
+
+def test_parse_language_answer():
+    assert detect_mod.parse_language_answer("es") == "es"
+    assert detect_mod.parse_language_answer(" 'en'.\n") == "en"
+    assert detect_mod.parse_language_answer("Spanish") == "es"
+    assert detect_mod.parse_language_answer("Español") == "es"
+    assert detect_mod.parse_language_answer("English") == "en"
+    assert detect_mod.parse_language_answer("I cannot tell") is None
+
+
+def test_detect_language_skips_remote_when_confident(monkeypatch):
+    async def fail_remote(text):
+        raise AssertionError("remote detector should not be called")
+
+    monkeypatch.setattr(detect_mod, "detect_language_remote", fail_remote)
+    assert asyncio.run(detect_mod.detect_language("importar laptops de china")) == "es"
+
+
+def test_detect_language_falls_back_to_remote(monkeypatch):
+    calls = []
+
+    async def fake_remote(text):
+        calls.append(text)
+        return "es"
+
+    detect_mod.language_cache.clear()
+    monkeypatch.setattr(detect_mod, "detect_language_remote", fake_remote)
+    assert asyncio.run(detect_mod.detect_language("zapatos")) == "es"
+    assert calls == ["zapatos"]
+
+
+def test_detect_language_caches_remote_answers(monkeypatch):
+    calls = []
+
+    async def fake_remote(text):
+        calls.append(text)
+        return "es"
+
+    detect_mod.language_cache.clear()
+    monkeypatch.setattr(detect_mod, "detect_language_remote", fake_remote)
+    assert asyncio.run(detect_mod.detect_language("Zapatos")) == "es"
+    assert asyncio.run(detect_mod.detect_language("zapatos ")) == "es"
+    assert calls == ["Zapatos"]
@@ -0,0 +1,274 @@
+"""
+Conversation history module for the Naurat Importation Bot API.
+
+This module assembles the conversation history sent to the agent within a bounded token budget.
+
+Features:
+- Loads only the most recent messages of a user and keeps the newest ones that fit the budget.
+- Older messages are folded into a stored rolling summary (`ConversationSummary`).
+- The summary is refreshed incrementally after every turn that evicts messages: only the
+  messages evicted since the last refresh are summarized, so every message is always either
+  in the recent window or in the summary.
+
+Environment Variables:
+- `HISTORY_TOKEN_BUDGET`: Maximum tokens of recent messages sent to the agent. Defaults to 3000.
+- `HISTORY_MAX_MESSAGES`: Maximum recent messages loaded from the database. Defaults to 40.
+- `OPENAI_API_KEY`: The API key required to authenticate the summarization requests.
+"""
+
+import os
+from functools import lru_cache
+
+import tiktoken
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import ConversationSummary, Messages
+from src.metrics import record_token_usage
+from src.ai.utils.http_client import get_http_client
+
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "40"))
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    """
+    Returns the tokenizer used by the chat models, or None if it cannot be loaded.
+
+    The encoding file is downloaded by tiktoken on first use, so it may be unavailable
+    in offline environments.
+
+    Returns:
+        tiktoken.Encoding | None: The `o200k_base` encoding.
+    """
+
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts the tokens of a text, approximating 4 characters per token without a tokenizer.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The number of tokens.
+    """
+
+    encoding = get_encoding()
+
+    if encoding is None:
+        return len(text) // 4 + 1
+
+    return len(encoding.encode(text))
+
+
+def select_recent_messages(messages: list[dict], token_budget: int) -> list[dict]:
+    """
+    Keeps the most recent messages whose combined size fits the token budget.
+
+    Args:
+        messages (list[dict]): Message payloads (`owner`, `message`), newest first.
+        token_budget (int): Maximum number of tokens to keep.
+
+    Returns:
+        list[dict]: The kept messages in chronological order.
+    """
+
+    kept = []
+    used_tokens = 0
+
+    for message in messages:
+        used_tokens += count_tokens(message["message"])
+        if used_tokens > token_budget:
+            break
+        kept.append(message)
+
+    kept.reverse()
+    return kept
+
+
+def select_recent_chat_messages(messages: list, token_budget: int) -> list:
+    """
+    Keeps the newest chat messages that fit the token budget, always keeping the last one.
+
+    Args:
+        messages (list[BaseMessage]): The thread messages in chronological order; the last one
+            is the prompt being answered.
+        token_budget (int): Maximum number of tokens of the earlier messages to keep.
+
+    Returns:
+        list[BaseMessage]: The kept messages in chronological order.
+    """
+
+    kept = select_recent_messages(
+        [{"message": message.content, "chat_message": message} for message in reversed(messages[:-1])],
+        token_budget,
+    )
+
+    return [message["chat_message"] for message in kept] + messages[-1:]
+
+
+async def load_recent_messages(user_id, db: AsyncSession) -> list[dict]:
+    """
+    Loads the newest messages of a user that fit `HISTORY_TOKEN_BUDGET`.
+
+    Args:
+        user_id (UUID): The user whose conversation is loaded.
+        db (AsyncSession): The asynchronous database session.
+
+    Returns:
+        list[dict]: The kept message payloads in chronological order.
+    """
+
+    newest_messages = (
+        await db.scalars(
+            select(Messages.message)
+            .where(Messages.user_id == user_id)
+            .order_by(Messages.created_at.desc(), Messages.id.desc())
+            .limit(HISTORY_MAX_MESSAGES)
+        )
+    ).all()
+
+    return select_recent_messages(newest_messages, HISTORY_TOKEN_BUDGET)
+
+
+async def load_history(user_id, db: AsyncSession) -> tuple[str, list[dict]]:
+    """
+    Loads the rolling summary and the recent messages of a user's conversation.
+
+    Args:
+        user_id (UUID): The user whose conversation is loaded.
+        db (AsyncSession): The asynchronous database session.
+
+    Returns:
+        tuple[str, list[dict]]: The summary of older turns (empty if none) and the recent
+        message payloads in chronological order.
+    """
+
+    return await load_summary(user_id, db), await load_recent_messages(user_id, db)
+
+
+async def load_summary(user_id, db: AsyncSession) -> str:
+    """
+    Loads the rolling summary of a user's older turns.
+
+    Args:
+        user_id (UUID): The user whose summary is loaded.
+        db (AsyncSession): The asynchronous database session.
+
+    Returns:
+        str: The summary, or an empty string if none has been written yet.
+    """
+
+    summary = await db.get(ConversationSummary, user_id)
+
+    return summary.summary if summary else ""
+
+
+async def summarize_messages(previous_summary: str, messages: list[dict]) -> str:
+    """
+    Extends a conversation summary with new messages using OpenAI's GPT-4o-mini model.
+
+    Args:
+        previous_summary (str): The current summary, possibly empty.
+        messages (list[dict]): The message payloads to fold into the summary.
+
+    Returns:
+        str: The updated summary.
+
+    Raises:
+        httpx.HTTPError: If the API request fails.
+        KeyError: If the API response structure is unexpected.
+    """
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
+    }
+
+    transcript = "\n".join(
+        f"{message['owner'].capitalize()}: {message['message']}" for message in messages
+    )
+
+    payload = {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "Update the summary of a conversation between a user and an importation assistant "
+                                "with the new messages. Keep the products, HS codes, countries of origin, taxes and "
+                                "NOMs discussed. Answer only with the updated summary, in the conversation language.",
+                    },
+                    {
+                        "type": "text",
+                        "text": f"Current summary:\n{previous_summary}\n\nNew messages:\n{transcript}",
+                    },
+                ],
+            }
+        ],
+        "max_tokens": 500,
+    }
+
+    response = await get_http_client().post(
+        "https://api.openai.com/v1/chat/completions", headers=headers, json=payload, timeout=30
+    )
+
+    data = response.json()
+    record_token_usage(payload["model"], data.get("usage"))
+
+    return data['choices'][0]['message']['content']
+
+
+async def refresh_summary(user_id, db: AsyncSession) -> None:
+    """
+    Folds messages that no longer fit the history budget into the user's rolling summary.
+
+    Only the messages evicted since the last refresh are sent to the summarizer; nothing is
+    done while every evicted message is already summarized.
+
+    Args:
+        user_id (UUID): The user whose summary is refreshed.
+        db (AsyncSession): The asynchronous database session.
+    """
+
+    total_messages = await db.scalar(
+        select(func.count()).select_from(Messages).where(Messages.user_id == user_id)
+    )
+    evicted_messages = total_messages - len(await load_recent_messages(user_id, db))
+
+    summary = await db.get(ConversationSummary, user_id)
+    summarized_count = summary.summarized_count if summary else 0
+
+    if evicted_messages <= summarized_count:
+        return
+
+    pending_messages = (
+        await db.scalars(
+            select(Messages.message)
+            .where(Messages.user_id == user_id)
+            .order_by(Messages.created_at.asc(), Messages.id.asc())
+            .offset(summarized_count)
+            .limit(evicted_messages - summarized_count)
+        )
+    ).all()
+
+    new_summary = await summarize_messages(summary.summary if summary else "", pending_messages)
+
+    if summary is None:
+        summary = ConversationSummary(user_id=user_id)
+        db.add(summary)
+
+    summary.summary = new_summary
+    summary.summarized_count = evicted_messages
+    await db.commit()
@@ -0,0 +1,66 @@
+import src.ai.utils.history as history
+
+
+def test_select_recent_messages_keeps_newest_within_budget(monkeypatch):
+    monkeypatch.setattr(history, "count_tokens", lambda text: len(text.split()))
+
+    newest_first = [
+        {"owner": "ai", "message": "four words answer here"},
+        {"owner": "human", "message": "three words question"},
+        {"owner": "ai", "message": "an older answer that no longer fits"},
+        {"owner": "human", "message": "first"},
+    ]
+
+    kept = history.select_recent_messages(newest_first, token_budget=8)
+
+    assert [message["message"] for message in kept] == [
+        "three words question",
+        "four words answer here",
+    ]
+
+
+def test_select_recent_messages_empty_budget():
+    assert history.select_recent_messages([{"owner": "human", "message": "hola"}], 0) == []
+
+
+def test_refresh_summary_folds_every_evicted_message(tmp_path, monkeypatch):
+    import asyncio
+
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from src.database import Base
+    from src.models import Messages, Users
+
+    monkeypatch.setattr(history, "count_tokens", lambda text: 1)
+    monkeypatch.setattr(history, "HISTORY_TOKEN_BUDGET", 2)
+    summarized = []
+
+    async def fake_summarize(previous_summary, messages):
+        summarized.append([message["message"] for message in messages])
+        return f"{previous_summary}+{len(messages)}"
+
+    monkeypatch.setattr(history, "summarize_messages", fake_summarize)
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/history.db")
+        sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        async with sessions() as db:
+            user = Users(email="history@example.com")
+            db.add(user)
+            await db.commit()
+
+            for index in range(4):
+                db.add(Messages(user_id=user.id, message={"owner": "human", "message": f"m{index}"}))
+                await db.commit()
+                await history.refresh_summary(user.id, db)
+
+            summary = await history.load_summary(user.id, db)
+
+        await engine.dispose()
+        return summary
+
+    assert asyncio.run(scenario()) == "+1+1"
+    assert summarized == [["m0"], ["m1"]]
@@ -0,0 +1,256 @@
+"""
+HS-code search module for the Naurat Importation Bot API.
+
+This module maps product names typed by users (e.g. "audífonos bluetooth") to candidate HS
+codes with a local BM25 index, without an LLM call.
+
+Features:
+- Indexes the tariff table descriptions only, in Spanish and English. Products extracted
+  for users are never indexed, so no user's data reaches another user's prompt or the
+  `/hs-search` results.
+- Accent- and case-insensitive matching, with stopwords removed and the singular and plural
+  of a word reduced to the same stem.
+- Returns the top-k HS codes in milliseconds; a code matched by several documents keeps its
+  best score.
+- The index is built once, in a worker thread, on first use (or by the startup warm-up).
+- `prompt_facts` gives the agent the tariff facts of the HS codes written in a prompt or,
+  when it has none and `HS_SEARCH_PROMPT_CANDIDATES` is set, the best candidates of the index.
+
+Environment Variables:
+- `HS_SEARCH_PROMPT_CANDIDATES`: Candidates added to the agent input when the prompt has no
+  HS code. Defaults to 0 (disabled).
+"""
+
+import asyncio
+import heapq
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from src.ai.utils.detect_language import ENGLISH_STOPWORDS, SPANISH_STOPWORDS
+from src.ai.utils.tariff import format_hs_code, format_tariff_facts, get_tariff_index
+
+
+HS_SEARCH_PROMPT_CANDIDATES = int(os.getenv("HS_SEARCH_PROMPT_CANDIDATES", "0"))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """
+    Lowercases a text and removes its accents.
+
+    Args:
+        text (str): The text to fold.
+
+    Returns:
+        str: The folded text.
+    """
+
+    return "".join(
+        char for char in unicodedata.normalize("NFKD", text.casefold())
+        if not unicodedata.combining(char)
+    )
+
+
+STOPWORDS = frozenset(fold(word) for word in SPANISH_STOPWORDS | ENGLISH_STOPWORDS)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits a text into folded search terms, without stopwords and with plurals reduced.
+
+    A word and its plural share a stem: a final "es", else "s", else "e" is dropped, so
+    "motor" / "motores", "cable" / "cables" and "juguete" / "juguetes" match.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list[str]: The terms in order.
+    """
+
+    terms = []
+
+    for token in TOKEN_PATTERN.findall(fold(text)):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        if len(token) > 4 and token.endswith("es"):
+            token = token[:-2]
+        elif len(token) > 3 and token[-1] in "se":
+            token = token[:-1]
+        terms.append(token)
+
+    return terms
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index of (HS code, description) documents.
+
+    Attributes:
+        documents (list[tuple[str, str]]): The normalized HS code and description of each document.
+    """
+
+    def __init__(self, documents, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.documents = []
+        self._postings = defaultdict(list)
+        self._lengths = []
+
+        for hs_code, description in documents:
+            terms = tokenize(description)
+            if not terms:
+                continue
+
+            document_id = len(self.documents)
+            self.documents.append((hs_code, description))
+            self._lengths.append(len(terms))
+
+            for term, frequency in Counter(terms).items():
+                self._postings[term].append((document_id, frequency))
+
+        count = len(self.documents)
+        average_length = sum(self._lengths) / count if count else 1
+
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        self._norms = [k1 * (1 - b + b * length / average_length) for length in self._lengths]
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: str, k: int = 5) -> list[dict]:
+        """
+        Returns the HS codes of the documents that best match a query.
+
+        Args:
+            query (str): The product name or prompt.
+            k (int): Maximum number of HS codes returned.
+
+        Returns:
+            list[dict]: `hs_code` (dotted), `description` and `score`, best first.
+        """
+
+        scores = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for document_id, frequency in self._postings[term]:
+                scores[document_id] += (
+                    idf * frequency * (self.k1 + 1) / (frequency + self._norms[document_id])
+                )
+
+        best_by_code = {}
+        for document_id, score in scores.items():
+            hs_code = self.documents[document_id][0]
+            if score > best_by_code.get(hs_code, (0, None))[0]:
+                best_by_code[hs_code] = (score, document_id)
+
+        return [
+            {
+                "hs_code": format_hs_code(hs_code),
+                "description": self.documents[document_id][1],
+                "score": round(score, 4),
+            }
+            for hs_code, (score, document_id) in heapq.nlargest(
+                k, best_by_code.items(), key=lambda item: item[1][0]
+            )
+        ]
+
+
+def load_documents() -> list[tuple[str, str]]:
+    """
+    Collects the tariff table descriptions.
+
+    Returns:
+        list[tuple[str, str]]: The normalized HS code and description of each fraction.
+    """
+
+    return [(entry.hs_code, entry.description) for entry in get_tariff_index().entries]
+
+
+class HSSearch:
+    """
+    Holder of the shared BM25 index, built once from the tariff table.
+
+    Attributes:
+        index (BM25Index | None): The index, None until first built.
+    """
+
+    def __init__(self):
+        self.index = None
+        self._lock = asyncio.Lock()
+
+    async def get_index(self) -> BM25Index:
+        """
+        Returns the index, building it in a worker thread on first use, so the event loop
+        keeps serving requests.
+
+        Returns:
+            BM25Index: The index.
+        """
+
+        if self.index is None:
+            async with self._lock:
+                if self.index is None:
+                    self.index = await asyncio.to_thread(lambda: BM25Index(load_documents()))
+
+        return self.index
+
+
+hs_search = HSSearch()
+
+
+def format_hs_candidates(results: list[dict], language: str) -> str:
+    """
+    Formats search results as candidate HS codes for the agent.
+
+    Args:
+        results (list[dict]): The results of `BM25Index.search`.
+        language (str): The prompt language ('en' or 'es').
+
+    Returns:
+        str: The candidates, or an empty string if there are none.
+    """
+
+    if not results:
+        return ""
+
+    title = (
+        "Candidate HS codes from the local index (verify before using):"
+        if language == "en"
+        else "Fracciones candidatas del índice local (verifícalas antes de usarlas):"
+    )
+
+    return "\n".join(
+        [title] + [f"- {result['hs_code']}: {result['description']}" for result in results]
+    )
+
+
+async def prompt_facts(prompt: str, language: str) -> str:
+    """
+    Returns the facts added to the agent input of a prompt.
+
+    Args:
+        prompt (str): The user prompt.
+        language (str): The prompt language ('en' or 'es').
+
+    Returns:
+        str: The tariff table facts of the HS codes in the prompt, or else up to
+        `HS_SEARCH_PROMPT_CANDIDATES` candidate HS codes; empty if there are none.
+    """
+
+    facts = format_tariff_facts(get_tariff_index().find_in_text(prompt), language)
+
+    if not facts and HS_SEARCH_PROMPT_CANDIDATES:
+        hs_index = await hs_search.get_index()
+        facts = format_hs_candidates(hs_index.search(prompt, HS_SEARCH_PROMPT_CANDIDATES), language)
+
+    return facts
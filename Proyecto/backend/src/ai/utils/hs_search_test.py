@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+import src.ai.utils.hs_search as hs_search_mod
+from src.ai.utils.hs_search import BM25Index, fold, format_hs_candidates, tokenize
+
+
+DOCUMENTS = [
+    ("85183001", "Audífonos y auriculares, incluso combinados con micrófono"),
+    ("85183001", "Audifonos bluetooth inalambricos"),
+    ("84713001", "Máquinas automáticas para tratamiento de datos portátiles (laptops)"),
+    ("64041101", "Calzado para deporte con suela de caucho"),
+    ("85076099", "Los demás acumuladores de iones de litio"),
+    ("85076099", "Lithium ion batteries"),
+]
+
+
+def test_fold_and_tokenize():
+    assert fold("Audífonos MÁQUINAS") == "audifonos maquinas"
+    assert tokenize("Los audífonos de las laptops") == ["audifono", "laptop"]
+    assert tokenize("baterías") == tokenize("Baterias")
+
+
+def test_tokenize_reduces_singular_and_plural_to_one_stem():
+    for singular, plural in [
+        ("cable", "cables"), ("motor", "motores"), ("juguete", "juguetes"), ("papel", "papeles"),
+        ("laptop", "laptops"), ("phone", "phones"), ("clase", "clases"),
+    ]:
+        assert tokenize(singular) == tokenize(plural), (singular, plural)
+
+    index = BM25Index(DOCUMENTS + [("85444299", "Cables eléctricos"), ("95030099", "Juguete de madera")])
+    assert index.search("cable usb", k=1)[0]["hs_code"] == "8544.42.99"
+    assert index.search("juguetes", k=1)[0]["hs_code"] == "9503.00.99"
+
+
+def test_search_ranks_by_bm25_and_keeps_best_document_per_code():
+    index = BM25Index(DOCUMENTS)
+
+    results = index.search("audifonos bluetooth", k=5)
+
+    assert [result["hs_code"] for result in results] == ["8518.30.01"]
+    assert results[0]["description"] == "Audifonos bluetooth inalambricos"
+
+
+def test_search_matches_spanish_and_english():
+    index = BM25Index(DOCUMENTS)
+
+    assert index.search("batería de litio", k=1)[0]["hs_code"] == "8507.60.99"
+    assert index.search("lithium batteries", k=1)[0]["hs_code"] == "8507.60.99"
+    assert index.search("laptop", k=3)[0]["hs_code"] == "8471.30.01"
+    assert index.search("de la", k=3) == []
+
+
+def test_format_hs_candidates():
+    results = BM25Index(DOCUMENTS).search("calzado deportivo", k=2)
+
+    candidates = format_hs_candidates(results, "es")
+
+    assert candidates.startswith("Fracciones candidatas")
+    assert "- 6404.11.01: Calzado para deporte con suela de caucho" in candidates
+    assert format_hs_candidates([], "en") == ""
+
+
+def test_index_holds_only_tariff_descriptions(monkeypatch):
+    tariff = SimpleNamespace(entries=[SimpleNamespace(hs_code="85183001", description="Audífonos y auriculares")])
+    monkeypatch.setattr(hs_search_mod, "get_tariff_index", lambda: tariff)
+    search = hs_search_mod.HSSearch()
+
+    index = asyncio.run(search.get_index())
+
+    assert index.documents == [("85183001", "Audífonos y auriculares")]
+
+
+def test_prompt_facts_adds_no_candidates_by_default(monkeypatch):
+    tariff = SimpleNamespace(find_in_text=lambda prompt: [])
+    monkeypatch.setattr(hs_search_mod, "get_tariff_index", lambda: tariff)
+    monkeypatch.setattr(hs_search_mod.hs_search, "index", BM25Index(DOCUMENTS))
+
+    assert hs_search_mod.HS_SEARCH_PROMPT_CANDIDATES == 0
+    assert asyncio.run(hs_search_mod.prompt_facts("audifonos bluetooth", "es")) == ""
+
+    monkeypatch.setattr(hs_search_mod, "HS_SEARCH_PROMPT_CANDIDATES", 1)
+    assert "8518.30.01" in asyncio.run(hs_search_mod.prompt_facts("audifonos bluetooth", "es"))
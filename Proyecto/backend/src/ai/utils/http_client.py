@@ -0,0 +1,44 @@
+"""
+Shared HTTP client module for the Naurat Importation Bot API.
+
+This module provides a single `httpx.AsyncClient` reused by every outbound request to OpenAI,
+so calls do not block the event loop and share one connection pool.
+
+Features:
+- Lazily creates the client on first use.
+- Closes the client on application shutdown.
+"""
+
+import httpx
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared asynchronous HTTP client, creating it if needed.
+
+    Returns:
+        httpx.AsyncClient: The shared HTTP client.
+    """
+
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+
+    return _client
+
+
+async def close_http_client() -> None:
+    """
+    Closes the shared HTTP client and releases its connections.
+    """
+
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
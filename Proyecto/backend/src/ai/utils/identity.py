@@ -0,0 +1,109 @@
+"""
+User identity module for the Naurat Importation Bot API.
+
+This module resolves the email or private identifier sent by the client to the user ID,
+through a cache so recurring users skip the `Users` query.
+
+Features:
+- LRU + TTL cache of email / private_id -> user ID, shared by every route and, with the
+  `sqlite` cache backend, by every worker process (see `src.ai.utils.cache`).
+- Only existing users are cached; a new user is remembered once its insert is committed,
+  after any stale entry for its identifiers is invalidated.
+- Hit and miss counters for monitoring.
+
+Environment Variables:
+- `IDENTITY_CACHE_TTL`: Lifetime of an entry, in seconds. Defaults to 300.
+- `IDENTITY_CACHE_MAX_ENTRIES`: Maximum number of cached identifiers. Defaults to 10000.
+"""
+
+import os
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import Users
+from src.ai.utils.cache import make_cache
+
+
+IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "300"))
+
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+
+identity_cache = make_cache("identity", IDENTITY_CACHE_MAX_ENTRIES, IDENTITY_CACHE_TTL)
+
+
+def _identity(email: str | None, private_id: str | None):
+    """
+    Returns the cache key and the filter of the identifier a request uses.
+
+    The email takes precedence over the private identifier, as in the chat endpoints.
+
+    Args:
+        email (str | None): The user's email.
+        private_id (str | None): The user's private identifier.
+
+    Returns:
+        tuple: The cache key and the SQLAlchemy filter on `Users`.
+    """
+
+    if email:
+        return ("email", email), Users.email == email
+    return ("private_id", private_id), Users.private_id == private_id
+
+
+async def get_user_id(
+    db: AsyncSession, email: str | None = None, private_id: str | None = None
+) -> uuid.UUID | None:
+    """
+    Resolves a user ID from its email or private identifier.
+
+    Args:
+        db (AsyncSession): The asynchronous database session, queried on a cache miss.
+        email (str | None): The user's email.
+        private_id (str | None): The user's private identifier.
+
+    Returns:
+        uuid.UUID | None: The user ID, or None if no such user exists.
+    """
+
+    key, condition = _identity(email, private_id)
+
+    user_id = identity_cache.get(key)
+    if user_id is None:
+        user_id = await db.scalar(select(Users.id).where(condition))
+        if user_id is not None:
+            identity_cache.set(key, user_id)
+
+    return user_id
+
+
+def forget_user(email: str | None = None, private_id: str | None = None) -> None:
+    """
+    Invalidates the cached IDs of the given identifiers.
+
+    Called when a user is created, so an identifier can never keep pointing at a previous row.
+
+    Args:
+        email (str | None): The user's email.
+        private_id (str | None): The user's private identifier.
+    """
+
+    if email:
+        identity_cache.delete(("email", email))
+    if private_id:
+        identity_cache.delete(("private_id", private_id))
+
+
+def remember_user(user: Users) -> None:
+    """
+    Caches the identifiers of a user whose insert has just been committed.
+
+    Args:
+        user (Users): The committed user.
+    """
+
+    if user.email:
+        identity_cache.set(("email", user.email), user.id)
+    if user.private_id:
+        identity_cache.set(("private_id", user.private_id), user.id)
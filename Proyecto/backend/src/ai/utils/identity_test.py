@@ -0,0 +1,48 @@
+import asyncio
+import uuid
+
+import src.ai.utils.identity as identity
+from src.models import Users
+
+
+class CountingSession:
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.queries = 0
+
+    async def scalar(self, statement):
+        self.queries += 1
+        return self.user_id
+
+
+def test_get_user_id_caches_existing_users():
+    identity.identity_cache.clear()
+    user_id = uuid.uuid4()
+    db = CountingSession(user_id)
+
+    assert asyncio.run(identity.get_user_id(db, email="cached@example.com")) == user_id
+    assert asyncio.run(identity.get_user_id(db, email="cached@example.com")) == user_id
+    assert db.queries == 1
+
+
+def test_get_user_id_does_not_cache_missing_users():
+    identity.identity_cache.clear()
+    db = CountingSession(None)
+
+    assert asyncio.run(identity.get_user_id(db, private_id="missing")) is None
+    assert asyncio.run(identity.get_user_id(db, private_id="missing")) is None
+    assert db.queries == 2
+
+
+def test_remember_and_forget_user():
+    identity.identity_cache.clear()
+    user = Users(id=uuid.uuid4(), private_id="new-private-user")
+    db = CountingSession(None)
+
+    identity.remember_user(user)
+    assert asyncio.run(identity.get_user_id(db, private_id="new-private-user")) == user.id
+    assert db.queries == 0
+
+    identity.forget_user(private_id="new-private-user")
+    assert asyncio.run(identity.get_user_id(db, private_id="new-private-user")) is None
+    assert db.queries == 1
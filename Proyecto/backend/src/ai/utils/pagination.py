@@ -0,0 +1,53 @@
+"""
+Keyset pagination helpers for the Naurat Importation Bot API.
+
+This module encodes and decodes the opaque cursors used to page through a user's messages.
+
+Features:
+- A cursor identifies a message by its `(created_at, id)` pair, which is unique even when
+  several messages share the same timestamp.
+- Cursors are URL-safe base64 strings, so clients treat them as opaque tokens.
+"""
+
+import base64
+import binascii
+import uuid
+from datetime import datetime
+
+
+def encode_cursor(created_at: datetime, message_id: uuid.UUID) -> str:
+    """
+    Encodes a message position as an opaque cursor.
+
+    Args:
+        created_at (datetime): The message creation timestamp.
+        message_id (uuid.UUID): The message identifier.
+
+    Returns:
+        str: The URL-safe cursor.
+    """
+
+    raw = f"{created_at.isoformat()}|{message_id.hex}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The URL-safe cursor.
+
+    Returns:
+        tuple[datetime, uuid.UUID]: The message creation timestamp and identifier.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, message_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(message_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,160 @@
+"""
+Answer parsing module for the Naurat Importation Bot API.
+
+This module extracts the product data stored in `ExcelInformation` from the agent's structured
+answer, following the templates in `constants/es.py` (`NAURAT_TASK_EXPECTED_OUTPUT`) and
+`constants/en.py` (`EN_NAURAT_TASK_EXPECTED_OUTPUT`).
+
+Features:
+- Compiled, markdown-tolerant patterns for the Spanish and English templates.
+- Returns the same keys as the `get_data` LLM extraction, so it can be used in its place.
+- Returns None when a required field is missing, so callers can fall back to the LLM.
+"""
+
+import re
+
+
+def _label(*labels: str) -> str:
+    """
+    Builds a pattern matching a template label followed by its value on the same line.
+
+    An optional parenthesized description between the label and the colon is accepted,
+    e.g. "DTA (Derecho de Trámite Aduanero):".
+
+    Args:
+        *labels (str): Alternative label texts, e.g. "Tasa máxima" and "Maximum rate".
+
+    Returns:
+        str: A pattern whose first group captures the rest of the line.
+    """
+
+    return r"(?:%s)(?:\s*\([^)\n]*\))?[\s*_]*:[\s*_]*([^\n]+)" % "|".join(labels)
+
+
+PRODUCT_PATTERN = re.compile(
+    r"(?:Información\s+de\s+importación\s+para|Import\s+information\s+for)\s+(.+?)"
+    r"\s+(?:en|in|to|into)\s+M[ée]xico",
+    re.IGNORECASE,
+)
+
+ORIGIN_IN_PRODUCT_PATTERN = re.compile(
+    r"^(.+?)\s+(?:desde|procedentes?\s+de|originari[oa]s?\s+de|from)\s+(.+)$", re.IGNORECASE
+)
+
+ORIGIN_PATTERN = re.compile(
+    _label(r"Pa[ií]s\s+de\s+origen", r"Origen", r"Country\s+of\s+origin", r"Origin"), re.IGNORECASE
+)
+
+HS_CODE_PATTERN = re.compile(
+    _label(r"C[óo]digo\s+arancelario", r"Fracci[óo]n\s+arancelaria", r"Tariff\s+code", r"HS\s+code"),
+    re.IGNORECASE,
+)
+
+HS_CODE_VALUE_PATTERN = re.compile(r"\d{4}(?:\.\d{2,4}){1,3}|\d{6,10}")
+
+IGI_MAX_PATTERN = re.compile(_label(r"Tasa\s+m[áa]xima", r"Maximum\s+rate"), re.IGNORECASE)
+
+IGI_REDUCTIONS_PATTERN = re.compile(
+    _label(r"Reducciones\s+aplicables", r"Applicable\s+reductions"), re.IGNORECASE
+)
+
+IVA_PATTERN = re.compile(_label(r"IVA", r"VAT"))
+
+DTA_PATTERN = re.compile(_label(r"DTA"))
+
+PERCENTAGE_PATTERN = re.compile(r"\d+(?:[.,]\d+)?\s*%")
+
+
+def _clean(value: str) -> str:
+    """
+    Removes markdown emphasis and trailing punctuation from a captured value.
+
+    Args:
+        value (str): The raw captured value.
+
+    Returns:
+        str: The cleaned value.
+    """
+
+    return value.replace("*", "").replace("[", "").replace("]", "").strip().rstrip(".").strip()
+
+
+def _search(pattern: re.Pattern, text: str) -> str | None:
+    """
+    Returns the cleaned first group of the first match of a pattern, if any.
+
+    Args:
+        pattern (re.Pattern): A compiled pattern with one group.
+        text (str): The text to search.
+
+    Returns:
+        str | None: The cleaned value, or None if there is no non-empty match.
+    """
+
+    match = pattern.search(text)
+    if not match:
+        return None
+
+    return _clean(match.group(1)) or None
+
+
+def _rate(value: str | None) -> str | None:
+    """
+    Reduces a tax value such as "16% sobre el valor CIF" to its percentage when present.
+
+    Args:
+        value (str | None): The cleaned tax value.
+
+    Returns:
+        str | None: The percentage, or the value unchanged if it has none (e.g. "Exento").
+    """
+
+    if value is None:
+        return None
+
+    match = PERCENTAGE_PATTERN.search(value)
+    return match.group(0).replace(" ", "") if match else value
+
+
+def parse_import_answer(response: str) -> dict | None:
+    """
+    Extracts product information from an agent answer that follows the expected templates.
+
+    Args:
+        response (str): The agent answer.
+
+    Returns:
+        dict | None: The keys produced by `get_data` ("Nombre del Producto", "HS Code",
+        "Origen del País", "Impuestos IGI (Tasa Máxima)", "Impuestos IGI (Reducciones aplicables)",
+        "IVA (%)", "DTA (%)"), or None if the product, HS code, IGI, IVA or DTA is missing.
+    """
+
+    product = _search(PRODUCT_PATTERN, response)
+    spanish = not re.search(r"Import\s+information\s+for", response, re.IGNORECASE)
+
+    origin = _search(ORIGIN_PATTERN, response)
+    if product:
+        product_and_origin = ORIGIN_IN_PRODUCT_PATTERN.match(product)
+        if product_and_origin:
+            product = product_and_origin.group(1)
+            origin = origin or product_and_origin.group(2)
+
+    hs_code = _search(HS_CODE_PATTERN, response)
+    if hs_code:
+        hs_code_value = HS_CODE_VALUE_PATTERN.search(hs_code)
+        hs_code = hs_code_value.group(0) if hs_code_value else hs_code
+
+    data = {
+        "Nombre del Producto": product,
+        "HS Code": hs_code,
+        "Origen del País": origin or ("No especificado" if spanish else "Not specified"),
+        "Impuestos IGI (Tasa Máxima)": _rate(_search(IGI_MAX_PATTERN, response)),
+        "Impuestos IGI (Reducciones aplicables)": _search(IGI_REDUCTIONS_PATTERN, response) or "",
+        "IVA (%)": _rate(_search(IVA_PATTERN, response)),
+        "DTA (%)": _rate(_search(DTA_PATTERN, response)),
+    }
+
+    if any(value is None for value in data.values()):
+        return None
+
+    return data
@@ -0,0 +1,124 @@
+import pytest
+
+from src.ai.utils.parse_answer import parse_import_answer
+
+
+SPANISH_LAPTOPS = """**Información de importación para laptops desde China en México:**
+- **Código arancelario:** 8471.30.01 (Máquinas automáticas para tratamiento de datos, portátiles).
+
+**Impuestos:**
+- **IGI:**
+  - Tasa máxima: 0%.
+  - Reducciones aplicables: No aplica, la tasa ya es 0%.
+- **IVA:** 16% sobre el valor CIF (Costo, Seguro y Flete).
+- **DTA:** 0.8% sobre el valor en aduana.
+
+**Regulaciones y requisitos específicos:**
+- **NOMs aplicables:**
+   - NOM-020-SCFI-1997 (Aparatos eléctricos y electrónicos)
+- **Otros requisitos relevantes:** etiquetado en español.
+
+**Resumen de impuestos:**
+- **IGI:** 0%.
+- **IVA:** 16%.
+- **DTA:** 0.8%.
+"""
+
+ENGLISH_BATTERIES = """### **Import information for lithium batteries in Mexico:**
+- **Tariff code:** 8507.60.99
+
+**Taxes:**
+- **IGI:**
+  - **Maximum rate:** 15%
+  - **Applicable reductions:** 0% under T-MEC (USMCA) with a certificate of origin.
+- **VAT:** 16% based on the CIF value (Cost, Insurance, and Freight).
+- **DTA:** 0.8% of the customs value.
+
+**Specific regulations and requirements:**
+- **Applicable NOMs:**
+   - NOM-116-SCFI-1997 (Batteries)
+"""
+
+SPANISH_CREAM_WITH_ORIGIN_LINE = """**Información de importación para [crema facial hidratante] en México:**
+- **País de origen:** Corea del Sur
+- **Código arancelario:** [3304.99.99].
+
+**Impuestos:**
+- **IGI:**
+  - Tasa máxima: 15 %.
+  - Reducciones aplicables: [Ninguna].
+- **IVA:** 16% sobre el valor CIF.
+- **DTA (Derecho de Trámite Aduanero):** Exento por acuerdo comercial.
+"""
+
+ENGLISH_SHOES_FROM_VIETNAM = """**Import information for running shoes from Vietnam in Mexico:**
+- **Tariff code:** 640411 (suggested)
+
+**Taxes:**
+- **IGI:**
+  - Maximum rate: 30%.
+  - Applicable reductions: CPTPP schedule.
+- **VAT:** 16% on the CIF value.
+- **DTA:** 8 per thousand.
+"""
+
+CORPUS = [
+    (
+        SPANISH_LAPTOPS,
+        {
+            "Nombre del Producto": "laptops",
+            "HS Code": "8471.30.01",
+            "Origen del País": "China",
+            "Impuestos IGI (Tasa Máxima)": "0%",
+            "Impuestos IGI (Reducciones aplicables)": "No aplica, la tasa ya es 0%",
+            "IVA (%)": "16%",
+            "DTA (%)": "0.8%",
+        },
+    ),
+    (
+        ENGLISH_BATTERIES,
+        {
+            "Nombre del Producto": "lithium batteries",
+            "HS Code": "8507.60.99",
+            "Origen del País": "Not specified",
+            "Impuestos IGI (Tasa Máxima)": "15%",
+            "Impuestos IGI (Reducciones aplicables)": "0% under T-MEC (USMCA) with a certificate of origin",
+            "IVA (%)": "16%",
+            "DTA (%)": "0.8%",
+        },
+    ),
+    (
+        SPANISH_CREAM_WITH_ORIGIN_LINE,
+        {
+            "Nombre del Producto": "crema facial hidratante",
+            "HS Code": "3304.99.99",
+            "Origen del País": "Corea del Sur",
+            "Impuestos IGI (Tasa Máxima)": "15%",
+            "Impuestos IGI (Reducciones aplicables)": "Ninguna",
+            "IVA (%)": "16%",
+            "DTA (%)": "Exento por acuerdo comercial",
+        },
+    ),
+    (
+        ENGLISH_SHOES_FROM_VIETNAM,
+        {
+            "Nombre del Producto": "running shoes",
+            "HS Code": "640411",
+            "Origen del País": "Vietnam",
+            "Impuestos IGI (Tasa Máxima)": "30%",
+            "Impuestos IGI (Reducciones aplicables)": "CPTPP schedule",
+            "IVA (%)": "16%",
+            "DTA (%)": "8 per thousand",
+        },
+    ),
+]
+
+
+@pytest.mark.parametrize("response, expected", CORPUS)
+def test_parse_import_answer_corpus(response, expected):
+    assert parse_import_answer(response) == expected
+
+
+def test_parse_import_answer_missing_fields():
+    response = "**Información de importación para laptops en México:**\nConsulta con tu agente aduanal."
+    assert parse_import_answer(response) is None
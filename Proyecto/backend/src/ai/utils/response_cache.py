@@ -0,0 +1,252 @@
+"""
+Response cache module for the Naurat Importation Bot API.
+
+This module caches agent responses for prompts sent without prior conversation history,
+so repeated product questions skip the LLM generation.
+
+Features:
+- Keys combine the normalized prompt, the detected language, a hash of the system
+  prompts and a hash of the tariff facts given to the agent, so editing the prompts in
+  `constants/` invalidates every entry and a changed tariff table or HS-code index
+  invalidates the answers built on it.
+- A `memory` backend (LRU + TTL, in-process, or shared by the workers of one host with the
+  `sqlite` cache backend of `src.ai.utils.cache`) and a `database` backend (a table in the
+  application database) so every server benefits from the same entries.
+- The database backend upserts entries, so workers caching the same prompt at once do not
+  conflict, and evicts expired and least recently used entries every
+  `RESPONSE_CACHE_EVICT_EVERY` writes instead of counting the table on each one.
+- Cache failures are logged and treated as misses; they never fail the turn.
+- Hit and miss counters.
+
+Environment Variables:
+- `RESPONSE_CACHE_BACKEND`: `memory` (default), `database` or `off`.
+- `RESPONSE_CACHE_TTL`: Lifetime of an entry, in seconds. Defaults to 86400.
+- `RESPONSE_CACHE_MAX_ENTRIES`: Maximum number of entries before LRU eviction. Defaults to 1000.
+- `RESPONSE_CACHE_EVICT_EVERY`: Writes of a process between two evictions of the database
+  backend. Defaults to 100.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import CachedResponse
+from src.ai.prompts import SYSTEM_PROMPTS
+from src.ai.utils.cache import make_cache
+
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+RESPONSE_CACHE_EVICT_EVERY = int(os.getenv("RESPONSE_CACHE_EVICT_EVERY", "100"))
+
+AGENT_CONSTANTS_HASH = hashlib.sha256(
+    "".join(f"{language}={prompt}" for language, prompt in sorted(SYSTEM_PROMPTS.items())).encode()
+).hexdigest()
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalizes a prompt so trivially different spellings share a cache entry.
+
+    Case, accents, punctuation and repeated whitespace are ignored.
+
+    Args:
+        prompt (str): The user prompt.
+
+    Returns:
+        str: The normalized prompt.
+    """
+
+    without_accents = "".join(
+        char for char in unicodedata.normalize("NFKD", prompt.casefold())
+        if not unicodedata.combining(char)
+    )
+    return " ".join(re.sub(r"[^\w\s.%-]", " ", without_accents).split())
+
+
+def response_cache_key(prompt: str, language: str, facts: str | None = None) -> str:
+    """
+    Builds the cache key of a prompt.
+
+    Args:
+        prompt (str): The user prompt.
+        language (str): The detected prompt language ('en' or 'es').
+        facts (str | None): The tariff facts or HS-code candidates given to the agent with
+            the prompt, if any.
+
+    Returns:
+        str: The hexadecimal SHA-256 key.
+    """
+
+    facts_hash = hashlib.sha256((facts or "").encode()).hexdigest()
+
+    return hashlib.sha256(
+        f"{AGENT_CONSTANTS_HASH}|{facts_hash}|{language}|{normalize_prompt(prompt)}".encode()
+    ).hexdigest()
+
+
+def _utcnow() -> datetime:
+    """
+    Returns the current UTC time as a naive datetime, matching the `TIMESTAMP` columns.
+
+    Returns:
+        datetime: The current UTC time.
+    """
+
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class ResponseCache:
+    """
+    Agent response cache with a memory or database backend.
+
+    Attributes:
+        backend (str): `memory`, `database` or `off`.
+        hits (int): Number of lookups served from the cache by this process.
+        misses (int): Number of lookups not found by this process.
+    """
+
+    def __init__(self, backend: str, max_entries: int, ttl_seconds: int):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._memory = make_cache("responses", max_entries, ttl_seconds)
+
+    async def get(self, key: str, db: AsyncSession) -> str | None:
+        """
+        Returns the cached response for a key, if any.
+
+        Args:
+            key (str): The key built by `response_cache_key`.
+            db (AsyncSession): The asynchronous database session, used by the database backend.
+
+        Returns:
+            str | None: The cached response, or None on a miss or if the cache failed.
+        """
+
+        if self.backend == "off":
+            return None
+
+        if self.backend == "database":
+            response = None
+
+            try:
+                entry = await db.get(CachedResponse, key)
+
+                if entry is not None and entry.expires_at > _utcnow():
+                    entry.last_used_at = _utcnow()
+                    await db.commit()
+                    response = entry.response
+            except SQLAlchemyError:
+                logger.exception("Response cache lookup failed")
+                await db.rollback()
+                response = None
+        else:
+            response = self._memory.get(key)
+
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return response
+
+    async def set(self, key: str, response: str, db: AsyncSession) -> None:
+        """
+        Stores a response, periodically evicting expired and least recently used entries.
+
+        A failed write is logged and rolled back; the response is simply not cached.
+
+        Args:
+            key (str): The key built by `response_cache_key`.
+            response (str): The agent response.
+            db (AsyncSession): The asynchronous database session, used by the database backend.
+        """
+
+        if self.backend == "off":
+            return
+
+        if self.backend != "database":
+            self._memory.set(key, response)
+            return
+
+        now = _utcnow()
+        insert = (postgresql if db.bind.dialect.name == "postgresql" else sqlite).insert(CachedResponse)
+        statement = insert.values(
+            key=key, response=response, expires_at=now + timedelta(seconds=self.ttl_seconds), last_used_at=now
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[CachedResponse.key],
+            set_={name: statement.excluded[name] for name in ("response", "expires_at", "last_used_at")},
+        )
+
+        try:
+            await db.execute(statement)
+
+            self._writes += 1
+            if self._writes % RESPONSE_CACHE_EVICT_EVERY == 0:
+                await self._evict(now, db)
+
+            await db.commit()
+        except SQLAlchemyError:
+            logger.exception("Response cache write failed")
+            await db.rollback()
+
+    async def _evict(self, now: datetime, db: AsyncSession) -> None:
+        """
+        Deletes the expired entries, then the least recently used ones above `max_entries`.
+
+        Args:
+            now (datetime): The current UTC time.
+            db (AsyncSession): The asynchronous database session; the caller commits.
+        """
+
+        await db.execute(delete(CachedResponse).where(CachedResponse.expires_at <= now))
+
+        overflow = await db.scalar(select(func.count()).select_from(CachedResponse)) - self.max_entries
+        if overflow > 0:
+            least_recently_used = (
+                select(CachedResponse.key)
+                .order_by(CachedResponse.last_used_at.asc())
+                .limit(overflow)
+            )
+            await db.execute(delete(CachedResponse).where(CachedResponse.key.in_(least_recently_used)))
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters of this process.
+
+        Returns:
+            dict: The backend, hits, misses and hit rate.
+        """
+
+        lookups = self.hits + self.misses
+
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache(
+    RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL
+)
@@ -0,0 +1,353 @@
+"""
+Tariff table module for the Naurat Importation Bot API.
+
+This module loads the TIGIE tariff fractions into an in-memory index, so the tax facts of an
+HS code (IGI, IVA, DTA) come from structured data instead of an LLM generation.
+
+Features:
+- Loads a CSV (or Parquet, when `pyarrow` is installed) file with one row per fraction.
+  Recognized columns: `hs_code` (or `fraccion`), `description` (or `descripcion`),
+  `igi_max` (or `igi`), `iva` and `dta`; `iva` and `dta` default to 16% and 0.8%.
+- Keeps the normalized codes in one sorted array, so exact lookups and prefix scans
+  (chapter, heading or subheading) are binary searches taking microseconds.
+- Finds the HS codes written in a prompt and formats their facts for the agent. Only
+  complete fractions count: dotted ("8471.30.01"), or bare digits right after a word such
+  as "HS", "partida" or "fracción", so prices, phone numbers or years are never read as codes.
+
+Environment Variables:
+- `TARIFF_TABLE_PATH`: Path of the tariff file. Without it the index is empty.
+"""
+
+import csv
+import os
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import NamedTuple
+
+
+DEFAULT_IVA = "16%"
+
+DEFAULT_DTA = "0.8%"
+
+COLUMN_ALIASES = {
+    "hs_code": ("hs_code", "fraccion", "fracción", "code"),
+    "description": ("description", "descripcion", "descripción"),
+    "igi_max": ("igi_max", "igi", "arancel"),
+    "iva": ("iva", "vat"),
+    "dta": ("dta",),
+}
+
+DOTTED_HS_CODE_PATTERN = re.compile(r"(?<![\d.])\d{4}\.\d{2}\.\d{2}(?!\.?\d)")
+
+HS_CODE_AFTER_KEYWORD_PATTERN = re.compile(
+    r"\b(?:hs|hts|partida|subpartida|fracci[oó]n|arancelaria|heading|subheading|tariff)\b"
+    r"[^\d\n]{0,20}?(?<![\d.])(\d{4}\.?\d{2}\.?\d{2})(?!\.?\d)",
+    re.IGNORECASE,
+)
+
+
+class TariffEntry(NamedTuple):
+    """
+    Tax facts of one tariff fraction.
+
+    Attributes:
+        hs_code (str): The normalized code (digits only).
+        description (str): The fraction description.
+        igi_max (str): The maximum General Import Tax rate.
+        iva (str): The value-added tax rate.
+        dta (str): The customs processing fee.
+    """
+
+    hs_code: str
+    description: str
+    igi_max: str
+    iva: str
+    dta: str
+
+
+def normalize_hs_code(hs_code: str) -> str:
+    """
+    Reduces an HS code such as "8471.30.01" to its digits.
+
+    Args:
+        hs_code (str): The code as written.
+
+    Returns:
+        str: The digits of the code.
+    """
+
+    return "".join(char for char in hs_code if char.isdigit())
+
+
+def format_hs_code(hs_code: str) -> str:
+    """
+    Formats normalized digits as a dotted TIGIE fraction, e.g. "84713001" -> "8471.30.01".
+
+    Args:
+        hs_code (str): The normalized code.
+
+    Returns:
+        str: The dotted code.
+    """
+
+    groups = [hs_code[:4]] + [hs_code[index:index + 2] for index in range(4, len(hs_code), 2)]
+    return ".".join(group for group in groups if group)
+
+
+class TariffIndex:
+    """
+    Sorted-array index of tariff fractions keyed by normalized HS code.
+
+    Attributes:
+        codes (list[str]): The normalized codes in ascending order.
+        entries (list[TariffEntry]): The entries, aligned with `codes`.
+    """
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda entry: entry.hs_code)
+        self.codes = [entry.hs_code for entry in self.entries]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def get(self, hs_code: str) -> TariffEntry | None:
+        """
+        Returns the entry of an exact fraction.
+
+        Args:
+            hs_code (str): The code, with or without dots.
+
+        Returns:
+            TariffEntry | None: The entry, or None if the fraction is unknown.
+        """
+
+        code = normalize_hs_code(hs_code)
+        position = bisect_left(self.codes, code)
+
+        if position < len(self.codes) and self.codes[position] == code:
+            return self.entries[position]
+        return None
+
+    def prefix(self, hs_code: str, limit: int = 50) -> list[TariffEntry]:
+        """
+        Returns the fractions under a chapter, heading or subheading.
+
+        Args:
+            hs_code (str): The code prefix, with or without dots.
+            limit (int): Maximum number of entries returned.
+
+        Returns:
+            list[TariffEntry]: The matching entries in code order.
+        """
+
+        code = normalize_hs_code(hs_code)
+        if not code:
+            return []
+
+        position = bisect_left(self.codes, code)
+        matches = []
+
+        while position < len(self.codes) and len(matches) < limit and self.codes[position].startswith(code):
+            matches.append(self.entries[position])
+            position += 1
+
+        return matches
+
+    def lookup(self, hs_code: str) -> TariffEntry | None:
+        """
+        Returns the entry of a code, or of its only fraction when the code is a prefix.
+
+        Args:
+            hs_code (str): The code, with or without dots.
+
+        Returns:
+            TariffEntry | None: The entry, or None if the code is unknown or ambiguous.
+        """
+
+        entry = self.get(hs_code)
+        if entry is not None:
+            return entry
+
+        matches = self.prefix(hs_code, limit=2)
+        return matches[0] if len(matches) == 1 else None
+
+    def find_in_text(self, text: str) -> list[TariffEntry]:
+        """
+        Returns the known fractions whose codes are written in a text.
+
+        A code is a dotted fraction ("8471.30.01") or eight digits following an HS keyword
+        ("fracción 84713001"). Only exact fractions are returned: unlike `lookup`, a code is
+        never resolved through a prefix, since free text is not known to mean a tariff code.
+
+        Args:
+            text (str): A user prompt or agent answer.
+
+        Returns:
+            list[TariffEntry]: The entries, in order of appearance and without duplicates.
+        """
+
+        if not self.codes:
+            return []
+
+        matches = sorted(
+            [(match.start(), match.group(0)) for match in DOTTED_HS_CODE_PATTERN.finditer(text)]
+            + [(match.start(1), match.group(1)) for match in HS_CODE_AFTER_KEYWORD_PATTERN.finditer(text)]
+        )
+
+        entries = []
+        for _, code in matches:
+            entry = self.get(code)
+            if entry is not None and entry not in entries:
+                entries.append(entry)
+
+        return entries
+
+
+def _read_rows(path: str):
+    """
+    Reads the rows of a CSV or Parquet tariff file as dictionaries.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        Iterable[dict]: The rows keyed by lowercase column name.
+
+    Raises:
+        ImportError: If a Parquet file is given and `pyarrow` is not installed.
+    """
+
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading a Parquet tariff table requires pyarrow") from e
+
+        return (
+            {key.lower(): value for key, value in row.items()}
+            for row in pq.read_table(path).to_pylist()
+        )
+
+    with open(path, newline="", encoding="utf-8-sig") as tariff_file:
+        return [
+            {key.strip().lower(): value for key, value in row.items() if key}
+            for row in csv.DictReader(tariff_file)
+        ]
+
+
+def _column(row: dict, field: str, default: str | None = None) -> str | None:
+    """
+    Returns the value of a field under any of its accepted column names.
+
+    Args:
+        row (dict): The row keyed by lowercase column name.
+        field (str): The field, a key of `COLUMN_ALIASES`.
+        default (str | None): The value used when the column is missing or empty.
+
+    Returns:
+        str | None: The stripped value, or the default.
+    """
+
+    for alias in COLUMN_ALIASES[field]:
+        value = row.get(alias)
+        if value not in (None, ""):
+            return str(value).strip()
+    return default
+
+
+def _rate(value: str) -> str:
+    """
+    Adds the percent sign to bare numeric rates such as "15".
+
+    Args:
+        value (str): The rate as stored.
+
+    Returns:
+        str: The rate as shown to users.
+    """
+
+    return f"{value}%" if re.fullmatch(r"\d+(?:\.\d+)?", value) else value
+
+
+def load_tariff_index(path: str) -> TariffIndex:
+    """
+    Loads a tariff file into an index. Rows without code or IGI are skipped.
+
+    Args:
+        path (str): The CSV or Parquet file path.
+
+    Returns:
+        TariffIndex: The loaded index.
+    """
+
+    entries = []
+
+    for row in _read_rows(path):
+        hs_code = normalize_hs_code(_column(row, "hs_code", ""))
+        igi_max = _column(row, "igi_max")
+
+        if not hs_code or igi_max is None:
+            continue
+
+        entries.append(
+            TariffEntry(
+                hs_code=hs_code,
+                description=_column(row, "description", ""),
+                igi_max=_rate(igi_max),
+                iva=_rate(_column(row, "iva", DEFAULT_IVA)),
+                dta=_rate(_column(row, "dta", DEFAULT_DTA)),
+            )
+        )
+
+    return TariffIndex(entries)
+
+
+@lru_cache(maxsize=1)
+def get_tariff_index() -> TariffIndex:
+    """
+    Returns the shared tariff index, loading `TARIFF_TABLE_PATH` on first use.
+
+    Returns:
+        TariffIndex: The index, empty when no table is configured.
+    """
+
+    path = os.getenv("TARIFF_TABLE_PATH")
+    return load_tariff_index(path) if path else TariffIndex([])
+
+
+def format_tariff_facts(entries: list[TariffEntry], language: str) -> str:
+    """
+    Formats tariff entries as facts the agent must use verbatim.
+
+    Args:
+        entries (list[TariffEntry]): The entries found in the prompt.
+        language (str): The prompt language ('en' or 'es').
+
+    Returns:
+        str: The facts, or an empty string if there are no entries.
+    """
+
+    if not entries:
+        return ""
+
+    if language == "en":
+        title = "Official tariff data (use these exact rates):"
+        line = "- {code} ({description}): IGI maximum rate {igi}, VAT {iva}, DTA {dta}."
+    else:
+        title = "Datos oficiales de la tarifa (usa exactamente estas tasas):"
+        line = "- {code} ({description}): IGI tasa máxima {igi}, IVA {iva}, DTA {dta}."
+
+    return "\n".join(
+        [title]
+        + [
+            line.format(
+                code=format_hs_code(entry.hs_code),
+                description=entry.description,
+                igi=entry.igi_max,
+                iva=entry.iva,
+                dta=entry.dta,
+            )
+            for entry in entries
+        ]
+    )
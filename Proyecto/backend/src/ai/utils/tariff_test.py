@@ -0,0 +1,53 @@
+import pytest
+
+from src.ai.utils.tariff import format_tariff_facts, load_tariff_index
+
+
+TARIFF_CSV = """fraccion,descripcion,igi,iva,dta
+8471.30.01,Máquinas automáticas para tratamiento de datos portátiles,0,,
+8507.60.99,Los demás acumuladores de iones de litio,15,16,0.8
+6404.11.01,Calzado para deporte con suela de caucho,30,,
+6404.11.99,Los demás calzados para deporte,30,,
+,Fila sin fracción,10,,
+"""
+
+
+@pytest.fixture
+def tariff_index(tmp_path):
+    path = tmp_path / "tariff.csv"
+    path.write_text(TARIFF_CSV, encoding="utf-8")
+    return load_tariff_index(str(path))
+
+
+def test_load_tariff_index_normalizes_codes_and_rates(tariff_index):
+    assert len(tariff_index) == 4
+
+    entry = tariff_index.get("8471.30.01")
+    assert entry.hs_code == "84713001"
+    assert (entry.igi_max, entry.iva, entry.dta) == ("0%", "16%", "0.8%")
+    assert tariff_index.get("84713001") == entry
+    assert tariff_index.get("8471.30.02") is None
+
+
+def test_prefix_and_lookup(tariff_index):
+    assert [entry.hs_code for entry in tariff_index.prefix("6404.11")] == ["64041101", "64041199"]
+    assert tariff_index.lookup("6404.11") is None
+    assert tariff_index.lookup("8507.60").hs_code == "85076099"
+    assert tariff_index.prefix("9999") == []
+
+
+def test_find_in_text_ignores_numbers_that_are_not_hs_codes(tariff_index):
+    assert tariff_index.find_in_text("Pagué 84713001 pesos, llámame al 8507 6099") == []
+    assert tariff_index.find_in_text("Precio unitario 8507.60 USD") == []
+    assert tariff_index.find_in_text("HS code 8507.60") == []
+    assert [entry.hs_code for entry in tariff_index.find_in_text("HS code: 85076099.")] == ["85076099"]
+
+
+def test_find_in_text_and_facts(tariff_index):
+    entries = tariff_index.find_in_text("Quiero importar baterías 8507.60.99 y laptops (fracción 84713001) en 2024")
+
+    assert [entry.hs_code for entry in entries] == ["85076099", "84713001"]
+
+    facts = format_tariff_facts(entries, "es")
+    assert "- 8507.60.99 (Los demás acumuladores de iones de litio): IGI tasa máxima 15%, IVA 16%, DTA 0.8%." in facts
+    assert format_tariff_facts([], "en") == ""
@@ -0,0 +1,169 @@
+"""
+Compression module for the Naurat Importation Bot API.
+
+This module compresses response bodies (e.g. the conversation history polled by the
+frontend) with the best encoding the client accepts.
+
+Features:
+- Negotiates `zstd` or `gzip` from the `Accept-Encoding` header, honouring `q` weights and
+  `*`; `zstd` is preferred when both are equally acceptable.
+- Only complete (single-message) bodies of text, JSON and XML responses of at least
+  `COMPRESSION_MIN_BYTES` are compressed: streamed responses (Server-Sent Events) are sent
+  as produced, and already compressed formats such as XLSX are left untouched.
+- Compressed responses get `Content-Encoding`, `Vary: Accept-Encoding` and a weak version
+  of their `ETag`, so a validator stays usable in `If-None-Match` whatever the encoding.
+
+Environment Variables:
+- `COMPRESSION_MIN_BYTES`: Smallest body worth compressing. Defaults to 500.
+- `COMPRESSION_ZSTD_LEVEL`: zstd compression level. Defaults to 3.
+- `COMPRESSION_GZIP_LEVEL`: gzip compression level. Defaults to 6.
+"""
+
+import gzip
+import os
+
+import zstandard
+from starlette.datastructures import MutableHeaders
+
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "500"))
+
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+
+# Supported encodings, most preferred first.
+ENCODINGS = ("zstd", "gzip")
+
+COMPRESSIBLE_TYPES = ("application/json", "application/xml", "application/javascript", "image/svg+xml")
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """
+    Picks the response encoding from an `Accept-Encoding` header.
+
+    Args:
+        accept_encoding (str): The header value, e.g. "gzip, deflate, br, zstd".
+
+    Returns:
+        str | None: "zstd" or "gzip", or None if neither is acceptable.
+    """
+
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, *params = item.split(";")
+        weight = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name.strip():
+            weights[name.strip().lower()] = weight
+
+    default = weights.get("*", 0.0)
+    weight, encoding = max((weights.get(encoding, default), encoding) for encoding in reversed(ENCODINGS))
+
+    return encoding if weight > 0 else None
+
+
+def is_compressible(content_type: str) -> bool:
+    """
+    Whether a response media type benefits from compression.
+
+    Args:
+        content_type (str): The `Content-Type` header value.
+
+    Returns:
+        bool: True for text (except event streams), JSON, XML and similar types.
+    """
+
+    media_type = content_type.split(";")[0].strip().lower()
+
+    if media_type.startswith("text/"):
+        return media_type != "text/event-stream"
+
+    return media_type in COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compresses a body with an encoding returned by `negotiate_encoding`.
+
+    Args:
+        body (bytes): The response body.
+        encoding (str): "zstd" or "gzip".
+
+    Returns:
+        bytes: The encoded body.
+    """
+
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compress(body)
+
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing complete response bodies with zstd or gzip.
+
+    Attributes:
+        app (ASGIApp): The wrapped application.
+        minimum_size (int): Smallest body that is compressed.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if start_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            headers = MutableHeaders(scope=start_message)
+            body = message.get("body", b"")
+
+            if (
+                not message.get("more_body", False)
+                and len(body) >= self.minimum_size
+                and "content-encoding" not in headers
+                and is_compressible(headers.get("content-type", ""))
+            ):
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+
+                message = {**message, "body": body}
+
+            await send(start_message)
+            start_message = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,72 @@
+import gzip
+import json
+
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.compression import CompressionMiddleware, negotiate_encoding
+
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+PAYLOAD = {"conversation": [{"owner": "human", "message": "¿Cómo importo laptops?"}] * 50}
+
+
+@app.get("/json")
+def json_payload():
+    return JSONResponse(PAYLOAD, headers={"ETag": '"v1"'})
+
+
+@app.get("/small")
+def small_payload():
+    return {"ok": True}
+
+
+@app.get("/events")
+def events():
+    return StreamingResponse(iter([b"data: 1\n\n"] * 100), media_type="text/event-stream")
+
+
+client = TestClient(app)
+
+
+def raw_get(path: str, accept_encoding: str):
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_negotiate_encoding_honours_weights():
+    assert negotiate_encoding("gzip, deflate, br, zstd") == "zstd"
+    assert negotiate_encoding("gzip") == "gzip"
+    assert negotiate_encoding("zstd;q=0.5, gzip") == "gzip"
+    assert negotiate_encoding("*") == "zstd"
+    assert negotiate_encoding("gzip;q=0, br") is None
+    assert negotiate_encoding("") is None
+
+
+def test_json_is_compressed_with_the_negotiated_encoding():
+    response, body = raw_get("/json", "zstd")
+    assert response.headers["Content-Encoding"] == "zstd"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"] == 'W/"v1"'
+    assert json.loads(zstandard.ZstdDecompressor().decompress(body)) == PAYLOAD
+
+    response, body = raw_get("/json", "gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert int(response.headers["Content-Length"]) == len(body)
+    assert json.loads(gzip.decompress(body)) == PAYLOAD
+
+
+def test_small_streamed_and_unaccepted_bodies_are_sent_as_is():
+    response, _ = raw_get("/json", "identity")
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == '"v1"'
+
+    assert "Content-Encoding" not in raw_get("/small", "gzip")[0].headers
+
+    response, body = raw_get("/events", "gzip")
+    assert "Content-Encoding" not in response.headers
+    assert body == b"data: 1\n\n" * 100
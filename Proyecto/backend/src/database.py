@@ -4,36 +4,122 @@ Database configuration module for the Naurat Importation Bot API.
 This module sets up the SQLAlchemy database connection, session management, and base model definition.
 
 Features:
-- Establishes a connection to the database using SQLAlchemy's `create_engine`.
-- Configures connection pooling for optimized performance.
-- Provides a session factory (`SessionLocal`) for database interactions.
+- Provides an asynchronous engine and session factory (`AsyncSessionLocal`) used by every
+  route, using psycopg 3 for PostgreSQL and aiosqlite for SQLite, so database I/O never
+  blocks the event loop.
+- Keeps a synchronous engine and session factory (`SessionLocal`) for scripts and schema
+  management.
+- Configures connection pooling from the environment and reports the pool state (`pool_stats`).
 - Defines a base class (`Base`) for ORM models.
-- Includes a dependency function (`get_db`) for handling database sessions in FastAPI.
+- Includes dependency functions (`get_async_db`, `get_db`) for handling database sessions in FastAPI.
 
 Environment Variables:
 - `DATABASE_URL`: The database connection string.
+- `DB_POOL_SIZE`: Connections kept open per engine. Defaults to 15.
+- `DB_MAX_OVERFLOW`: Extra connections opened under load. Defaults to 20.
+- `DB_POOL_TIMEOUT`: Seconds to wait for a free connection before failing. Defaults to 30.
+- `DB_POOL_RECYCLE`: Seconds after which a connection is replaced; -1 never. Defaults to -1.
 """
 
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import QueuePool, create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "15"))
+
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+}
+
 engine = create_engine(
     os.getenv("DATABASE_URL"),
-    pool_size=15,
-    max_overflow=20,
-    pool_timeout=30,
-    pool_pre_ping=True
+    pool_pre_ping=True,
+    **POOL_OPTIONS,
 )
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def get_async_database_url(database_url: str) -> str:
+    """
+    Translates a synchronous database URL into its asynchronous driver equivalent.
+
+    Args:
+        database_url (str): The synchronous connection string, e.g. `postgresql://...`.
+
+    Returns:
+        str: The same connection string using the `psycopg` (PostgreSQL) or
+        `aiosqlite` (SQLite) driver.
+    """
+
+    scheme, _, rest = database_url.partition("://")
+    dialect = scheme.split("+")[0]
+
+    if dialect in ("postgres", "postgresql"):
+        return f"postgresql+psycopg://{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+
+    return database_url
+
+
+ASYNC_DATABASE_URL = get_async_database_url(os.getenv("DATABASE_URL"))
+
+# SQLite's async driver does not use a queue pool, so the sizing options only apply to PostgreSQL.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    **({} if ASYNC_DATABASE_URL.startswith("sqlite") else POOL_OPTIONS),
+)
+
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
 Base = declarative_base()
 
 
+def pool_stats() -> dict:
+    """
+    Reports the connection pool state of the asynchronous and synchronous engines.
+
+    Returns:
+        dict: Per engine, the pool class and, for queue pools, its `size`, `checked_out`,
+        `idle` and `overflow` connections and its `timeout`.
+    """
+
+    stats = {}
+
+    for name, pool in (("async", async_engine.sync_engine.pool), ("sync", engine.pool)):
+        stats[name] = {"pool": type(pool).__name__}
+
+        if isinstance(pool, QueuePool):
+            stats[name].update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                # `overflow()` is negative until the base pool is full.
+                overflow=max(0, pool.overflow()),
+                timeout=pool.timeout(),
+            )
+
+    return stats
+
+
 def get_db():
     """
     Provides a database session for dependency injection in FastAPI routes.
@@ -49,3 +135,17 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Provides an asynchronous database session for dependency injection in FastAPI routes.
+
+    This function yields an async database session and ensures proper cleanup by closing
+    the session after use, without blocking the event loop.
+
+    Yields:
+        sqlalchemy.ext.asyncio.AsyncSession: An asynchronous database session.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
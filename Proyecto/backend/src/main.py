@@ -4,12 +4,31 @@ Main module for the Naurat Importation Bot API.
 This script initializes and runs a FastAPI server with the following features:
 
 - **CORS Middleware:** Configured to allow all origins, credentials, methods, and headers.
+- **Lifespan:** Opens the conversation checkpointer, compiles the agent graph and starts the
+  background job workers at startup, loading the tariff table and HS-code search index in
+  the background, and drains the job queue, closes the checkpointer, the shared OpenAI HTTP
+  client and the async database engine on shutdown. The schema is not created here: run
+  `alembic upgrade head` before starting a new release (the Docker image's entrypoint,
+  `docker-entrypoint.sh`, does it unless `RUN_MIGRATIONS=0`).
+- **Metrics:** Request counts and latencies per route, chat-turn stage latencies, OpenAI
+  token usage, database pool and job queue state (see `src.metrics`). `/ai` responses carry
+  a `Server-Timing` header with their stage durations.
+- **Compression:** Complete text and JSON responses are compressed with zstd or gzip, as
+  negotiated with `Accept-Encoding` (see `src.compression`).
+- **Profiling:** Requests presenting `PROFILER_TOKEN` are sampled and their profile written
+  to disk (see `src.profiling`).
 - **Routers:**
   - `/ai`: Handles AI-related endpoints (imported from `src.ai.router`).
+  - `/metrics`: Prometheus text exposition of the metrics.
   - `/`: Root endpoint returning a basic welcome message.
 - **Server Execution:**
   - Runs with Uvicorn.
   - Uses the `PORT` environment variable if defined, otherwise defaults to port 8080.
+  - Runs `WEB_CONCURRENCY` worker processes (default 1) behind one socket. With more than
+    one, the caches default to the shared `sqlite` backend (reset at launch), the metrics
+    are aggregated across workers, `SIGHUP` restarts the workers one at a time (graceful
+    reload) and `SIGTTIN` / `SIGTTOU` add or remove a worker.
+  - In-flight requests get `GRACEFUL_SHUTDOWN_SECONDS` (default 30) to finish on shutdown.
 
 Usage:
     Run the script directly to start the FastAPI server.
@@ -22,16 +41,73 @@ Modules:
 
 """
 
+import asyncio
+import glob
+import logging
 import os
+import tempfile
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from src.ai.agent import close_checkpointer, get_agent, init_checkpointer
+from src.ai.jobs import job_queue
 from src.ai.router import ai_router
+from src.ai.utils.cache import SHARED_CACHE_PATH, ensure_private_directory
+from src.ai.utils.http_client import close_http_client
+from src.ai.utils.hs_search import hs_search
+from src.ai.utils.tariff import get_tariff_index
+from src.compression import CompressionMiddleware
+from src.database import async_engine
+from src.metrics import MetricsMiddleware, ServerTimingMiddleware, metrics_endpoint
+from src.profiling import ProfilerMiddleware
 
 
 import uvicorn
 
-app = FastAPI()
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up_indexes() -> None:
+    """
+    Loads the tariff table and builds the HS-code search index in the background, so the
+    server starts answering (e.g. health checks) without waiting for them.
+    """
+
+    try:
+        await asyncio.to_thread(get_tariff_index)
+        await hs_search.get_index()
+    except Exception:
+        logger.exception("Index warm-up failed; the indexes will be built on first use")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Opens the checkpointer, compiles the shared agent graph, starts the job workers and the
+    background index warm-up on startup, and drains the job queue and releases shared
+    resources when the application shuts down.
+
+    Args:
+        app (FastAPI): The application instance.
+    """
+
+    await init_checkpointer()
+    get_agent()
+    await job_queue.start()
+    warm_up = asyncio.create_task(warm_up_indexes())
+
+    yield
+
+    warm_up.cancel()
+    await job_queue.stop()
+    await close_checkpointer()
+    await close_http_client()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 app.title = "Naurat Importation Bot API"
@@ -44,8 +120,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware)
+
+app.add_middleware(ServerTimingMiddleware)
+
+app.add_middleware(MetricsMiddleware)
+
+app.add_middleware(ProfilerMiddleware)
+
 app.include_router(ai_router, prefix="/ai", tags=["ai"])
 
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 
 @app.get("/")
 def read_root():
@@ -59,6 +145,44 @@ def read_root():
     return {"Hello": "Ingesoft Class"}
 
 
+def prepare_workers(workers: int) -> None:
+    """
+    Configures the process-shared state before the worker processes are spawned.
+
+    The workers inherit the environment, so the caches select the shared `sqlite` backend
+    (unless `CACHE_BACKEND` is set) and the metrics use a multi-process directory. Both are
+    cleared, so no entry or metric outlives the previous launch. Unless
+    `PROMETHEUS_MULTIPROC_DIR` is set, the metrics directory is a new private temporary
+    directory, never a predictable path under the shared temporary directory.
+
+    Args:
+        workers (int): The number of worker processes.
+
+    Raises:
+        PermissionError: If `PROMETHEUS_MULTIPROC_DIR` belongs to another user or others may
+            write to it.
+    """
+
+    if workers <= 1:
+        return
+
+    os.environ.setdefault("CACHE_BACKEND", "sqlite")
+    if os.environ["CACHE_BACKEND"] == "sqlite":
+        cache_path = os.environ.setdefault("SHARED_CACHE_PATH", SHARED_CACHE_PATH)
+        for path in (cache_path, f"{cache_path}-wal", f"{cache_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="naurat-metrics-")
+        return
+
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    ensure_private_directory(metrics_dir)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+
 if __name__ == "__main__":
 
     PORT = os.getenv("PORT")
@@ -70,4 +194,16 @@ if __name__ == "__main__":
 
         PORT = 8080
 
-    uvicorn.run(app, host="0.0.0.0", port=int(PORT))
+    WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+    print(f"[INFO] Workers: {WORKERS}")
+
+    prepare_workers(WORKERS)
+
+    uvicorn.run(
+        "src.main:app" if WORKERS > 1 else app,
+        host="0.0.0.0",
+        port=int(PORT),
+        workers=WORKERS,
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30")),
+    )
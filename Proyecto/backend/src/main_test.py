@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from src.main import prepare_workers
+
+
+def test_prepare_workers_creates_a_private_metrics_directory(monkeypatch):
+    monkeypatch.setenv("CACHE_BACKEND", "memory")
+    # Recorded by setenv, so the directory set by prepare_workers is removed afterwards.
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", "")
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR")
+
+    prepare_workers(2)
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    try:
+        assert os.stat(metrics_dir).st_mode & 0o777 == 0o700
+
+        prepare_workers(2)
+        assert os.environ["PROMETHEUS_MULTIPROC_DIR"] == metrics_dir
+    finally:
+        os.rmdir(metrics_dir)
+
+
+def test_prepare_workers_clears_a_configured_metrics_directory(monkeypatch, tmp_path):
+    metrics_dir = tmp_path / "metrics"
+    metrics_dir.mkdir(mode=0o700)
+    (metrics_dir / "counter_1.db").write_bytes(b"")
+    monkeypatch.setenv("CACHE_BACKEND", "memory")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(metrics_dir))
+
+    prepare_workers(2)
+
+    assert list(metrics_dir.iterdir()) == []
+
+
+def test_prepare_workers_refuses_a_metrics_directory_others_can_write(monkeypatch, tmp_path):
+    metrics_dir = tmp_path / "metrics"
+    metrics_dir.mkdir()
+    metrics_dir.chmod(0o777)
+    (metrics_dir / "counter_1.db").write_bytes(b"")
+    monkeypatch.setenv("CACHE_BACKEND", "memory")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(metrics_dir))
+
+    with pytest.raises(PermissionError):
+        prepare_workers(2)
+
+    assert (metrics_dir / "counter_1.db").exists()
@@ -0,0 +1,346 @@
+"""
+Metrics module for the Naurat Importation Bot API.
+
+This module collects the application metrics and exposes them at `/metrics` in the Prometheus
+text exposition format.
+
+Features:
+- Request counts and latencies per method, route template and status code, recorded by
+  `MetricsMiddleware` (the route template keeps the label set bounded).
+- Per-stage latency histograms of a chat turn (language detection, history, LLM call, NOM
+  extraction, answer parsing, commit...) through the `track_stage` context manager.
+- OpenAI token usage (prompt, completion and cached prompt tokens) per model.
+- Connection checkouts and checkout waits of the synchronous and asynchronous database
+  engines, plus their pool state at scrape time.
+- Depth and counters of the background job queue at scrape time.
+- `ServerTimingMiddleware` adds a `Server-Timing` header with the stage durations of the
+  request (plus `db`, the time spent in SQL statements, and `total`) to the `/ai` responses.
+- With several worker processes, the counters and histograms of every worker are aggregated
+  at scrape time from `PROMETHEUS_MULTIPROC_DIR`; the pool and job queue state is the one of
+  the worker serving the scrape.
+
+Environment Variables:
+- `PROMETHEUS_MULTIPROC_DIR`: Directory shared by the worker processes for their metric
+  files; created if missing. The multi-worker launcher in `src.main` defaults it to a new
+  private temporary directory, and refuses a directory other users may write to.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.database import async_engine, engine, pool_stats
+from src.ai.jobs import job_queue
+
+
+# In multi-process mode every metric is backed by a file of this directory, created on first use.
+if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+REQUESTS = Counter(
+    "naurat_http_requests_total",
+    "HTTP requests handled, by method, route template and status code.",
+    ["method", "route", "status"],
+)
+
+REQUEST_LATENCY = Histogram(
+    "naurat_http_request_duration_seconds",
+    "HTTP request latency until the last body byte, by method and route template.",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STAGE_LATENCY = Histogram(
+    "naurat_stage_duration_seconds",
+    "Latency of each stage of a chat turn.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+TOKENS = Counter(
+    "naurat_openai_tokens_total",
+    "OpenAI tokens used, by model and kind (prompt, completion or cached prompt).",
+    ["model", "kind"],
+)
+
+DB_POOL_CHECKOUTS = Counter(
+    "naurat_db_pool_checkouts_total",
+    "Database connections checked out of the pool, by engine.",
+    ["engine"],
+)
+
+DB_POOL_WAIT = Histogram(
+    "naurat_db_pool_wait_seconds",
+    "Time spent obtaining a database connection (waiting for a free one, connecting and "
+    "pre-pinging), by engine.",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+
+
+# Stage durations of the current request, in seconds; None outside `ServerTimingMiddleware`.
+_request_timings: ContextVar[dict | None] = ContextVar("request_timings", default=None)
+
+
+def add_request_timing(stage: str, seconds: float) -> None:
+    """
+    Adds a duration to a stage of the current request's `Server-Timing` header, if any.
+
+    Args:
+        stage (str): The stage name.
+        seconds (float): The duration.
+    """
+
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Records the duration of a block in the stage latency histogram and in the current
+    request's `Server-Timing` header.
+
+    Args:
+        stage (str): The stage name, e.g. "llm" or "commit".
+
+    Yields:
+        None
+    """
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(stage).observe(elapsed)
+        add_request_timing(stage, elapsed)
+
+
+def record_token_usage(model: str, usage: dict | None) -> None:
+    """
+    Adds the token usage of one OpenAI call to the token counters.
+
+    Args:
+        model (str): The model name.
+        usage (dict | None): The `usage` object of a Chat Completions response, or the
+            `usage_metadata` of a LangChain message.
+    """
+
+    if not usage:
+        return
+
+    if "input_tokens" in usage:
+        prompt = usage.get("input_tokens", 0)
+        completion = usage.get("output_tokens", 0)
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0)
+    else:
+        prompt = usage.get("prompt_tokens", 0)
+        completion = usage.get("completion_tokens", 0)
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+
+    TOKENS.labels(model, "prompt").inc(prompt or 0)
+    TOKENS.labels(model, "completion").inc(completion or 0)
+    TOKENS.labels(model, "cached_prompt").inc(cached or 0)
+
+
+_instrumented_engines = {}
+
+
+def instrument_engine(sync_engine, name: str) -> None:
+    """
+    Records the connection checkouts and checkout waits of an engine, and the time its SQL
+    statements take in the current request's `db` timing.
+
+    The wait is timed around `Engine.raw_connection`, which every `Connection` (and therefore
+    every session, sync or async) goes through to get its DBAPI connection from the pool.
+
+    Args:
+        sync_engine (Engine): The engine, or the `sync_engine` of an `AsyncEngine`.
+        name (str): The `engine` label value.
+    """
+
+    if name in _instrumented_engines:
+        return
+
+    raw_connection = sync_engine.raw_connection
+    wait = DB_POOL_WAIT.labels(name)
+    checkouts = DB_POOL_CHECKOUTS.labels(name)
+
+    def timed_raw_connection():
+        start = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            wait.observe(time.perf_counter() - start)
+
+    def before_cursor_execute(connection, *args):
+        connection.info["statement_start"] = time.perf_counter()
+
+    def after_cursor_execute(connection, *args):
+        add_request_timing("db", time.perf_counter() - connection.info.pop("statement_start"))
+
+    sync_engine.raw_connection = timed_raw_connection
+    event.listen(sync_engine, "checkout", lambda *args: checkouts.inc())
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+
+    _instrumented_engines[name] = sync_engine
+
+
+class StateCollector:
+    """
+    Collector reading the pool state of the instrumented engines and the job queue counters
+    when `/metrics` is scraped.
+    """
+
+    def collect(self):
+        pool = GaugeMetricFamily(
+            "naurat_db_pool_connections",
+            "Database pool connections by engine and state (size, checked_out, idle, overflow).",
+            labels=["engine", "state"],
+        )
+
+        # Pools without a fixed size (e.g. SQLite's async pool) only report their class.
+        for name, stats in pool_stats().items():
+            for state in ("size", "checked_out", "idle", "overflow"):
+                if state in stats:
+                    pool.add_metric([name, state], stats[state])
+
+        yield pool
+
+        stats = job_queue.stats()
+
+        yield GaugeMetricFamily(
+            "naurat_job_queue_depth", "Background jobs waiting in the queue.", value=stats["depth"]
+        )
+        yield GaugeMetricFamily(
+            "naurat_job_queue_running", "Whether the job queue workers are running.", value=int(stats["running"])
+        )
+
+        jobs = CounterMetricFamily(
+            "naurat_jobs", "Background jobs by outcome (processed, failed, retried).", labels=["outcome"]
+        )
+        for outcome in ("processed", "failed", "retried"):
+            jobs.add_metric([outcome], stats[outcome])
+        yield jobs
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting and timing HTTP requests per route template.
+
+    Attributes:
+        app (ASGIApp): The wrapped application.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+
+            REQUESTS.labels(method, route, str(status)).inc()
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware adding a `Server-Timing` header with the stage durations of each request.
+
+    Stages recorded with `track_stage` (and the SQL time, as `db`) before the response starts
+    are reported, in milliseconds; stages of a streamed body, which run after the headers are
+    sent, are not.
+
+    Attributes:
+        app (ASGIApp): The wrapped application.
+        path_prefix (str): Only requests under this path get the header.
+    """
+
+    def __init__(self, app, path_prefix: str = "/ai"):
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings = {}
+        token = _request_timings.set(timings)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                metrics = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+                metrics.append(f"total;dur={(time.perf_counter() - start) * 1000:.1f}")
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", ", ".join(metrics).encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+
+
+def metrics_endpoint(request: Request) -> Response:
+    """
+    Returns every metric in the Prometheus text exposition format.
+
+    In multi-process mode the counters and histograms are read from the files of every worker.
+
+    Args:
+        request (Request): The scrape request.
+
+    Returns:
+        Response: The exposition.
+    """
+
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(state_collector)
+
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+state_collector = StateCollector()
+
+REGISTRY.register(state_collector)
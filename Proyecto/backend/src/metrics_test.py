@@ -0,0 +1,95 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from src.database import SessionLocal
+from src.metrics import (
+    MetricsMiddleware,
+    ServerTimingMiddleware,
+    metrics_endpoint,
+    record_token_usage,
+    track_stage,
+)
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+app = FastAPI()
+app.add_middleware(ServerTimingMiddleware, path_prefix="/items")
+app.add_middleware(MetricsMiddleware)
+app.add_route("/metrics", metrics_endpoint)
+
+
+@app.get("/items/{item_id}")
+def read_item(item_id: int):
+    with track_stage("lookup"):
+        with SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+    with track_stage("lookup"):
+        pass
+    return {"item_id": item_id}
+
+
+client = TestClient(app)
+
+
+def test_middleware_counts_requests_per_route_template():
+    before = sample("naurat_http_requests_total", method="GET", route="/items/{item_id}", status="200")
+
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/missing")
+
+    assert sample(
+        "naurat_http_requests_total", method="GET", route="/items/{item_id}", status="200"
+    ) == before + 2
+    assert sample("naurat_http_requests_total", method="GET", route="unmatched", status="404") >= 1
+
+
+def test_track_stage_and_token_usage():
+    before = sample("naurat_stage_duration_seconds_count", stage="test_stage")
+
+    with track_stage("test_stage"):
+        pass
+
+    assert sample("naurat_stage_duration_seconds_count", stage="test_stage") == before + 1
+
+    record_token_usage(
+        "test-model",
+        {"prompt_tokens": 10, "completion_tokens": 5, "prompt_tokens_details": {"cached_tokens": 8}},
+    )
+    record_token_usage(
+        "test-model", {"input_tokens": 3, "output_tokens": 2, "input_token_details": {"cache_read": 0}}
+    )
+    record_token_usage("test-model", None)
+
+    assert sample("naurat_openai_tokens_total", model="test-model", kind="prompt") == 13
+    assert sample("naurat_openai_tokens_total", model="test-model", kind="completion") == 7
+    assert sample("naurat_openai_tokens_total", model="test-model", kind="cached_prompt") == 8
+
+
+def test_metrics_endpoint_exposes_pool_and_job_queue():
+    before = sample("naurat_db_pool_checkouts_total", engine="sync")
+
+    with SessionLocal() as db:
+        db.execute(text("SELECT 1"))
+
+    assert sample("naurat_db_pool_checkouts_total", engine="sync") == before + 1
+    assert sample("naurat_db_pool_wait_seconds_count", engine="sync") >= 1
+
+    body = client.get("/metrics").text
+
+    assert "naurat_job_queue_depth 0.0" in body
+    assert 'naurat_db_pool_connections{engine="sync",state="size"}' in body
+
+
+def test_server_timing_header_reports_request_stages():
+    response = client.get("/items/3")
+
+    stages = [metric.split(";")[0] for metric in response.headers["Server-Timing"].split(", ")]
+
+    assert stages == ["db", "lookup", "total"]
+    assert "Server-Timing" not in client.get("/metrics").headers
@@ -5,17 +5,84 @@ This module defines the SQLAlchemy ORM models used in the database, including:
 - `Users`: Represents registered users.
 - `Messages`: Stores user messages.
 - `ExcelInformation`: Stores product-related information for importation.
+- `ConversationSummary`: Stores the rolling summary of a user's older messages.
+- `CachedResponse`: Shared cache of agent responses for repeated first-turn prompts.
 
-Each model is mapped to a corresponding table in the database.
+Each model is mapped to a corresponding table in the database. Importing this module does
+not touch the database: the schema is created and upgraded by the Alembic migrations in
+`migrations/` (`alembic upgrade head`), run as an explicit deployment step (by the entrypoint
+of the Docker image).
 """
 
+import os
+import re
+import threading
+import time
 import uuid
-from sqlalchemy import JSON, TIMESTAMP, Column, ForeignKey, func
+from sqlalchemy import JSON, TIMESTAMP, Column, ForeignKey, Index, Integer, Text, func, text
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql.sqltypes import String
 
-from src.database import engine, Base
+from src.database import Base
+
+
+# SQLite fills `server_default=func.now()` without fractional seconds; bound timestamps use the
+# same format so keyset comparisons against stored values are exact.
+MessageTimestamp = TIMESTAMP().with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
+
+_uuid_lock = threading.Lock()
+_last_uuid_bits = 0
+
+
+def time_ordered_uuid() -> uuid.UUID:
+    """
+    Returns a UUIDv7-style identifier that sorts after every one this process returned before.
+
+    The 48-bit millisecond timestamp comes first and the random bits are incremented when
+    needed, so rows created in order, even within one millisecond, sort in that order
+    (as `uuid` in PostgreSQL and as hexadecimal text in SQLite).
+
+    Returns:
+        uuid.UUID: The identifier.
+    """
+
+    global _last_uuid_bits
+
+    with _uuid_lock:
+        bits = (time.time_ns() // 1_000_000) << 74 | int.from_bytes(os.urandom(10), "big") >> 6
+        bits = max(bits, _last_uuid_bits + 1)
+        _last_uuid_bits = bits
+
+    timestamp, counter, random_bits = bits >> 74, (bits >> 62) & 0xFFF, bits & ((1 << 62) - 1)
+
+    return uuid.UUID(int=timestamp << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | random_bits)
+
+
+def normalize_excel_hs_code(hs_code: str) -> str:
+    """
+    Returns the deduplication key of an `ExcelInformation` HS code.
+
+    Args:
+        hs_code (str): The HS code as extracted, e.g. "8471.30.01" or '{"8471.30.01"}'.
+
+    Returns:
+        str: Its digits, or the lowercased text when it has none (e.g. "no especificado").
+    """
+
+    digits = re.sub(r"\D", "", hs_code)
+    return digits or " ".join(hs_code.casefold().split())
+
+
+def _default_hs_code_normalized(context) -> str:
+    return normalize_excel_hs_code(context.get_current_parameters()["hs_code"])
 
 
 class Users(Base):
@@ -28,8 +95,14 @@ class Users(Base):
         email (str): User's email address (unique).
         private_id (str): Private identifier (unique).
         created_at (TIMESTAMP): Timestamp of when the user was created.
+        pending_extractions (int): Number of Excel data extractions still queued or running.
+        pending_extractions_at (TIMESTAMP | None): UTC timestamp of the last queued extraction;
+            the count is ignored once it is older than `EXTRACTION_PENDING_TIMEOUT`.
+        excel_version (int): Incremented whenever a row of the user's conversation workbook is
+            written; versions the cached `products.xlsx`.
         messages (relationship): One-to-many relationship with Messages.
         excel_information (relationship): One-to-many relationship with ExcelInformation.
+        conversation_summary (relationship): One-to-one relationship with ConversationSummary.
     """
 
     __tablename__ = "users"
@@ -39,6 +112,9 @@ class Users(Base):
     email = Column(String, nullable=True, unique=True)
     private_id = Column(String, nullable=True, unique=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    pending_extractions = Column(Integer, nullable=False, default=0, server_default="0")
+    pending_extractions_at = Column(TIMESTAMP, nullable=True)
+    excel_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     messages = relationship(
         "Messages", back_populates="user", cascade="all, delete-orphan"
@@ -48,13 +124,21 @@ class Users(Base):
         "ExcelInformation", back_populates="user", cascade="all, delete-orphan"
     )
 
+    conversation_summary = relationship(
+        "ConversationSummary", back_populates="user", cascade="all, delete-orphan", uselist=False
+    )
+
 
 class Messages(Base):
     """
     Represents a message sent by a user.
 
+    Messages are indexed by `(user_id, created_at)` so a user's conversation, or a page of it,
+    is read with a bounded index range scan. Messages stored in the same second (both
+    messages of a turn share the transaction's `now()`) are ordered by their time-ordered ID.
+
     Attributes:
-        id (UUID): Primary key, uniquely identifies a message.
+        id (UUID): Primary key, uniquely identifies a message; increases with creation order.
         user_id (UUID): Foreign key referencing the user who sent the message.
         message (JSON): JSON object containing the message content.
         created_at (TIMESTAMP): Timestamp of when the message was created.
@@ -62,11 +146,14 @@ class Messages(Base):
     """
 
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_user_id_created_at", "user_id", "created_at"),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=time_ordered_uuid)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     message = Column(JSON, nullable=False)
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    created_at = Column(MessageTimestamp, server_default=func.now())
 
     user = relationship("Users", back_populates="messages")
 
@@ -75,11 +162,18 @@ class ExcelInformation(Base):
     """
     Stores product-related information for importation.
 
+    A user keeps one conversation row per normalized HS code, the first one extracted: the
+    partial unique index on `(user_id, hs_code_normalized)` (rows without `batch_id`) is the
+    conflict target of the insert in `save_data_into_db`. Batch classification rows keep one
+    row per product. Exports read the rows in insertion order, by `created_at` and then the
+    time-ordered `id`.
+
     Attributes:
-        id (UUID): Primary key, uniquely identifies a record.
+        id (UUID): Primary key, uniquely identifies a record; increases with creation order.
         user_id (UUID): Foreign key referencing the user who owns this data.
         product_name (str): Name of the imported product.
         hs_code (str): Harmonized System code of the product.
+        hs_code_normalized (str): Deduplication key of the HS code (`normalize_excel_hs_code`).
         from_country (str): Country of origin.
         cofepris (str): COFEPRIS regulatory information.
         igi_max (str): Maximum General Import Tax.
@@ -87,16 +181,28 @@ class ExcelInformation(Base):
         iva (str): Value-added tax (IVA).
         dta (str): Customs processing fee (DTA).
         noms (str): Norms and standards applicable.
+        batch_id (UUID | None): Batch classification that produced the record, if any.
         created_at (TIMESTAMP): Timestamp of when the record was created.
         user (relationship): Many-to-one relationship with Users.
     """
 
     __tablename__ = "excel_information"
+    __table_args__ = (
+        Index(
+            "uq_excel_information_user_id_hs_code",
+            "user_id",
+            "hs_code_normalized",
+            unique=True,
+            postgresql_where=text("batch_id IS NULL"),
+            sqlite_where=text("batch_id IS NULL"),
+        ),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=time_ordered_uuid)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     product_name = Column(String, nullable=False)
     hs_code = Column(String, nullable=False)
+    hs_code_normalized = Column(String, nullable=False, default=_default_hs_code_normalized)
     from_country = Column(String, nullable=False)
     cofepris = Column(String, nullable=False)
     igi_max = Column(String, nullable=False)
@@ -104,9 +210,49 @@ class ExcelInformation(Base):
     iva = Column(String, nullable=False)
     dta = Column(String, nullable=False)
     noms = Column(String, nullable=False)
+    batch_id = Column(UUID(as_uuid=True), nullable=True, index=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
     user = relationship("Users", back_populates="excel_information")
 
 
-Base.metadata.create_all(bind=engine)
+class ConversationSummary(Base):
+    """
+    Stores the rolling summary of the messages that no longer fit the history budget.
+
+    Attributes:
+        user_id (UUID): Primary key and foreign key referencing the summarized user.
+        summary (str): Summary of the oldest `summarized_count` messages.
+        summarized_count (int): Number of oldest messages already folded into the summary.
+        updated_at (TIMESTAMP): Timestamp of the last refresh.
+        user (relationship): One-to-one relationship with Users.
+    """
+
+    __tablename__ = "conversation_summaries"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    summary = Column(Text, nullable=False, default="")
+    summarized_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    user = relationship("Users", back_populates="conversation_summary")
+
+
+class CachedResponse(Base):
+    """
+    Stores an agent response shared by every worker through the database.
+
+    Attributes:
+        key (str): Primary key, hash of the normalized prompt, language and agent constants.
+        response (str): The cached agent response.
+        expires_at (TIMESTAMP): UTC timestamp after which the entry is ignored.
+        last_used_at (TIMESTAMP): UTC timestamp of the last hit, used for LRU eviction.
+    """
+
+    __tablename__ = "response_cache"
+
+    key = Column(String(64), primary_key=True)
+    response = Column(Text, nullable=False)
+    expires_at = Column(TIMESTAMP, nullable=False)
+    last_used_at = Column(TIMESTAMP, nullable=False, index=True)
+
@@ -0,0 +1,183 @@
+"""
+Profiling module for the Naurat Importation Bot API.
+
+This module lets an operator profile a single slow request (e.g. `get_excel` or `ask_agent`)
+in production without redeploying.
+
+Features:
+- Opt-in per request: the request must carry the `X-Profile` header (or the `profile` query
+  parameter) with the value of `PROFILER_TOKEN`; without the token configured, profiling is
+  disabled and the header is ignored.
+- Uses a stack sampler instead of `cProfile`, with negligible overhead between samples.
+  Only the profiled request is sampled: a sample of the event loop thread counts when the
+  request's own coroutines are running, so concurrent requests, the job queue and other
+  threads never show up in its profile. Work the request hands to a thread (synchronous
+  routes, `asyncio.to_thread`) shows up as the await waiting for it.
+- Writes the samples in the collapsed-stack format (one `frame;frame;frame count` line per
+  distinct stack), which speedscope, flamegraph.pl and similar tools open directly, and
+  reports the file name in the `X-Profile-File` response header. The file is written in a
+  worker thread, off the event loop.
+
+Environment Variables:
+- `PROFILER_TOKEN`: Secret that enables profiling of the requests presenting it.
+- `PROFILER_OUTPUT_DIR`: Directory where the profiles are written. Defaults to `profiles`.
+- `PROFILER_INTERVAL_MS`: Sampling interval in milliseconds. Defaults to 5.
+"""
+
+import asyncio
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import parse_qs
+
+
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")
+
+PROFILER_OUTPUT_DIR = os.getenv("PROFILER_OUTPUT_DIR", "profiles")
+
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+
+
+class StackSampler:
+    """
+    Background thread that periodically samples the stack of one thread, keeping the samples
+    taken while a given frame (e.g. the coroutine of the profiled request) is on it.
+
+    Attributes:
+        interval (float): Seconds between samples.
+        thread_id (int): Identifier of the sampled thread.
+        root (FrameType): Frame whose callees are sampled; the outermost frame of each stack.
+        stacks (Counter): Sample count of each collapsed stack.
+    """
+
+    def __init__(self, interval: float, thread_id: int, root):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.root = root
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                if frame is self.root:
+                    self.stacks[";".join(reversed(stack))] += 1
+                    break
+                frame = frame.f_back
+
+    def collapsed(self) -> str:
+        """
+        Returns the samples in the collapsed-stack format.
+
+        Returns:
+            str: One `frame;frame;frame count` line per distinct stack.
+        """
+
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile_requested(scope) -> bool:
+    """
+    Whether a request presents the profiler token.
+
+    Args:
+        scope (dict): The ASGI HTTP scope.
+
+    Returns:
+        bool: True when profiling is enabled and the token matches.
+    """
+
+    if not PROFILER_TOKEN:
+        return False
+
+    presented = dict(scope["headers"]).get(b"x-profile", b"").decode("latin-1")
+    if not presented:
+        presented = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile", [""])[0]
+
+    return hmac.compare_digest(presented.encode(), PROFILER_TOKEN.encode())
+
+
+def profile_path(method: str, path: str) -> str:
+    """
+    Returns a new profile file path for a request.
+
+    Args:
+        method (str): The HTTP method.
+        path (str): The request path.
+
+    Returns:
+        str: The file path inside `PROFILER_OUTPUT_DIR`.
+    """
+
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-") or "root"
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{method}-{slug}-{uuid.uuid4().hex[:8]}.folded"
+
+    return os.path.join(PROFILER_OUTPUT_DIR, name)
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware sampling the requests that present the profiler token.
+
+    Attributes:
+        app (ASGIApp): The wrapped application.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        path = profile_path(scope["method"], scope["path"])
+        # This coroutine's frame is on the event loop thread's stack exactly while the
+        # request's own code runs.
+        sampler = StackSampler(PROFILER_INTERVAL_MS / 1000, threading.get_ident(), sys._getframe())
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-file", os.path.basename(path).encode())
+                ]
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            await asyncio.to_thread(write_profile, sampler, path)
+
+
+def write_profile(sampler: StackSampler, path: str) -> None:
+    """
+    Stops a sampler and writes its samples. Blocking; run in a worker thread.
+
+    Args:
+        sampler (StackSampler): The request's sampler.
+        path (str): The file path returned by `profile_path`.
+    """
+
+    sampler.stop()
+    os.makedirs(PROFILER_OUTPUT_DIR, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as profile_file:
+        profile_file.write(sampler.collapsed())
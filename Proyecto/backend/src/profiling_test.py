@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import src.profiling as profiling
+
+
+app = FastAPI()
+app.add_middleware(profiling.ProfilerMiddleware)
+
+
+def busy(seconds: float) -> int:
+    total = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+@app.get("/slow")
+async def slow():
+    return {"total": busy(0.05)}
+
+
+def background_noise(stop: threading.Event) -> None:
+    while not stop.is_set():
+        busy(0.01)
+
+
+client = TestClient(app)
+
+
+def test_profiler_requires_the_token(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILER_OUTPUT_DIR", str(tmp_path))
+
+    monkeypatch.setattr(profiling, "PROFILER_TOKEN", None)
+    assert "X-Profile-File" not in client.get("/slow", headers={"X-Profile": ""}).headers
+
+    monkeypatch.setattr(profiling, "PROFILER_TOKEN", "secret")
+    assert "X-Profile-File" not in client.get("/slow", headers={"X-Profile": "wrong"}).headers
+    assert os.listdir(tmp_path) == []
+
+
+def test_profiler_writes_collapsed_stacks(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILER_OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILER_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILER_INTERVAL_MS", 1)
+
+    response = client.get("/slow", params={"profile": "secret"})
+
+    profile_file = tmp_path / response.headers["X-Profile-File"]
+    lines = profile_file.read_text(encoding="utf-8").splitlines()
+
+    assert response.json()["total"] > 0
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("profiling_test.py:slow" in line for line in lines)
+    assert all(line.startswith("profiling.py:__call__;") for line in lines)
+
+
+def test_profiler_samples_only_the_profiled_request(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILER_OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILER_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILER_INTERVAL_MS", 1)
+
+    stop = threading.Event()
+    noise = threading.Thread(target=background_noise, args=(stop,))
+    noise.start()
+    try:
+        response = client.get("/slow", params={"profile": "secret"})
+    finally:
+        stop.set()
+        noise.join()
+
+    profile = (tmp_path / response.headers["X-Profile-File"]).read_text(encoding="utf-8")
+
+    assert "profiling_test.py:slow" in profile
+    assert "background_noise" not in profile